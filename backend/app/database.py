@@ -1,16 +1,61 @@
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Optional
 import os
 import logging
+import queue
 import sqlite3
+import threading
+import time
+
+from app.utils.timing_utils import current_timings
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Arquivo do banco SQLite (compartilhado por SQLAlchemy e pelo pool direto)
+SQLITE_DB_PATH = "./gestao360.db"
+
 # URL do banco (SQLite por padrão)
-DATABASE_URL = "sqlite:///./gestao360.db"
+DATABASE_URL = f"sqlite:///{SQLITE_DB_PATH}"
+
+# Tamanho do pool de conexões sqlite3 reutilizáveis (máximo de conexões abertas)
+SQLITE_POOL_SIZE = int(os.getenv("GESTAO360_DB_POOL_SIZE", "10"))
+
+# Espera máxima (s) por uma conexão livre antes de desistir com PoolTimeout (503)
+SQLITE_POOL_TIMEOUT = float(os.getenv("GESTAO360_DB_POOL_TIMEOUT", "10"))
+
+# Threads que executam os handlers síncronos (um por conexão do pool)
+SQLITE_THREADPOOL_SIZE = int(os.getenv("GESTAO360_DB_THREADS", str(SQLITE_POOL_SIZE)))
+
+# Perfis de PRAGMA aplicados em toda conexão (SQLAlchemy e sqlite3 direto)
+SQLITE_PRAGMA_PROFILES = {
+    # Comportamento original do SQLite: rollback journal, leitores bloqueiam escritores
+    "default": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000
+    },
+    # WAL: leituras concorrentes com uma escrita, fsync apenas no checkpoint
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,  # 64 MB (valor negativo = KiB)
+        "mmap_size": 268435456,  # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000
+    }
+}
+
+SQLITE_PRAGMA_PROFILE = os.getenv("GESTAO360_SQLITE_PROFILE", "production")
+if SQLITE_PRAGMA_PROFILE not in SQLITE_PRAGMA_PROFILES:
+    logger.warning(f"⚠️ Perfil SQLite '{SQLITE_PRAGMA_PROFILE}' desconhecido, usando 'production'")
+    SQLITE_PRAGMA_PROFILE = "production"
 
 # Criar engine do SQLAlchemy
 engine = create_engine(
@@ -19,6 +64,24 @@ engine = create_engine(
     echo=False  # True para debug SQL
 )
 
+
+def apply_pragmas(conn, profile: str = None):
+    """Aplicar o perfil de PRAGMAs em uma conexão DB-API (sqlite3 ou SQLAlchemy)"""
+    pragmas = SQLITE_PRAGMA_PROFILES[profile or SQLITE_PRAGMA_PROFILE]
+    cursor = conn.cursor()
+    try:
+        # journal_mode primeiro: é persistente no arquivo e afeta os demais
+        for name in sorted(pragmas, key=lambda p: p != "journal_mode"):
+            cursor.execute(f"PRAGMA {name} = {pragmas[name]}")
+    finally:
+        cursor.close()
+
+
+@event.listens_for(engine, "connect")
+def _configure_sqlalchemy_connection(dbapi_connection, connection_record):
+    apply_pragmas(dbapi_connection)
+
+
 # Session maker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -35,6 +98,444 @@ def get_db():
         db.close()
 
 
+# ============================================================================
+# 🔌 POOL DE CONEXÕES SQLITE (ROUTERS E UTILS)
+# ============================================================================
+
+# Comandos que falharam com "database is locked/busy" mesmo após o busy_timeout
+_busy_errors = 0
+
+
+def _count_busy_error(error: sqlite3.OperationalError):
+    global _busy_errors
+    message = str(error)
+    if "locked" in message or "busy" in message:
+        _busy_errors += 1
+
+
+def get_busy_error_count() -> int:
+    return _busy_errors
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor que soma consultas, linhas e tempo no SQLite ao request em andamento"""
+
+    def execute(self, sql, parameters=()):
+        timings = current_timings()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        except sqlite3.OperationalError as e:
+            _count_busy_error(e)
+            raise
+        finally:
+            if timings is not None:
+                timings.queries += 1
+                timings.db_seconds += time.perf_counter() - started
+
+    def executemany(self, sql, seq_of_parameters):
+        timings = current_timings()
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        except sqlite3.OperationalError as e:
+            _count_busy_error(e)
+            raise
+        finally:
+            if timings is not None:
+                timings.queries += 1
+                timings.db_seconds += time.perf_counter() - started
+
+    # O SQLite produz as linhas durante o fetch: ele também conta como tempo de banco
+    def fetchone(self):
+        timings = current_timings()
+        if timings is None:
+            return super().fetchone()
+        started = time.perf_counter()
+        row = super().fetchone()
+        timings.db_seconds += time.perf_counter() - started
+        if row is not None:
+            timings.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        timings = current_timings()
+        if timings is None:
+            return super().fetchmany(size or self.arraysize)
+        started = time.perf_counter()
+        rows = super().fetchmany(size or self.arraysize)
+        timings.db_seconds += time.perf_counter() - started
+        timings.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        timings = current_timings()
+        if timings is None:
+            return super().fetchall()
+        started = time.perf_counter()
+        rows = super().fetchall()
+        timings.db_seconds += time.perf_counter() - started
+        timings.rows += len(rows)
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        timings = current_timings()
+        if timings is not None:
+            timings.rows += 1
+        return row
+
+
+class TracedConnection(sqlite3.Connection):
+    """Conexão do pool: cursores (inclusive de conn.execute) são TracedCursor"""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def configure_connection(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Aplicar configuração padrão (row_factory e pragmas) em uma conexão nova"""
+    conn.row_factory = sqlite3.Row
+    apply_pragmas(conn)
+    return conn
+
+
+class SchemaRegistry:
+    """Cache de tabelas/colunas do banco, recarregado só quando o schema muda"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._version = None
+        self._tables: Dict[str, List[str]] = {}
+        self._stats = {"refreshes": 0, "checks": 0}
+
+    def sync(self, conn):
+        """Conferir PRAGMA schema_version e recarregar os metadados se mudou"""
+        try:
+            version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Não foi possível ler schema_version: {e}")
+            return
+
+        self._stats["checks"] += 1
+        if version == self._version:
+            return
+
+        with self._lock:
+            if version != self._version:
+                self._load(conn, version)
+
+    def _load(self, conn, version: int):
+        tables = {}
+        rows = conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+        for row in rows:
+            name = row[0]
+            info = conn.execute(f'PRAGMA table_info("{name}")').fetchall()
+            tables[name] = [col[1] for col in info]
+
+        self._tables = tables
+        self._version = version
+        self._stats["refreshes"] += 1
+        logger.info(f"📋 Schema carregado (versão {version}): {len(tables)} tabelas")
+
+    def invalidate(self):
+        """Forçar recarga na próxima conexão emprestada"""
+        with self._lock:
+            self._version = None
+
+    def has_table(self, table_name: str) -> bool:
+        return table_name in self._tables
+
+    def columns(self, table_name: str) -> List[str]:
+        """Colunas existentes da tabela (lista vazia se não existir)"""
+        return list(self._tables.get(table_name, ()))
+
+    def tables(self) -> List[str]:
+        return sorted(name for name in self._tables if not name.startswith("sqlite_"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "schema_version": self._version,
+            "tables": len(self._tables),
+            **self._stats
+        }
+
+
+schema_registry = SchemaRegistry()
+
+
+# ============================================================================
+# 🔄 GERAÇÃO DE ESCRITA (INVALIDAÇÃO DE CACHES)
+# ============================================================================
+
+_write_generation = 0
+_write_generation_lock = threading.Lock()
+
+
+def get_write_generation() -> int:
+    """Contador incrementado a cada commit com alterações feito pelo pool"""
+    return _write_generation
+
+
+def bump_write_generation():
+    global _write_generation
+    with _write_generation_lock:
+        _write_generation += 1
+
+
+class PooledConnection:
+    """Conexão emprestada do pool: close() devolve ao pool em vez de fechar"""
+
+    def __init__(self, pool: "SQLitePool", conn: sqlite3.Connection):
+        self._pool = pool
+        self._conn = conn
+        self._changes = conn.total_changes
+
+    def commit(self):
+        """Commit que avisa os caches quando a transação alterou linhas"""
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Conexão já devolvida ao pool")
+        try:
+            self._conn.commit()
+        except sqlite3.OperationalError as e:
+            _count_busy_error(e)
+            raise
+        if self._conn.total_changes != self._changes:
+            self._changes = self._conn.total_changes
+            bump_write_generation()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """sqlite3.Connection emprestada, sem o controle de escrita do commit()"""
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Conexão já devolvida ao pool")
+        return self._conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Conexão já devolvida ao pool")
+        return getattr(self._conn, name)
+
+    def close(self):
+        """Devolver a conexão ao pool (idempotente)"""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __del__(self):
+        # Conexões esquecidas abertas (ex.: HTTPException antes do close) voltam ao pool
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class PoolTimeout(Exception):
+    """Nenhuma conexão do pool ficou livre dentro do tempo de espera (responder 503)"""
+
+
+class SQLitePool:
+    """Pool limitado de conexões sqlite3 pré-configuradas e reutilizáveis
+
+    No máximo ``pool_size`` conexões emprestadas ao mesmo tempo, venha o
+    pedido de um handler, de uma thread de background ou do /metrics:
+    acima disso ``acquire`` espera até ``acquire_timeout`` e levanta PoolTimeout.
+    """
+
+    def __init__(self, database: str, pool_size: int = 10, timeout: float = 5.0,
+                 acquire_timeout: float = SQLITE_POOL_TIMEOUT):
+        self.database = database
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.acquire_timeout = acquire_timeout
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.RLock()
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "checkouts": 0,
+            "reused": 0,
+            "in_use": 0,
+            "waits": 0,
+            "timeouts": 0
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.database, timeout=self.timeout, check_same_thread=False,
+                               factory=TracedConnection)
+        configure_connection(conn)
+        with self._lock:
+            self._stats["created"] += 1
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._stats["closed"] += 1
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Emprestar uma conexão (reutiliza ociosa ou abre uma nova), esperando vaga se o pool está cheio"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["waits"] += 1
+            wait = self.acquire_timeout if timeout is None else timeout
+            if not self._slots.acquire(timeout=wait):
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise PoolTimeout(f"Pool SQLite esgotado: {self.pool_size} conexões em uso por mais de {wait:g}s")
+
+        try:
+            try:
+                conn = self._idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                conn = self._connect()
+                reused = False
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            if reused:
+                self._stats["reused"] += 1
+
+        schema_registry.sync(conn)
+        return PooledConnection(self, conn)
+
+    def release(self, conn: sqlite3.Connection):
+        """Receber a conexão de volta; descarta se estiver inválida ou o pool cheio"""
+        with self._lock:
+            self._stats["in_use"] -= 1
+
+        try:
+            # Nunca devolver transação pendente para o próximo request
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._discard(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Conexão descartada do pool: {e}")
+            self._discard(conn)
+        finally:
+            # A vaga só é liberada depois que a conexão voltou à fila (ou foi fechada)
+            self._slots.release()
+
+    def close_all(self):
+        """Fechar todas as conexões ociosas (shutdown/testes)"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de uso do pool"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["pool_size"] = self.pool_size
+        stats["idle"] = self._idle.qsize()
+        return stats
+
+
+sqlite_pool = SQLitePool(SQLITE_DB_PATH, pool_size=SQLITE_POOL_SIZE)
+
+
+# ============================================================================
+# 📸 SNAPSHOT DE LEITURA (VÁRIAS CONSULTAS, UMA TRANSAÇÃO)
+# ============================================================================
+
+class _SnapshotConnection:
+    """Conexão fixada no contexto: close()/commit() não encerram o snapshot"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+_pinned_connection: ContextVar[Optional[_SnapshotConnection]] = ContextVar("pinned_connection", default=None)
+
+
+@contextmanager
+def read_snapshot():
+    """Fixar uma conexão em transação de leitura para o contexto atual
+
+    Dentro do bloco, ``get_sqlite_connection()`` devolve sempre a mesma conexão,
+    então funções existentes leem o mesmo snapshot (WAL) sem mudar de código.
+    ``query_only`` faz qualquer escrita acidental falhar em vez de ser descartada.
+    """
+    pooled = sqlite_pool.acquire()
+    conn = pooled.connection
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute("BEGIN")
+    token = _pinned_connection.set(_SnapshotConnection(conn))
+    try:
+        yield _pinned_connection.get()
+    finally:
+        _pinned_connection.reset(token)
+        conn.rollback()
+        conn.execute("PRAGMA query_only = OFF")
+        pooled.close()
+
+
+def get_sqlite_connection() -> PooledConnection:
+    """Obter conexão sqlite3 do pool compartilhado (row_factory=sqlite3.Row)"""
+    pinned = _pinned_connection.get()
+    if pinned is not None:
+        return pinned
+    return sqlite_pool.acquire()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Obter métricas do pool de conexões"""
+    return sqlite_pool.stats()
+
+
+def get_pragma_report() -> Dict[str, Any]:
+    """Obter o perfil configurado e os valores efetivos dos PRAGMAs"""
+    conn = get_sqlite_connection()
+    try:
+        effective = {}
+        for name in SQLITE_PRAGMA_PROFILES[SQLITE_PRAGMA_PROFILE]:
+            row = conn.execute(f"PRAGMA {name}").fetchone()
+            effective[name] = row[0] if row else None
+        return {
+            "profile": SQLITE_PRAGMA_PROFILE,
+            "available_profiles": list(SQLITE_PRAGMA_PROFILES.keys()),
+            "effective": effective
+        }
+    finally:
+        conn.close()
+
+
 # ============================================================================
 # 🏗️ FUNÇÕES DE INICIALIZAÇÃO E SAÚDE
 # ============================================================================
@@ -189,18 +690,15 @@ def execute_raw_sql(query, params=None):
 def backup_database(backup_path=None):
     """Fazer backup do banco de dados"""
     try:
-        import shutil
-        from datetime import datetime
-
-        if not backup_path:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = f"./gestao360_backup_{timestamp}.db"
+        from app.utils.backup_utils import start_backup
 
-        # Copiar arquivo de banco
-        shutil.copy2("./gestao360.db", backup_path)
+        result = start_backup(backup_path, wait=True)
+        if not result["success"]:
+            logger.error(f"❌ Erro no backup: {result['error']}")
+            return None
 
-        logger.info(f"✅ Backup criado: {backup_path}")
-        return backup_path
+        logger.info(f"✅ Backup criado: {result['backup_path']}")
+        return result["backup_path"]
 
     except Exception as e:
         logger.error(f"❌ Erro no backup: {e}")
@@ -246,6 +744,9 @@ def initialize_database():
         if success:
             logger.info("✅ Banco inicializado com SQLAlchemy")
 
+            from app.migrate import run_migrations
+            run_migrations()
+
             # Informações adicionais
             size = get_database_size()
             logger.info(f"📊 Tamanho do banco: {size / 1024:.1f} KB")
@@ -1,17 +1,22 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import logging
+import os
+import time
+import uuid
 from datetime import datetime
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('gestao360.log'),
-        logging.StreamHandler()
-    ]
+from app.database import PoolTimeout
+from app.utils.logging_utils import setup_logging, bind_request_context, reset_request_context, route_of
+from app.utils.metrics_utils import request_started, observe_request
+from app.utils.timing_utils import (
+    SLOW_REQUEST_MS, TimedJSONResponse, start_request_timings, finish_request_timings, server_timing_header
 )
+
+# Configurar logging: handlers só enfileiram; arquivo (com rotação) e console
+# são escritos pela thread do QueueListener
+setup_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
 # ============================================================================
@@ -23,12 +28,94 @@ app = FastAPI(
     version="2.0.1",
     description="Sistema de Gestão Empresarial Completo com SQLAlchemy e Fallback",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=TimedJSONResponse
 )
 
+# ============================================================================
+# 🧯 POOL DE CONEXÕES ESGOTADO
+# ============================================================================
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    """Sem conexão livre dentro do GESTAO360_DB_POOL_TIMEOUT: 503 para o cliente tentar de novo"""
+    logger.warning(f"⏳ {request.method} {request.url.path}: {exc}")
+    return TimedJSONResponse(
+        status_code=503,
+        content={"detail": "Banco de dados ocupado, tente novamente"},
+        headers={"Retry-After": "1"},
+    )
+
+
+# ============================================================================
+# 🚦 LIMITE DE TAXA (LOGIN E ESCRITAS)
+# ============================================================================
+# Declarado antes do middleware de contexto: roda por dentro dele, então os
+# 429 também recebem X-Request-ID, entram no access log e no /metrics.
+
+@app.middleware("http")
+async def rate_limit_middleware(request: Request, call_next):
+    """Token buckets por IP/usuário para /auth/token, jobs de admin e escritas"""
+    from app.utils.ratelimit_utils import check_request
+    rejected = check_request(request)
+    if rejected is not None:
+        return rejected
+    return await call_next(request)
+
+
+# ============================================================================
+# 🧾 CONTEXTO DA REQUISIÇÃO
+# ============================================================================
+
+access_logger = logging.getLogger("app.access")
+
+
+@app.middleware("http")
+async def request_context_middleware(request: Request, call_next):
+    """Associar request_id e rota a todo log emitido durante a requisição
+
+    Também mede o request (SQL, serialização JSON, total), devolve o
+    detalhamento no header Server-Timing e loga como WARNING os lentos.
+    """
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:12]
+    token = bind_request_context(request_id, request.scope)
+    timings, timings_token = start_request_timings()
+    request_started()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        response.headers["Server-Timing"] = server_timing_header(
+            timings, round((time.perf_counter() - started) * 1000, 2)
+        )
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        observe_request(request.method, getattr(request.scope.get("route"), "path", None), status,
+                        elapsed, timings.db_seconds, timings.queries)
+
+        latency_ms = round(elapsed * 1000, 2)
+        slow = latency_ms >= SLOW_REQUEST_MS
+        access_logger.log(
+            logging.WARNING if slow else logging.INFO,
+            f"{'🐢 ' if slow else ''}{request.method} {request.url.path} {status} {latency_ms}ms "
+            f"(db {timings.db_ms}ms/{timings.queries}q/{timings.rows} rows, json {timings.json_ms}ms)",
+            extra={"latency_ms": latency_ms, "status": status, "method": request.method,
+                   "route": route_of(request.scope), "db_ms": timings.db_ms, "queries": timings.queries,
+                   "rows": timings.rows, "json_ms": timings.json_ms}
+        )
+        finish_request_timings(timings_token)
+        reset_request_context(token)
+
+
 # ============================================================================
 # 🌐 CONFIGURAÇÃO CORS
 # ============================================================================
+# Adicionado depois dos middlewares http para ser o mais externo: respostas
+# geradas por eles (429 do limitador) também recebem os headers CORS, e o
+# frontend consegue ler o Retry-After.
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,6 +123,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
 
@@ -43,23 +131,25 @@ app.add_middleware(
 # 🗃️ INICIALIZAÇÃO DO BANCO
 # ============================================================================
 
+# Com GESTAO360_AUTO_MIGRATE=0 o deploy roda "python -m app.migrate" uma vez
+# e os workers sobem sem tocar no schema
+AUTO_MIGRATE = os.getenv("GESTAO360_AUTO_MIGRATE", "1") != "0"
+
+db_initialized = False
+admin_initialized = False
+
+
 def initialize_database():
     try:
-        from app.database import init_database_sqlalchemy
-        logger.info("🔍 Inicializando banco com SQLAlchemy...")
-        success = init_database_sqlalchemy()
-        if success:
-            logger.info("✅ Banco inicializado com sucesso via SQLAlchemy")
-            return True
-        else:
-            logger.warning("⚠️ Falha na inicialização SQLAlchemy, sistema continuará")
-            return False
+        from app.migrate import run_migrations
+        logger.info("🔍 Verificando migrations pendentes...")
+        report = run_migrations()
+        if report["applied"]:
+            logger.info(f"✅ Migrations aplicadas: {', '.join(report['applied'])}")
+        return report
     except Exception as e:
         logger.error(f"❌ Erro na inicialização do banco: {e}")
-        return False
-
-
-db_initialized = initialize_database()
+        return None
 
 
 # ============================================================================
@@ -84,7 +174,23 @@ def initialize_admin_system():
         return False
 
 
-admin_initialized = initialize_admin_system()
+@app.on_event("startup")
+def run_startup_migrations():
+    global db_initialized, admin_initialized
+
+    if not AUTO_MIGRATE:
+        logger.info("⏭️ Migrations automáticas desativadas (GESTAO360_AUTO_MIGRATE=0)")
+        db_initialized = admin_initialized = True
+        return
+
+    report = initialize_database()
+    db_initialized = report is not None
+
+    # Admin só precisa ser semeado quando o schema acabou de mudar
+    if report and report["applied"]:
+        admin_initialized = initialize_admin_system()
+    else:
+        admin_initialized = db_initialized
 
 
 # ============================================================================
@@ -134,6 +240,49 @@ for router_name in routers_to_load:
         failed_routers.append(router_name)
 
 
+@app.on_event("startup")
+async def configure_db_threadpool():
+    # Handlers de banco são "def": o FastAPI os executa neste threadpool,
+    # mantendo o event loop livre enquanto o sqlite3 bloqueia
+    from anyio import to_thread
+    from app.database import SQLITE_THREADPOOL_SIZE
+    to_thread.current_default_thread_limiter().total_tokens = SQLITE_THREADPOOL_SIZE
+    logger.info(f"🧵 Threadpool de banco configurado com {SQLITE_THREADPOOL_SIZE} threads")
+
+
+@app.on_event("startup")
+def start_log_queue():
+    from app.utils.audit_utils import start_log_writer
+    start_log_writer()
+
+    from app.utils.login_utils import start_login_writer
+    start_login_writer()
+
+    from app.utils.retention_utils import start_retention_job
+    start_retention_job()
+
+
+@app.on_event("shutdown")
+def close_database_pool():
+    from app.utils.retention_utils import stop_retention_job
+    stop_retention_job()
+
+    # Gravar logs e logins pendentes antes de fechar as conexões
+    from app.utils.audit_utils import stop_log_writer
+    stop_log_writer()
+
+    from app.utils.login_utils import stop_login_writer
+    stop_login_writer()
+
+    from app.database import sqlite_pool
+    sqlite_pool.close_all()
+    logger.info("🔌 Pool de conexões SQLite fechado")
+
+    # Por último: garante que as mensagens acima cheguem ao arquivo
+    from app.utils.logging_utils import shutdown_logging
+    shutdown_logging()
+
+
 # ============================================================================
 # 🏠 ENDPOINTS DE SISTEMA
 # ============================================================================
@@ -164,6 +313,13 @@ def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas no formato texto do Prometheus (async: lê os contadores no event loop)"""
+    from app.utils.metrics_utils import render_metrics
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/health")
 def health():
     try:
@@ -179,9 +335,17 @@ def health():
             pass
 
         sqlite_status = False
+        pool_stats = {}
+        pragma_report = {}
+        schema_stats = {}
+        log_queue_stats = {}
+        retention_stats = {}
+        login_buffer_stats = {}
+        logging_stats = {}
+        rate_limit_stats = {}
         try:
-            import sqlite3
-            conn = sqlite3.connect("gestao360.db")
+            from app.database import get_sqlite_connection, get_pool_stats, get_pragma_report, schema_registry
+            conn = get_sqlite_connection()
             cursor = conn.cursor()
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
             tables = cursor.fetchall()
@@ -190,6 +354,24 @@ def health():
             sqlite_status = True
             if not sqlalchemy_status:
                 table_count = len(tables)
+            pool_stats = get_pool_stats()
+            pragma_report = get_pragma_report()
+            schema_stats = schema_registry.stats()
+
+            from app.utils.audit_utils import get_log_queue_stats
+            log_queue_stats = get_log_queue_stats()
+
+            from app.utils.retention_utils import get_retention_stats
+            retention_stats = get_retention_stats()
+
+            from app.utils.login_utils import get_login_buffer_stats
+            login_buffer_stats = get_login_buffer_stats()
+
+            from app.utils.logging_utils import get_logging_stats
+            logging_stats = get_logging_stats()
+
+            from app.utils.ratelimit_utils import get_rate_limit_stats
+            rate_limit_stats = get_rate_limit_stats()
         except:
             pass
 
@@ -207,7 +389,15 @@ def health():
                 "sqlalchemy": "healthy" if sqlalchemy_status else "error",
                 "sqlite_fallback": "healthy" if sqlite_status else "error",
                 "tables_count": table_count,
+                "pool": pool_stats,
+                "pragmas": pragma_report,
+                "schema": schema_stats,
+                "log_queue": log_queue_stats,
+                "log_retention": retention_stats,
+                "login_buffer": login_buffer_stats,
             },
+            "logging": logging_stats,
+            "rate_limit": rate_limit_stats,
             "api": {
                 "routers_loaded": len(loaded_routers),
                 "routers_failed": len(failed_routers),
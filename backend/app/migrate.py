@@ -0,0 +1,311 @@
+"""Runner de migrations versionadas do Gestão 360.
+
+Aplica em ordem os arquivos ``NNN_descricao.sql`` de ``backend/migrations/`` e
+registra cada versão aplicada em ``schema_migrations``. Em um banco vazio o
+``create_initial.sql`` é aplicado como baseline (versão 000).
+
+Uso:
+    python -m app.migrate           # aplicar migrations pendentes
+    python -m app.migrate status    # listar versões aplicadas/pendentes
+    python -m app.migrate reconcile # reconstruir metric_counters e relatar drift
+    python -m app.migrate prune-logs [dias]  # arquivar system_logs antigos
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from app.database import SQLITE_DB_PATH, apply_pragmas
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+BASELINE_FILE = "create_initial.sql"
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{3})_(\w+)\.sql$")
+ADD_COLUMN_PATTERN = re.compile(r"^ALTER\s+TABLE\s+\S+\s+ADD\s+(COLUMN\s+)?", re.IGNORECASE)
+
+# Tabelas que indicam um banco já existente (baseline não deve ser aplicado)
+BASELINE_TABLES = ("employees", "areas", "teams", "managers", "knowledge", "employee_knowledge")
+
+# Tempo máximo esperando outro worker terminar de migrar
+MIGRATION_LOCK_TIMEOUT = 60
+
+
+class MigrationError(Exception):
+    """Falha ao aplicar uma migration (a transação é desfeita)"""
+
+
+# ============================================================================
+# 📂 DESCOBERTA DAS MIGRATIONS
+# ============================================================================
+
+def split_sql_statements(script: str) -> List[str]:
+    """Quebrar um script SQL em comandos completos (respeita strings e triggers)"""
+    statements = []
+    buffer = ""
+    for line in script.splitlines(keepends=True):
+        if not buffer and line.strip().startswith("--"):
+            continue
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ""
+    if buffer.strip():
+        statements.append(buffer.strip())
+    return statements
+
+
+def _load(version: str, name: str, path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        script = f.read()
+    return {
+        "version": version,
+        "name": name,
+        "path": path,
+        "checksum": hashlib.sha256(script.encode("utf-8")).hexdigest(),
+        "statements": split_sql_statements(script),
+    }
+
+
+def discover_migrations(migrations_dir: str = MIGRATIONS_DIR) -> List[Dict[str, Any]]:
+    """Listar migrations em ordem de versão, com o baseline como 000"""
+    migrations = []
+
+    baseline_path = os.path.join(migrations_dir, BASELINE_FILE)
+    if os.path.exists(baseline_path):
+        migrations.append(_load("000", "baseline", baseline_path))
+
+    for filename in sorted(os.listdir(migrations_dir)):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if match:
+            migrations.append(_load(match.group(1), match.group(2), os.path.join(migrations_dir, filename)))
+
+    return migrations
+
+
+# ============================================================================
+# 🗂️ CONTROLE DE VERSÕES
+# ============================================================================
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    # isolation_level=None: transações controladas explicitamente com BEGIN IMMEDIATE
+    conn = sqlite3.connect(db_path, timeout=MIGRATION_LOCK_TIMEOUT, isolation_level=None)
+    apply_pragmas(conn)
+    return conn
+
+
+def _ensure_migrations_table(conn: sqlite3.Connection):
+    conn.execute("""
+                 CREATE TABLE IF NOT EXISTS schema_migrations
+                 (
+                     version     TEXT PRIMARY KEY,
+                     name        TEXT NOT NULL,
+                     checksum    TEXT NOT NULL,
+                     duration_ms REAL,
+                     applied_at  TEXT DEFAULT CURRENT_TIMESTAMP
+                 )
+                 """)
+
+
+def get_applied_versions(conn: sqlite3.Connection) -> Dict[str, str]:
+    """Versões aplicadas → checksum registrado"""
+    try:
+        rows = conn.execute("SELECT version, checksum FROM schema_migrations").fetchall()
+        return {version: checksum for version, checksum in rows}
+    except sqlite3.OperationalError:
+        return {}
+
+
+def _has_application_tables(conn: sqlite3.Connection) -> bool:
+    placeholders = ", ".join("?" for _ in BASELINE_TABLES)
+    row = conn.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",
+        BASELINE_TABLES
+    ).fetchone()
+    return row[0] > 0
+
+
+def migration_status(db_path: str = SQLITE_DB_PATH) -> List[Dict[str, Any]]:
+    """Situação de cada migration conhecida"""
+    conn = _connect(db_path)
+    try:
+        applied = get_applied_versions(conn)
+    finally:
+        conn.close()
+
+    status = []
+    for migration in discover_migrations():
+        recorded = applied.get(migration["version"])
+        status.append({
+            "version": migration["version"],
+            "name": migration["name"],
+            "applied": recorded is not None,
+            "checksum_changed": recorded is not None and recorded != migration["checksum"],
+        })
+    return status
+
+
+# ============================================================================
+# 🐍 PASSOS EM PYTHON
+# ============================================================================
+# Rodam depois dos statements da versão, na mesma transação: dados que
+# dependem de regras da aplicação (ex.: layout de bits) não são duplicados
+# em SQL.
+
+def _backfill_permission_masks(conn: sqlite3.Connection):
+    """Compilar permission_mask dos usuários existentes (migration 008)"""
+    from app.utils.permission_utils import user_permission_mask
+
+    rows = conn.execute(
+        "SELECT id, is_admin, permissions FROM users WHERE permission_mask IS NULL"
+    ).fetchall()
+    conn.executemany(
+        "UPDATE users SET permission_mask = ? WHERE id = ?",
+        [(user_permission_mask({"is_admin": is_admin, "permissions": permissions}), user_id)
+         for user_id, is_admin, permissions in rows]
+    )
+    logger.info(f"🔐 permission_mask preenchida para {len(rows)} usuários")
+
+
+POST_MIGRATION_STEPS = {
+    "008": _backfill_permission_masks,
+}
+
+
+# ============================================================================
+# 🚀 APLICAÇÃO
+# ============================================================================
+
+def _execute_statement(conn: sqlite3.Connection, statement: str):
+    try:
+        conn.execute(statement)
+    except sqlite3.OperationalError as e:
+        # SQLite não tem ADD COLUMN IF NOT EXISTS: coluna já existente conta como aplicada
+        if ADD_COLUMN_PATTERN.match(statement) and "duplicate column name" in str(e):
+            logger.info(f"⏭️ Coluna já existe, ignorando: {statement.splitlines()[0]}")
+            return
+        raise
+
+
+def _apply(conn: sqlite3.Connection, migration: Dict[str, Any]) -> Optional[float]:
+    """Aplicar uma migration em transação própria; None se outro worker já aplicou"""
+    started = time.perf_counter()
+
+    # BEGIN IMMEDIATE serializa workers: quem chega depois espera e reavalia
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if migration["version"] in get_applied_versions(conn):
+            conn.execute("ROLLBACK")
+            return None
+
+        # Baseline só cria o schema em banco vazio; bancos existentes apenas o registram
+        skip_statements = migration["version"] == "000" and _has_application_tables(conn)
+
+        if not skip_statements:
+            for statement in migration["statements"]:
+                _execute_statement(conn, statement)
+
+            step = POST_MIGRATION_STEPS.get(migration["version"])
+            if step:
+                step(conn)
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        conn.execute(
+            "INSERT INTO schema_migrations (version, name, checksum, duration_ms) VALUES (?, ?, ?, ?)",
+            (migration["version"], migration["name"], migration["checksum"], duration_ms)
+        )
+        conn.execute("COMMIT")
+        return duration_ms
+
+    except Exception as e:
+        conn.execute("ROLLBACK")
+        raise MigrationError(f"{migration['version']}_{migration['name']}: {e}") from e
+
+
+def run_migrations(db_path: str = SQLITE_DB_PATH) -> Dict[str, Any]:
+    """Aplicar migrations pendentes; sem pendências custa apenas uma leitura"""
+    migrations = discover_migrations()
+    report = {"applied": [], "pending": 0, "total": len(migrations)}
+
+    conn = _connect(db_path)
+    try:
+        applied = get_applied_versions(conn)
+
+        for migration in migrations:
+            recorded = applied.get(migration["version"])
+            if recorded and recorded != migration["checksum"]:
+                logger.warning(f"⚠️ Migration {migration['version']}_{migration['name']} "
+                               f"foi alterada após ser aplicada")
+
+        pending = [m for m in migrations if m["version"] not in applied]
+        report["pending"] = len(pending)
+        if not pending:
+            logger.info(f"✅ Schema atualizado ({len(applied)} migrations aplicadas)")
+            return report
+
+        _ensure_migrations_table(conn)
+
+        for migration in pending:
+            duration_ms = _apply(conn, migration)
+            if duration_ms is None:
+                continue
+            report["applied"].append(f"{migration['version']}_{migration['name']}")
+            logger.info(f"🗃️ Migration {migration['version']}_{migration['name']} "
+                        f"aplicada em {duration_ms:.1f} ms")
+
+        return report
+
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "up"
+
+    if command == "status":
+        for item in migration_status():
+            mark = "✅" if item["applied"] else "⏳"
+            changed = " (alterada!)" if item["checksum_changed"] else ""
+            print(f"{mark} {item['version']}_{item['name']}{changed}")
+        return 0
+
+    if command == "up":
+        report = run_migrations()
+        print(f"🗃️ {len(report['applied'])} migration(s) aplicada(s)")
+
+        # Seed do admin junto com o deploy, fora do caminho de start dos workers
+        from app.utils.admin_utils import initialize_admin_system
+        initialize_admin_system()
+        return 0
+
+    if command == "reconcile":
+        from app.utils.counter_utils import reconcile_counters
+        report = reconcile_counters()
+        for item in report["drift"]:
+            print(f"⚠️ {item['entity']}.{item['dimension']}[{item['bucket']}]: "
+                  f"{item['stored']} → {item['actual']}")
+        print(f"🔧 {report['counters']} contador(es), {len(report['drift'])} divergência(s) corrigida(s)")
+        return 0
+
+    if command == "prune-logs":
+        from app.utils.retention_utils import prune_system_logs
+        report = prune_system_logs(float(argv[1])) if len(argv) > 1 else prune_system_logs()
+        for month, count in sorted(report["months"].items()):
+            print(f"🗄️ {month}: {count} linha(s) arquivada(s)")
+        for table in report["dropped_tables"]:
+            print(f"🗑️ {table} removida")
+        print(f"✂️ {report['archived']} linha(s) movidas para {report['archive']}")
+        return 0
+
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
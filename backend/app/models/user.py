@@ -1,11 +1,8 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, ForeignKey
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-from passlib.context import CryptContext
-import hashlib
 from app.database import Base
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.utils.password_utils import verify_password_blocking, hash_password_blocking
 
 
 class User(Base):
@@ -76,22 +73,13 @@ class User(Base):
     # manager = relationship("Manager", back_populates="user")
 
     def verify_password(self, plain_password: str) -> bool:
-        """Verificar senha com fallback"""
-        try:
-            return pwd_context.verify(plain_password, self.hashed_password)
-        except:
-            # Fallback para desenvolvimento
-            simple_hash = hashlib.sha256(plain_password.encode()).hexdigest()
-            return self.hashed_password == simple_hash
+        """Verificar senha no pool de bcrypt (aceita hash SHA-256 legado)"""
+        return verify_password_blocking(plain_password, self.hashed_password)[0]
 
     @classmethod
     def get_password_hash(cls, password: str) -> str:
-        """Gerar hash da senha com fallback"""
-        try:
-            return pwd_context.hash(password)
-        except:
-            # Fallback para desenvolvimento
-            return hashlib.sha256(password.encode()).hexdigest()
+        """Gerar hash da senha no pool de bcrypt"""
+        return hash_password_blocking(password)
 
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}', email='{self.email}')>"
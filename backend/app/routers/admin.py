@@ -1,14 +1,18 @@
-from fastapi import APIRouter, HTTPException, Request, Depends
-import sqlite3
+from fastapi import APIRouter, HTTPException, Request, Depends, Response
+import hashlib
 import json
 import logging
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import Optional, Dict, Any
 from app.utils.admin_utils import (
     get_system_logs, get_log_stats, backup_database,
-    get_dashboard_data, get_all_users, create_user
+    get_dashboard_data, get_all_users, create_user, compute_admin_stats
 )
 from app.utils.auth import require_admin
+from app.utils.backup_utils import start_backup, get_backup_job, list_backup_jobs
+from app.utils.counter_utils import reconcile_counters
+from app.utils.retention_utils import prune_system_logs
+from app.database import get_sqlite_connection, schema_registry, read_snapshot
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -19,67 +23,109 @@ router = APIRouter(
     tags=["admin"]
 )
 
+# Colunas de funcionários usadas pelas abas admin (mesmas do frontend)
+BOOTSTRAP_EMPLOYEE_FIELDS = "id,nome,email,cargo,equipe,status,area_id,team_id,manager_id"
 
-def get_db():
-    """Retorna conexão com banco gestao360.db com row_factory"""
-    conn = sqlite3.connect("gestao360.db")
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def safe_get_table_columns(db, table_name: str) -> List[str]:
-    """Obter colunas existentes de uma tabela de forma segura"""
-    try:
-        cursor = db.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = [row[1] for row in cursor.fetchall()]
-        return columns
-    except Exception as e:
-        logger.error(f"❌ Erro ao obter colunas da tabela {table_name}: {e}")
-        return []
+# Campos que mudam a cada chamada e não entram no ETag
+BOOTSTRAP_VOLATILE_FIELDS = {"last_updated", "last_check"}
 
 
 @router.get("/logs")
-async def get_logs(
+def get_logs(
         limit: int = 100,
         level: str = None,
+        since: str = None,
+        until: str = None,
+        search: str = None,
+        module: str = None,
+        route: str = None,
+        request_id: str = None,
+        source: str = "auto",
+        include_stats: bool = True,
         current_user: Dict[str, Any] = Depends(require_admin)
 ):
-    """Obter logs do sistema"""
-    logs = get_system_logs(limit, level)
-    stats = get_log_stats()
+    """Obter os últimos logs do sistema
+
+    ``source``: auto (buffer em memória quando suficiente), memory ou file.
+    since/until em ISO e ``search`` por substring; module filtra por prefixo.
+    """
+    result = get_system_logs(limit, level, since=since, until=until, search=search, module=module,
+                             route=route, request_id=request_id, source=source)
+    logs = result["logs"]
 
     return {
         "logs": logs,
-        "stats": stats,
+        "source": result["source"],
+        # Estatísticas leem o arquivo (só os bytes novos); desligar para zero I/O
+        "stats": get_log_stats() if include_stats else None,
         "total_returned": len(logs)
     }
 
 
 @router.post("/backup")
-async def create_backup(
+def create_backup(
         backup_name: str = None,
+        compress: bool = False,
+        wait: bool = False,
         current_user: Dict[str, Any] = Depends(require_admin)
 ):
-    """Criar backup do banco"""
-    result = backup_database(backup_name)
-    return result
+    """Criar backup do banco (em segundo plano; acompanhar em /admin/backup/{job_id})"""
+    if wait:
+        return backup_database(backup_name, compress)
+    return start_backup(backup_name, compress=compress)
+
+
+@router.get("/backups")
+def list_backups(current_user: Dict[str, Any] = Depends(require_admin)):
+    """Listar jobs de backup recentes"""
+    return {"jobs": list_backup_jobs()}
+
+
+@router.get("/backup/{job_id}")
+def get_backup_status(job_id: str, current_user: Dict[str, Any] = Depends(require_admin)):
+    """Progresso de um job de backup"""
+    job = get_backup_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job de backup não encontrado")
+    return job
+
+
+@router.post("/counters/reconcile")
+def reconcile_metric_counters(current_user: Dict[str, Any] = Depends(require_admin)):
+    """Reconstruir os contadores dos dashboards e relatar divergências"""
+    try:
+        return reconcile_counters()
+    except Exception as e:
+        logger.error(f"❌ Erro ao reconciliar contadores: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+
+@router.post("/logs/retention")
+def run_log_retention(retention_days: int = None, current_user: Dict[str, Any] = Depends(require_admin)):
+    """Arquivar agora as linhas de system_logs mais antigas que a retenção"""
+    try:
+        if retention_days is None:
+            return prune_system_logs()
+        return prune_system_logs(retention_days)
+    except Exception as e:
+        logger.error(f"❌ Erro na retenção de logs: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
 
 @router.get("/dashboard")
-async def get_admin_dashboard(current_user: Dict[str, Any] = Depends(require_admin)):
+def get_admin_dashboard(current_user: Dict[str, Any] = Depends(require_admin)):
     """Obter dados do dashboard administrativo"""
     return get_dashboard_data()
 
 
 @router.get("/users")
-async def list_users(current_user: Dict[str, Any] = Depends(require_admin)):
+def list_users(current_user: Dict[str, Any] = Depends(require_admin)):
     """Listar todos os usuários"""
     return get_all_users()
 
 
 @router.post("/users")
-async def create_new_user(
+def create_new_user(
         user_data: Dict[str, Any],
         current_user: Dict[str, Any] = Depends(require_admin)
 ):
@@ -87,15 +133,21 @@ async def create_new_user(
     return create_user(user_data)
 
 @router.get("/stats")
-async def get_admin_stats():
+def get_admin_stats():
     """Obter estatísticas administrativas com fallback gracioso"""
     try:
         logger.info("🔍 Obtendo estatísticas administrativas com fallback")
 
-        db = get_db()
-        cursor = db.cursor()
+        # Uma consulta agregada para todas as tabelas, servida do cache enquanto não houver escrita
+        stats = compute_admin_stats()
+
+        logger.info("✅ Estatísticas obtidas com sucesso")
+        return stats
 
-        stats = {
+    except Exception as e:
+        logger.error(f"❌ Erro ao obter estatísticas: {e}")
+        return {
+            "error": str(e),
             "employees": {"total": 0, "active": 0, "inactive": 0},
             "teams": {"total": 0, "active": 0, "inactive": 0},
             "areas": {"total": 0, "active": 0, "inactive": 0},
@@ -105,168 +157,106 @@ async def get_admin_stats():
             "summary": {
                 "total_records": 0,
                 "completion_rate": 0,
-                "system_health": "healthy",
+                "system_health": "error",
                 "last_updated": datetime.now().isoformat()
             }
         }
 
-        # EMPLOYEES
-        try:
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='employees'")
-            if cursor.fetchone():
-                cursor.execute("SELECT COUNT(*) as total FROM employees")
-                result = cursor.fetchone()
-                stats["employees"]["total"] = result[0] if result else 0
-
-                # Verificar se campo status existe
-                columns = safe_get_table_columns(db, "employees")
-                if "status" in columns:
-                    cursor.execute("SELECT COUNT(*) as active FROM employees WHERE status = 'ATIVO'")
-                    result = cursor.fetchone()
-                    stats["employees"]["active"] = result[0] if result else 0
-
-                    cursor.execute("SELECT COUNT(*) as inactive FROM employees WHERE status = 'INATIVO'")
-                    result = cursor.fetchone()
-                    stats["employees"]["inactive"] = result[0] if result else 0
-        except Exception as e:
-            logger.warning(f"⚠️ Erro employees stats: {e}")
 
-        # TEAMS
-        try:
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='teams'")
-            if cursor.fetchone():
-                cursor.execute("SELECT COUNT(*) as total FROM teams")
-                result = cursor.fetchone()
-                stats["teams"]["total"] = result[0] if result else 0
-
-                # Verificar se campo ativo existe
-                columns = safe_get_table_columns(db, "teams")
-                if "ativo" in columns:
-                    cursor.execute("SELECT COUNT(*) as active FROM teams WHERE ativo = 1")
-                    result = cursor.fetchone()
-                    stats["teams"]["active"] = result[0] if result else 0
-
-                    cursor.execute("SELECT COUNT(*) as inactive FROM teams WHERE ativo = 0")
-                    result = cursor.fetchone()
-                    stats["teams"]["inactive"] = result[0] if result else 0
-        except Exception as e:
-            logger.warning(f"⚠️ Erro teams stats: {e}")
+def _bootstrap_sections(employee_fields: str) -> Dict[str, Any]:
+    """Seções disponíveis no /admin/bootstrap → função que produz cada uma"""
+    from app.routers.areas import get_areas
+    from app.routers.teams import get_teams
+    from app.routers.employees import get_employees
+    from app.routers.managers import get_managers
+    from app.routers.knowledge import get_knowledge
 
-        # AREAS
-        try:
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='areas'")
-            if cursor.fetchone():
-                cursor.execute("SELECT COUNT(*) as total FROM areas")
-                result = cursor.fetchone()
-                stats["areas"]["total"] = result[0] if result else 0
-
-                # Verificar se campo ativa existe
-                columns = safe_get_table_columns(db, "areas")
-                if "ativa" in columns:
-                    cursor.execute("SELECT COUNT(*) as active FROM areas WHERE ativa = 1")
-                    result = cursor.fetchone()
-                    stats["areas"]["active"] = result[0] if result else 0
-
-                    cursor.execute("SELECT COUNT(*) as inactive FROM areas WHERE ativa = 0")
-                    result = cursor.fetchone()
-                    stats["areas"]["inactive"] = result[0] if result else 0
-        except Exception as e:
-            logger.warning(f"⚠️ Erro areas stats: {e}")
+    def employees():
+        result = get_employees(status=None, area_id=None, team_id=None, search=None, limit=None,
+                               cursor=None, fields=employee_fields, include_total=False)
+        return result["employees"]
 
-        # MANAGERS
-        try:
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='managers'")
-            if cursor.fetchone():
-                columns = safe_get_table_columns(db, "managers")
-                where_clause = "WHERE ativo = 1" if "ativo" in columns else ""
-                cursor.execute(f"SELECT COUNT(*) as total FROM managers {where_clause}")
-                result = cursor.fetchone()
-                stats["managers"]["total"] = result[0] if result else 0
-        except Exception as e:
-            logger.warning(f"⚠️ Erro managers stats: {e}")
+    def stats():
+        # Sem o cache TTL: ele guarda números lidos em outra conexão, fora deste snapshot
+        return compute_admin_stats.__wrapped__()
 
-        # KNOWLEDGE
-        try:
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='knowledge'")
-            if cursor.fetchone():
-                cursor.execute("SELECT COUNT(*) as total FROM knowledge")
-                result = cursor.fetchone()
-                stats["knowledge"]["total"] = result[0] if result else 0
-        except Exception as e:
-            logger.warning(f"⚠️ Erro knowledge stats: {e}")
+    return {
+        "areas": get_areas,
+        "teams": get_teams,
+        "employees": employees,
+        "managers": get_managers,
+        "knowledge": get_knowledge,
+        "stats": stats,
+        "health": get_admin_health,
+    }
 
-        # EMPLOYEE_KNOWLEDGE
-        try:
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='employee_knowledge'")
-            if cursor.fetchone():
-                cursor.execute("SELECT COUNT(*) as total FROM employee_knowledge")
-                result = cursor.fetchone()
-                stats["employee_knowledge"]["total"] = result[0] if result else 0
-
-                # Verificar se campo status existe
-                columns = safe_get_table_columns(db, "employee_knowledge")
-                if "status" in columns:
-                    cursor.execute("SELECT COUNT(*) as desejado FROM employee_knowledge WHERE status = 'DESEJADO'")
-                    result = cursor.fetchone()
-                    stats["employee_knowledge"]["desejado"] = result[0] if result else 0
-
-                    cursor.execute(
-                        "SELECT COUNT(*) as obrigatorio FROM employee_knowledge WHERE status = 'OBRIGATORIO'")
-                    result = cursor.fetchone()
-                    stats["employee_knowledge"]["obrigatorio"] = result[0] if result else 0
-
-                    cursor.execute("SELECT COUNT(*) as obtido FROM employee_knowledge WHERE status = 'OBTIDO'")
-                    result = cursor.fetchone()
-                    stats["employee_knowledge"]["obtido"] = result[0] if result else 0
-        except Exception as e:
-            logger.warning(f"⚠️ Erro employee_knowledge stats: {e}")
 
-        # SUMMARY
-        total_records = (
-                stats["employees"]["total"] +
-                stats["teams"]["total"] +
-                stats["areas"]["total"] +
-                stats["managers"]["total"] +
-                stats["knowledge"]["total"] +
-                stats["employee_knowledge"]["total"]
-        )
+def _bootstrap_etag(payload: Dict[str, Any]) -> str:
+    """ETag do conteúdo, ignorando carimbos de data/hora"""
+    def strip(value):
+        if isinstance(value, dict):
+            return {k: strip(v) for k, v in value.items() if k not in BOOTSTRAP_VOLATILE_FIELDS}
+        if isinstance(value, list):
+            return [strip(v) for v in value]
+        return value
 
-        stats["summary"]["total_records"] = total_records
+    raw = json.dumps(strip(payload), sort_keys=True, default=str, separators=(",", ":"))
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest() + '"'
 
-        if stats["employee_knowledge"]["total"] > 0:
-            completion_rate = (stats["employee_knowledge"]["obtido"] / stats["employee_knowledge"]["total"]) * 100
-            stats["summary"]["completion_rate"] = round(completion_rate, 2)
 
-        cursor.close()
-        db.close()
+@router.get("/bootstrap")
+def get_admin_bootstrap(
+        request: Request,
+        include: Optional[str] = None,
+        employee_fields: str = BOOTSTRAP_EMPLOYEE_FIELDS
+):
+    """Dados iniciais da tela admin em uma chamada e um único snapshot do banco
+
+    ``include`` escolhe as seções (padrão: todas). Responde 304 quando o
+    ``If-None-Match`` enviado ainda corresponde ao conteúdo atual.
+    """
+    sections = _bootstrap_sections(employee_fields)
+
+    requested = [name.strip() for name in include.split(",") if name.strip()] if include else list(sections)
+    ignored = [name for name in requested if name not in sections]
+
+    payload = {}
+    errors = {}
+    # Todas as seções leem a mesma transação: números e listas ficam coerentes entre si
+    with read_snapshot():
+        for name in requested:
+            if name not in sections:
+                continue
+            try:
+                payload[name] = sections[name]()
+            except HTTPException as e:
+                errors[name] = e.detail
+            except Exception as e:
+                logger.error(f"❌ Erro na seção '{name}' do bootstrap: {e}")
+                errors[name] = str(e)
 
-        logger.info("✅ Estatísticas obtidas com sucesso")
-        return stats
+    if errors:
+        payload["errors"] = errors
+    if ignored:
+        payload["ignored_sections"] = ignored
 
-    except Exception as e:
-        logger.error(f"❌ Erro ao obter estatísticas: {e}")
-        return {
-            "error": str(e),
-            "employees": {"total": 0, "active": 0, "inactive": 0},
-            "teams": {"total": 0, "active": 0, "inactive": 0},
-            "areas": {"total": 0, "active": 0, "inactive": 0},
-            "managers": {"total": 0},
-            "knowledge": {"total": 0},
-            "employee_knowledge": {"total": 0, "desejado": 0, "obrigatorio": 0, "obtido": 0},
-            "summary": {
-                "total_records": 0,
-                "completion_rate": 0,
-                "system_health": "error",
-                "last_updated": datetime.now().isoformat()
-            }
-        }
+    etag = _bootstrap_etag(payload)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    # JSON compacto (sem espaços) em uma única serialização
+    body = json.dumps(payload, default=str, ensure_ascii=False, separators=(",", ":"))
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.get("/health")
-async def get_admin_health():
+def get_admin_health():
     """Verificar saúde do sistema com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Testar conexão com banco
@@ -284,11 +274,7 @@ async def get_admin_health():
         }
 
         for table in tables_check.keys():
-            try:
-                cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table}'")
-                tables_check[table] = cursor.fetchone() is not None
-            except:
-                pass
+            tables_check[table] = schema_registry.has_table(table)
 
         all_tables_exist = all(tables_check.values())
 
@@ -315,10 +301,10 @@ async def get_admin_health():
 
 
 @router.get("/dashboard-data")
-async def get_dashboard_data(limit: int = 5):
+def get_dashboard_data(limit: int = 5):
     """Obter dados para dashboard administrativo"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         dashboard = {
@@ -331,9 +317,8 @@ async def get_dashboard_data(limit: int = 5):
 
         # RECENT EMPLOYEES
         try:
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='employees'")
-            if cursor.fetchone():
-                columns = safe_get_table_columns(db, "employees")
+            if schema_registry.has_table("employees"):
+                columns = schema_registry.columns("employees")
 
                 # Campos disponíveis
                 available_fields = [col for col in columns if
@@ -364,9 +349,8 @@ async def get_dashboard_data(limit: int = 5):
 
         # RECENT TEAMS
         try:
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='teams'")
-            if cursor.fetchone():
-                columns = safe_get_table_columns(db, "teams")
+            if schema_registry.has_table("teams"):
+                columns = schema_registry.columns("teams")
 
                 # Campos disponíveis
                 available_fields = [col for col in columns if
@@ -387,9 +371,8 @@ async def get_dashboard_data(limit: int = 5):
 
         # RECENT AREAS
         try:
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='areas'")
-            if cursor.fetchone():
-                columns = safe_get_table_columns(db, "areas")
+            if schema_registry.has_table("areas"):
+                columns = schema_registry.columns("areas")
 
                 # Campos disponíveis
                 available_fields = [col for col in columns if
@@ -410,9 +393,8 @@ async def get_dashboard_data(limit: int = 5):
 
         # RECENT KNOWLEDGE
         try:
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='knowledge'")
-            if cursor.fetchone():
-                columns = safe_get_table_columns(db, "knowledge")
+            if schema_registry.has_table("knowledge"):
+                columns = schema_registry.columns("knowledge")
 
                 # Campos disponíveis
                 available_fields = [col for col in columns if
@@ -445,23 +427,19 @@ async def get_dashboard_data(limit: int = 5):
 
 
 @router.get("/system-info")
-async def get_system_info():
+def get_system_info():
     """Obter informações do sistema"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar versão SQLite
         cursor.execute("SELECT sqlite_version()")
         sqlite_version = cursor.fetchone()[0]
 
-        # Contar tabelas
-        cursor.execute("SELECT COUNT(*) as count FROM sqlite_master WHERE type ='table' AND name NOT LIKE 'sqlite_%'")
-        tables_count = cursor.fetchone()[0]
-
-        # Listar tabelas
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
-        table_names = [row[0] for row in cursor.fetchall()]
+        # Listar e contar tabelas
+        table_names = schema_registry.tables()
+        tables_count = len(table_names)
 
         cursor.close()
         db.close()
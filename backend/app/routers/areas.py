@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, Request
-import sqlite3
 import json
 import logging
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import Optional, Dict, Any
+from app.database import get_sqlite_connection, schema_registry
+from app.utils.counter_utils import read_counters
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -15,37 +16,17 @@ router = APIRouter(
 )
 
 
-def get_db():
-    """Retorna conexão com banco gestao360.db com row_factory"""
-    conn = sqlite3.connect("gestao360.db")
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def safe_get_table_columns(db, table_name: str) -> List[str]:
-    """Obter colunas existentes de uma tabela de forma segura"""
-    try:
-        cursor = db.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = [row[1] for row in cursor.fetchall()]
-        return columns
-    except Exception as e:
-        logger.error(f"❌ Erro ao obter colunas da tabela {table_name}: {e}")
-        return []
-
-
 @router.get("/")
-async def get_areas():
+def get_areas():
     """Listar todas as áreas com fallback gracioso"""
     try:
         logger.info("🔍 Buscando áreas com fallback gracioso")
 
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela areas existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='areas'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("areas"):
             logger.warning("⚠️ Tabela areas não existe")
             return {
                 "error": "Tabela areas não existe. Execute a migration primeiro.",
@@ -54,7 +35,7 @@ async def get_areas():
             }
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "areas")
+        columns = schema_registry.columns("areas")
 
         # Campos básicos obrigatórios
         basic_columns = ["id", "nome", "sigla"]
@@ -105,19 +86,18 @@ async def get_areas():
 
 
 @router.get("/{area_id}")
-async def get_area(area_id: int):
+def get_area(area_id: int):
     """Buscar área por ID com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='areas'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("areas"):
             raise HTTPException(status_code=500, detail="Tabela areas não existe")
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "areas")
+        columns = schema_registry.columns("areas")
 
         # Campos disponíveis
         available_fields = [col for col in columns if col in [
@@ -163,7 +143,7 @@ async def get_area(area_id: int):
 
 
 @router.post("/")
-async def create_area(area_data: Dict[Any, Any]):
+def create_area(area_data: Dict[Any, Any]):
     """Criar nova área com fallback gracioso"""
     try:
         # Validações básicas
@@ -172,12 +152,11 @@ async def create_area(area_data: Dict[Any, Any]):
             if not area_data.get(field):
                 raise HTTPException(status_code=400, detail=f"{field} é obrigatório")
 
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='areas'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("areas"):
             raise HTTPException(status_code=500, detail="Tabela areas não existe")
 
         # Verificar se sigla já existe
@@ -186,7 +165,7 @@ async def create_area(area_data: Dict[Any, Any]):
             raise HTTPException(status_code=400, detail="Sigla já está em uso")
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "areas")
+        columns = schema_registry.columns("areas")
 
         # Preparar dados
         fields = []
@@ -258,10 +237,10 @@ async def create_area(area_data: Dict[Any, Any]):
 
 
 @router.put("/{area_id}")
-async def update_area(area_id: int, area_data: Dict[Any, Any]):
+def update_area(area_id: int, area_data: Dict[Any, Any]):
     """Atualizar área com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se área existe
@@ -279,7 +258,7 @@ async def update_area(area_id: int, area_data: Dict[Any, Any]):
             area_data["sigla"] = new_sigla  # Atualizar no dict
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "areas")
+        columns = schema_registry.columns("areas")
 
         # Preparar campos para atualizar
         set_clauses = []
@@ -338,10 +317,10 @@ async def update_area(area_id: int, area_data: Dict[Any, Any]):
 
 
 @router.delete("/{area_id}")
-async def delete_area(area_id: int):
+def delete_area(area_id: int):
     """Deletar área com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se área existe
@@ -382,13 +361,13 @@ async def delete_area(area_id: int):
 # ============================================================================
 
 @router.patch("/{area_id}/toggle-active")
-async def toggle_area_active(area_id: int):
+def toggle_area_active(area_id: int):
     """Alternar status ativa/inativa da área"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
-        columns = safe_get_table_columns(db, "areas")
+        columns = schema_registry.columns("areas")
 
         if "ativa" not in columns:
             raise HTTPException(status_code=400, detail="Campo 'ativa' não existe na tabela")
@@ -433,18 +412,17 @@ async def toggle_area_active(area_id: int):
 
 
 @router.get("/{area_id}/teams")
-async def get_area_teams(area_id: int):
+def get_area_teams(area_id: int):
     """Obter equipes de uma área"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela teams existe e tem campo area_id
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='teams'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("teams"):
             return []
 
-        team_columns = safe_get_table_columns(db, "teams")
+        team_columns = schema_registry.columns("teams")
         if "area_id" not in team_columns:
             return []
 
@@ -470,18 +448,17 @@ async def get_area_teams(area_id: int):
 
 
 @router.get("/{area_id}/employees")
-async def get_area_employees(area_id: int):
+def get_area_employees(area_id: int):
     """Obter funcionários de uma área"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela employees existe e tem campo area_id
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='employees'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("employees"):
             return []
 
-        emp_columns = safe_get_table_columns(db, "employees")
+        emp_columns = schema_registry.columns("employees")
         if "area_id" not in emp_columns:
             return []
 
@@ -507,18 +484,17 @@ async def get_area_employees(area_id: int):
 
 
 @router.get("/{area_id}/managers")
-async def get_area_managers(area_id: int):
+def get_area_managers(area_id: int):
     """Obter gerentes de uma área"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela managers existe e tem campo area_id
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='managers'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("managers"):
             return []
 
-        mgr_columns = safe_get_table_columns(db, "managers")
+        mgr_columns = schema_registry.columns("managers")
         if "area_id" not in mgr_columns:
             return []
 
@@ -548,15 +524,14 @@ async def get_area_managers(area_id: int):
 
 
 @router.get("/stats/summary")
-async def get_areas_stats():
+def get_areas_stats():
     """Obter estatísticas das áreas"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='areas'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("areas"):
             return {
                 "total": 0,
                 "active": 0,
@@ -564,7 +539,7 @@ async def get_areas_stats():
                 "by_priority": []
             }
 
-        columns = safe_get_table_columns(db, "areas")
+        columns = schema_registry.columns("areas")
 
         stats = {
             "total": 0,
@@ -573,17 +548,25 @@ async def get_areas_stats():
             "by_priority": []
         }
 
-        # Total
-        cursor.execute("SELECT COUNT(*) FROM areas")
-        stats["total"] = cursor.fetchone()[0]
-
-        # Por status (se campo existir)
-        if "ativa" in columns:
-            cursor.execute("SELECT COUNT(*) FROM areas WHERE ativa = 1")
-            stats["active"] = cursor.fetchone()[0]
-
-            cursor.execute("SELECT COUNT(*) FROM areas WHERE ativa = 0")
-            stats["inactive"] = cursor.fetchone()[0]
+        # Contadores materializados para total/status; prioridade não é contada
+        counters = read_counters(db, "areas")
+        if counters is not None:
+            counters = counters["areas"]
+            stats["total"] = counters["total"]
+            stats["active"] = counters["ativa"].get(1, 0)
+            stats["inactive"] = counters["ativa"].get(0, 0)
+        else:
+            # Total
+            cursor.execute("SELECT COUNT(*) FROM areas")
+            stats["total"] = cursor.fetchone()[0]
+
+            # Por status (se campo existir)
+            if "ativa" in columns:
+                cursor.execute("SELECT COUNT(*) FROM areas WHERE ativa = 1")
+                stats["active"] = cursor.fetchone()[0]
+
+                cursor.execute("SELECT COUNT(*) FROM areas WHERE ativa = 0")
+                stats["inactive"] = cursor.fetchone()[0]
 
         # Por prioridade (se campo existir)
         if "prioridade" in columns:
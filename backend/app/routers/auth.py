@@ -1,12 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import datetime
 import hashlib
-import time
+from types import SimpleNamespace
 
 from app.database import get_db
 from app.models.user import User
+from app.utils.auth import (
+    create_access_token, create_session_data, find_user_sqlite, oauth2_scheme, revoke_token
+)
+from app.utils.login_utils import record_login
+from app.utils.password_utils import PasswordPoolSaturated, verify_password_async
+from app.utils.permission_utils import expand_permissions, role_of
+from app.utils.ratelimit_utils import consume, retry_after_header
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 
@@ -36,11 +44,16 @@ class UserResponse(BaseModel):
 
 
 # ✅ UTILITÁRIOS
-def create_simple_token(username: str) -> str:
-    """Gerar token simples"""
-    timestamp = str(int(time.time()))
-    token_data = f"{username}:{timestamp}"
-    return hashlib.sha256(token_data.encode()).hexdigest()
+def session_user(user) -> dict:
+    """Campos do usuário (SQLite, ORM ou fake do bypass) usados no token"""
+    return {
+        "id": getattr(user, 'id', 1),
+        "username": getattr(user, 'username', 'admin'),
+        "email": getattr(user, 'email', 'admin@gestao360.com'),
+        "is_admin": getattr(user, 'is_admin', True),
+        "permissions": getattr(user, 'permissions', None),
+        "permission_mask": getattr(user, 'permission_mask', None),
+    }
 
 
 def authenticate_user(db: Session, username: str, password: str):
@@ -99,11 +112,30 @@ def authenticate_user(db: Session, username: str, password: str):
                 print("🔓 Retornando usuário fake para bypass")
                 return FakeUser()
 
-    # Autenticação normal (não será usada com bypass)
-    print("❌ Bypass não ativo - credenciais incorretas")
+    # Autenticação normal: feita por verify_credentials
+    print("❌ Bypass não ativo - verificando credenciais")
     return False
 
 
+async def verify_credentials(username: str, password: str):
+    """Autenticação normal: banco no threadpool, bcrypt no pool dedicado
+
+    O handler não segura nenhuma thread enquanto o bcrypt roda, então uma
+    rajada de logins não enfileira os demais requests.
+    """
+    user = await run_in_threadpool(find_user_sqlite, username)
+    if not user or not user.get("is_active", True):
+        return None
+
+    valid, new_hash = await verify_password_async(password, user["hashed_password"])
+    if not valid:
+        return None
+
+    # Só memória: last_login/login_count são gravados em lote pelo login_utils
+    record_login(user["id"], new_hash)
+    return SimpleNamespace(**user)
+
+
 # ✅ ROTA DE LOGIN
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
@@ -114,8 +146,19 @@ async def login_for_access_token(
     print(f"🔐 === TENTATIVA DE LOGIN ===")
     print(f"🔐 Usuário: {form_data.username}")
 
+    # Bucket por conta tentada (o por IP já foi checado no middleware)
+    retry_after = consume("login", "user", form_data.username.strip().lower())
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas de login para este usuário, tente novamente",
+            headers=retry_after_header(retry_after),
+        )
+
     try:
-        user = authenticate_user(db, form_data.username, form_data.password)
+        user = await run_in_threadpool(authenticate_user, db, form_data.username, form_data.password)
+        if not user:
+            user = await verify_credentials(form_data.username, form_data.password)
         if not user:
             print(f"❌ Falha na autenticação para: {form_data.username}")
             raise HTTPException(
@@ -124,21 +167,22 @@ async def login_for_access_token(
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        # Gerar token
-        access_token = create_simple_token(user.username)
+        # Gerar token (JWT com as permissões compiladas em perm_mask)
+        session = create_session_data(session_user(user))
+        access_token = create_access_token(session)
 
         # Resposta de sucesso
         response_data = {
             "access_token": access_token,
             "token_type": "bearer",
             "user": {
-                "id": getattr(user, 'id', 1),
-                "username": getattr(user, 'username', 'admin'),
-                "email": getattr(user, 'email', 'admin@gestao360.com'),
-                "role": "admin" if getattr(user, 'is_admin', True) else "user",
-                "is_admin": getattr(user, 'is_admin', True),
+                "id": session["user_id"],
+                "username": session["sub"],
+                "email": session["email"],
+                "role": role_of(session),
+                "is_admin": session["is_admin"],
                 "is_active": getattr(user, 'is_active', True),
-                "permissions": {}
+                "permissions": expand_permissions(session["perm_mask"])
             }
         }
 
@@ -149,6 +193,13 @@ async def login_for_access_token(
 
     except HTTPException:
         raise
+    except PasswordPoolSaturated:
+        # Back-pressure: pool de bcrypt cheio, o cliente tenta de novo em instantes
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitos logins simultâneos, tente novamente",
+            headers={"Retry-After": "1"},
+        )
     except Exception as e:
         print(f"❌ ERRO INTERNO no login: {e}")
         raise HTTPException(
@@ -157,6 +208,13 @@ async def login_for_access_token(
         )
 
 
+@router.post("/logout")
+def logout(token: Optional[str] = Depends(oauth2_scheme)):
+    """Revogar o token atual: o cache de tokens verificados deixa de aceitá-lo"""
+    revoked = revoke_token(token) if token else False
+    return {"message": "Logout realizado", "revoked": revoked}
+
+
 @router.get("/health")
 async def auth_health():
     """Health check"""
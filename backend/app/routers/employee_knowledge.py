@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, Request
-import sqlite3
 import json
 import logging
 from datetime import datetime, date
-from typing import List, Optional, Dict, Any
+from typing import Optional, Dict, Any
+from app.database import get_sqlite_connection, schema_registry
+from app.utils.counter_utils import read_counters, ranked_buckets
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -15,37 +16,17 @@ router = APIRouter(
 )
 
 
-def get_db():
-    """Retorna conexão com banco gestao360.db com row_factory"""
-    conn = sqlite3.connect("gestao360.db")
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def safe_get_table_columns(db, table_name: str) -> List[str]:
-    """Obter colunas existentes de uma tabela de forma segura"""
-    try:
-        cursor = db.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = [row[1] for row in cursor.fetchall()]
-        return columns
-    except Exception as e:
-        logger.error(f"❌ Erro ao obter colunas da tabela {table_name}: {e}")
-        return []
-
-
 @router.get("/")
-async def get_employee_knowledge():
+def get_employee_knowledge():
     """Listar todos os vínculos employee-knowledge com fallback gracioso"""
     try:
         logger.info("🔍 Buscando vínculos employee-knowledge com fallback gracioso")
 
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela employee_knowledge existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='employee_knowledge'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("employee_knowledge"):
             logger.warning("⚠️ Tabela employee_knowledge não existe")
             return {
                 "error": "Tabela employee_knowledge não existe. Execute a migration primeiro.",
@@ -54,17 +35,15 @@ async def get_employee_knowledge():
             }
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "employee_knowledge")
+        columns = schema_registry.columns("employee_knowledge")
 
         # Verificar se tabelas relacionadas existem
         employees_exists = False
         knowledge_exists = False
 
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='employees'")
-        employees_exists = cursor.fetchone() is not None
+        employees_exists = schema_registry.has_table("employees")
 
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='knowledge'")
-        knowledge_exists = cursor.fetchone() is not None
+        knowledge_exists = schema_registry.has_table("knowledge")
 
         # Query base
         base_fields = ["ek.id", "ek.employee_id", "ek.learning_item_id", "ek.status", "ek.prioridade"]
@@ -132,24 +111,22 @@ async def get_employee_knowledge():
 
 
 @router.get("/employee/{employee_id}")
-async def get_employee_knowledge_by_employee(employee_id: int):
+def get_employee_knowledge_by_employee(employee_id: int):
     """Buscar conhecimentos de um funcionário específico"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='employee_knowledge'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("employee_knowledge"):
             return []
 
         # Verificar se tabela knowledge existe
         knowledge_exists = False
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='knowledge'")
-        knowledge_exists = cursor.fetchone() is not None
+        knowledge_exists = schema_registry.has_table("knowledge")
 
         # Obter colunas existentes
-        ek_columns = safe_get_table_columns(db, "employee_knowledge")
+        ek_columns = schema_registry.columns("employee_knowledge")
 
         # Query base
         base_fields = ["ek.*"]
@@ -197,7 +174,7 @@ async def get_employee_knowledge_by_employee(employee_id: int):
 
 
 @router.post("/")
-async def create_employee_knowledge(link_data: Dict[Any, Any]):
+def create_employee_knowledge(link_data: Dict[Any, Any]):
     """Criar novo vínculo employee-knowledge com fallback gracioso"""
     try:
         # Validações básicas
@@ -206,12 +183,11 @@ async def create_employee_knowledge(link_data: Dict[Any, Any]):
             if not link_data.get(field):
                 raise HTTPException(status_code=400, detail=f"{field} é obrigatório")
 
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='employee_knowledge'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("employee_knowledge"):
             raise HTTPException(status_code=500, detail="Tabela employee_knowledge não existe")
 
         # Verificar se vínculo já existe
@@ -226,7 +202,7 @@ async def create_employee_knowledge(link_data: Dict[Any, Any]):
             raise HTTPException(status_code=400, detail="Vínculo já existe para este funcionário e conhecimento")
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "employee_knowledge")
+        columns = schema_registry.columns("employee_knowledge")
 
         # Preparar dados
         fields = []
@@ -308,10 +284,10 @@ async def create_employee_knowledge(link_data: Dict[Any, Any]):
 
 
 @router.put("/{link_id}")
-async def update_employee_knowledge(link_id: int, link_data: Dict[Any, Any]):
+def update_employee_knowledge(link_id: int, link_data: Dict[Any, Any]):
     """Atualizar vínculo employee-knowledge com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se vínculo existe
@@ -320,7 +296,7 @@ async def update_employee_knowledge(link_id: int, link_data: Dict[Any, Any]):
             raise HTTPException(status_code=404, detail="Vínculo não encontrado")
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "employee_knowledge")
+        columns = schema_registry.columns("employee_knowledge")
 
         # Preparar campos para atualizar
         set_clauses = []
@@ -387,10 +363,10 @@ async def update_employee_knowledge(link_id: int, link_data: Dict[Any, Any]):
 
 
 @router.delete("/{link_id}")
-async def delete_employee_knowledge(link_id: int):
+def delete_employee_knowledge(link_id: int):
     """Deletar vínculo employee-knowledge com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se vínculo existe
@@ -426,17 +402,26 @@ async def delete_employee_knowledge(link_id: int):
 # ============================================================================
 
 @router.get("/stats/by-status")
-async def get_stats_by_status():
+def get_stats_by_status():
     """Obter estatísticas por status"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
-        columns = safe_get_table_columns(db, "employee_knowledge")
+        columns = schema_registry.columns("employee_knowledge")
 
         if "status" not in columns:
             return []
 
+        # Contadores materializados mantidos por triggers
+        counters = read_counters(db, "employee_knowledge")
+        if counters is not None:
+            buckets = counters["employee_knowledge"]["status"]
+            cursor.close()
+            db.close()
+            return [{"status": status, "count": count}
+                    for status, count in ranked_buckets(buckets, include_null=True)]
+
         cursor.execute("""
                        SELECT status, COUNT(*) as count
                        FROM employee_knowledge
@@ -457,17 +442,25 @@ async def get_stats_by_status():
 
 
 @router.get("/stats/by-priority")
-async def get_stats_by_priority():
+def get_stats_by_priority():
     """Obter estatísticas por prioridade"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
-        columns = safe_get_table_columns(db, "employee_knowledge")
+        columns = schema_registry.columns("employee_knowledge")
 
         if "prioridade" not in columns:
             return []
 
+        counters = read_counters(db, "employee_knowledge")
+        if counters is not None:
+            buckets = counters["employee_knowledge"]["prioridade"]
+            cursor.close()
+            db.close()
+            return [{"prioridade": prioridade, "count": count}
+                    for prioridade, count in ranked_buckets(buckets, include_null=True)]
+
         cursor.execute("""
                        SELECT prioridade, COUNT(*) as count
                        FROM employee_knowledge
@@ -488,16 +481,15 @@ async def get_stats_by_priority():
 
 
 @router.get("/knowledge/{knowledge_id}/employees")
-async def get_knowledge_employees(knowledge_id: int):
+def get_knowledge_employees(knowledge_id: int):
     """Obter funcionários que têm/querem um conhecimento específico"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela employees existe
         employees_exists = False
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='employees'")
-        employees_exists = cursor.fetchone() is not None
+        employees_exists = schema_registry.has_table("employees")
 
         # Query base
         query = "SELECT ek.*"
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
 from typing import List, Optional, Dict, Any
+import base64
 import json
-import sqlite3
 from datetime import datetime, date, timedelta
 import logging
 import traceback
+from app.database import get_sqlite_connection, get_write_generation, schema_registry
+from app.utils.audit_utils import enqueue_system_log
+from app.utils.cache_utils import TTLCache
+from app.utils.search_utils import build_fts_query
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -20,126 +24,35 @@ router = APIRouter(
 # 🔧 SISTEMA DE FALLBACK E LOG DE ERROS
 # ============================================================================
 
-def get_db():
-    """Retorna conexão com banco gestao360.db com row_factory"""
-    conn = sqlite3.connect("gestao360.db")
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
 def log_system_error(db, error_type: str, description: str, details: Dict = None):
-    """Log de erros do sistema para monitoramento admin"""
+    """Log de erros do sistema para monitoramento admin (gravado em lote pela fila)"""
     try:
-        cursor = db.cursor()
-
-        # Verificar se tabela system_logs existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='system_logs'")
-        if cursor.fetchone():
-            cursor.execute("""
-                           INSERT INTO system_logs
-                           (employee_id, action_type, action_description, metadata, user_who_made_change, created_at)
-                           VALUES (NULL, ?, ?, ?, 'SISTEMA', datetime('now'))
-                           """, (
-                               error_type,
-                               description,
-                               json.dumps(details or {}, ensure_ascii=False)
-                           ))
-            db.commit()
-        else:
-            # Se não existe, criar arquivo de log
-            with open("system_errors.log", "a") as f:
-                f.write(f"{datetime.now().isoformat()} - {error_type}: {description}\n")
-                if details:
-                    f.write(f"Detalhes: {json.dumps(details, ensure_ascii=False)}\n")
-                f.write("---\n")
+        if not enqueue_system_log(None, error_type, description, user="SISTEMA", metadata=details or {}):
+            logger.error(f"❌ Fila de logs cheia, erro não registrado: {error_type}")
 
         logger.warning(f"⚠️ Sistema: {error_type} - {description}")
     except Exception as e:
         logger.error(f"❌ Erro ao criar log de erro: {e}")
 
 
-def safe_get_table_columns(db, table_name: str) -> List[str]:
-    """Obter colunas existentes de uma tabela de forma segura"""
-    try:
-        cursor = db.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = [row[1] for row in cursor.fetchall()]
-        return columns
-    except Exception as e:
-        logger.error(f"❌ Erro ao obter colunas da tabela {table_name}: {e}")
-        return []
-
-
 def create_system_log_safe(db, employee_id: int, action_type: str, description: str, user: str = "Sistema",
                            old_data: Dict = None, new_data: Dict = None, metadata: Dict = None):
-    """Criar log no sistema de forma segura (ignora se tabela não existe)"""
-    try:
-        cursor = db.cursor()
-
-        # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='system_logs'")
-        if not cursor.fetchone():
-            log_system_error(db, "MISSING_TABLE", f"Tabela system_logs não existe - ação {action_type} não foi logada",
-                             {
-                                 "employee_id": employee_id,
-                                 "action": action_type,
-                                 "description": description
-                             })
-            return False
-
-        # Verificar colunas existentes
-        columns = safe_get_table_columns(db, "system_logs")
-        required_columns = ["employee_id", "action_type", "action_description", "created_at"]
+    """Criar log no sistema de forma segura, sem escrever no banco durante o request
 
-        missing_columns = [col for col in required_columns if col not in columns]
-        if missing_columns:
-            log_system_error(db, "MISSING_COLUMNS", f"Colunas faltando em system_logs: {missing_columns}", {
-                "missing": missing_columns,
-                "existing": columns
-            })
+    O registro vai para a fila de auditoria; colunas inexistentes em system_logs
+    são descartadas na gravação (ou o log vai para arquivo se a tabela faltar).
+    """
+    try:
+        if not enqueue_system_log(employee_id, action_type, description, user=user,
+                                  old_data=old_data, new_data=new_data, metadata=metadata):
+            logger.error(f"❌ Fila de logs cheia, ação {action_type} não foi logada")
             return False
 
-        # Inserir log com colunas existentes
-        base_query = "INSERT INTO system_logs (employee_id, action_type, action_description, created_at"
-        base_values = "?, ?, ?, datetime('now'"
-        params = [employee_id, action_type, description]
-
-        # Adicionar colunas opcionais se existirem
-        if "old_data" in columns and old_data:
-            base_query += ", old_data"
-            base_values += ", ?"
-            params.append(json.dumps(old_data, ensure_ascii=False))
-
-        if "new_data" in columns and new_data:
-            base_query += ", new_data"
-            base_values += ", ?"
-            params.append(json.dumps(new_data, ensure_ascii=False))
-
-        if "user_who_made_change" in columns:
-            base_query += ", user_who_made_change"
-            base_values += ", ?"
-            params.append(user)
-
-        if "metadata" in columns and metadata:
-            base_query += ", metadata"
-            base_values += ", ?"
-            params.append(json.dumps(metadata, ensure_ascii=False))
-
-        final_query = f"{base_query}) VALUES ({base_values})"
-
-        cursor.execute(final_query, params)
-        db.commit()
-
-        logger.info(f"✅ Log criado: {action_type} para employee {employee_id}")
+        logger.info(f"✅ Log enfileirado: {action_type} para employee {employee_id}")
         return True
 
     except Exception as e:
-        log_system_error(db, "LOG_ERROR", f"Erro ao criar log: {str(e)}", {
-            "employee_id": employee_id,
-            "action_type": action_type,
-            "error": str(e),
-            "traceback": traceback.format_exc()
-        })
+        logger.error(f"❌ Erro ao criar log: {e}")
         return False
 
 
@@ -149,7 +62,7 @@ def safe_update_employee(db, employee_id: int, employee_data: Dict) -> Dict:
         cursor = db.cursor()
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "employees")
+        columns = schema_registry.columns("employees")
 
         if not columns:
             raise Exception("Não foi possível obter estrutura da tabela employees")
@@ -235,6 +148,7 @@ def safe_update_employee(db, employee_id: int, employee_data: Dict) -> Dict:
 
             cursor.execute(query, params)
             db.commit()
+            invalidate_employee_count()
 
         # Log de campos ignorados
         if ignored_fields:
@@ -266,32 +180,85 @@ def safe_update_employee(db, employee_id: int, employee_data: Dict) -> Dict:
         }
 
 
+# ============================================================================
+# 📄 PAGINAÇÃO POR CURSOR E CONTAGEM EM CACHE
+# ============================================================================
+
+EMPLOYEE_PAGE_MAX = 500
+EMPLOYEE_COUNT_TTL = 30  # segundos
+
+EMPLOYEE_JSON_FIELDS = ["endereco", "competencias", "ferias", "dayoff", "pdi", "reunioes_1x1"]
+
+# Chave inclui o texto de busca: o TTLCache limita o número de entradas
+_count_cache = TTLCache("employee_count", EMPLOYEE_COUNT_TTL, maxsize=256)
+
+
+def encode_cursor(nome: str, employee_id: int) -> str:
+    """Cursor opaco com a última posição (nome, id) da página"""
+    raw = json.dumps([nome, employee_id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        nome, employee_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(nome), int(employee_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def cached_employee_count(cursor, where: str, params: List[Any]) -> int:
+    """COUNT(*) dos filtros atuais, reaproveitado por EMPLOYEE_COUNT_TTL segundos ou até a próxima escrita"""
+    key = (where, tuple(params))
+    hit, total = _count_cache.get(key)
+    if hit:
+        return total
+
+    generation = get_write_generation()
+    cursor.execute(f"SELECT COUNT(*) FROM employees WHERE {where}", params)
+    total = cursor.fetchone()[0]
+    _count_cache.set(key, total, generation)
+    return total
+
+
+def invalidate_employee_count():
+    _count_cache.invalidate()
+
+
 # ============================================================================
 # 📊 ENDPOINTS COM FALLBACK GRACIOSO
 # ============================================================================
 
 @router.get("/")
-async def get_employees(
+def get_employees(
         status: Optional[str] = None,
         area_id: Optional[int] = None,
         team_id: Optional[int] = None,
-        search: Optional[str] = None
+        search: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=EMPLOYEE_PAGE_MAX),
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+        include_total: bool = False
 ):
-    """Buscar funcionários com fallback gracioso para campos inexistentes"""
+    """Buscar funcionários com fallback gracioso para campos inexistentes
+
+    Sem ``limit`` retorna a lista completa. Com ``limit`` pagina por cursor
+    (keyset em ``nome, id``); ``fields`` limita as colunas retornadas e
+    ``include_total`` soma a contagem (em cache) dos filtros aplicados.
+    """
     try:
         logger.info(f"🔍 Buscando funcionários com fallback gracioso")
 
-        db = get_db()
-        cursor = db.cursor()
+        db = get_sqlite_connection()
+        db_cursor = db.cursor()
 
         # Verificar se tabela employees existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='employees'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("employees"):
             log_system_error(db, "MISSING_TABLE", "Tabela employees não encontrada")
             raise HTTPException(status_code=500, detail="Tabela employees não encontrada")
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "employees")
+        columns = schema_registry.columns("employees")
 
         # Campos básicos que sempre tentamos buscar
         basic_columns = ["id", "nome", "email", "telefone", "cpf", "cargo", "status"]
@@ -306,46 +273,88 @@ async def get_employees(
                 "existing": existing_basic
             })
 
-        # Montar query com campos existentes
-        select_fields = existing_basic.copy()
+        ignored_fields = []
+        if fields:
+            # Projeção: apenas as colunas pedidas (id e nome sempre, para o cursor)
+            requested = [f.strip() for f in fields.split(",") if f.strip()]
+            ignored_fields = [f for f in requested if f not in columns]
+            select_fields = [col for col in ["id", "nome"] if col in columns]
+            select_fields += [f for f in requested if f in columns and f not in select_fields]
+        else:
+            # Montar query com campos existentes
+            select_fields = existing_basic.copy()
 
-        # Adicionar campos opcionais se existirem
-        optional_fields = ["data_nascimento", "nivel", "equipe", "manager_id", "team_id", "area_id",
-                           "observacoes", "created_at", "updated_at"]
+            # Adicionar campos opcionais se existirem
+            optional_fields = ["data_nascimento", "nivel", "equipe", "manager_id", "team_id", "area_id",
+                               "observacoes", "created_at", "updated_at"]
 
-        for field in optional_fields:
-            if field in columns:
-                select_fields.append(field)
+            for field in optional_fields:
+                if field in columns:
+                    select_fields.append(field)
 
-        query = f"SELECT {', '.join(select_fields)} FROM employees WHERE status != 'DELETED'"
+        where = "status != 'DELETED'"
         params = []
 
         # Aplicar filtros apenas se os campos existirem
         if status and "status" in columns:
-            query += " AND status = ?"
+            where += " AND status = ?"
             params.append(status)
 
         if area_id and "area_id" in columns:
-            query += " AND area_id = ?"
+            where += " AND area_id = ?"
             params.append(area_id)
 
         if team_id and "team_id" in columns:
-            query += " AND team_id = ?"
+            where += " AND team_id = ?"
             params.append(team_id)
 
-        if search and "nome" in columns:
-            query += " AND nome LIKE ?"
-            params.append(f"%{search}%")
-
-        query += " ORDER BY nome" if "nome" in columns else " ORDER BY id"
-
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+        if search:
+            fts_query = build_fts_query(search)
+            if fts_query and schema_registry.has_table("employees_fts"):
+                # Índice FTS5: nome/email/cargo/equipe, sem diferenciar acentos
+                where += " AND id IN (SELECT rowid FROM employees_fts WHERE employees_fts MATCH ?)"
+                params.append(fts_query)
+            elif "nome" in columns:
+                where += " AND nome LIKE ?"
+                params.append(f"%{search}%")
+
+        filter_params = list(params)
+        page_where = where
+        if cursor:
+            # Keyset: continua depois do último (nome, id) entregue
+            page_where += " AND (nome, id) > (?, ?)"
+            params.extend(decode_cursor(cursor))
+
+        query = f"SELECT {', '.join(select_fields)} FROM employees WHERE {page_where}"
+        query += " ORDER BY nome, id" if "nome" in columns else " ORDER BY id"
+
+        if limit:
+            # Uma linha a mais indica se existe próxima página
+            query += " LIMIT ?"
+            params.append(limit + 1)
+
+        db_cursor.execute(query, params)
+        rows = db_cursor.fetchall()
+
+        has_more = bool(limit) and len(rows) > limit
+        if has_more:
+            rows = rows[:limit]
 
         employees = []
         for row in rows:
             employee = dict(row)
 
+            if fields:
+                # Projeção: decodificar apenas os campos JSON pedidos
+                for field in EMPLOYEE_JSON_FIELDS:
+                    if field in employee:
+                        try:
+                            employee[field] = json.loads(employee[field]) if employee[field] else None
+                        except:
+                            employee[field] = {} if field != "competencias" else []
+                employees.append(employee)
+                continue
+
             # Adicionar campos padrão para campos faltando
             if "observacoes" not in employee:
                 employee["observacoes"] = ""
@@ -354,8 +363,7 @@ async def get_employees(
                 employee["nivel"] = "JUNIOR"
 
             # Processar campos JSON se existirem
-            json_fields = ["endereco", "competencias", "ferias", "dayoff", "pdi", "reunioes_1x1"]
-            for field in json_fields:
+            for field in EMPLOYEE_JSON_FIELDS:
                 if field in columns and employee.get(field):
                     try:
                         employee[field] = json.loads(employee[field])
@@ -366,23 +374,37 @@ async def get_employees(
 
             employees.append(employee)
 
-        cursor.close()
+        total = len(employees)
+        if limit or cursor:
+            total = cached_employee_count(db_cursor, where, filter_params) if include_total else None
+
+        next_cursor = None
+        if has_more and "nome" in columns:
+            last = employees[-1]
+            next_cursor = encode_cursor(last["nome"], last["id"])
+
+        db_cursor.close()
         db.close()
 
         logger.info(f"✅ Retornando {len(employees)} funcionários com fallback aplicado")
         return {
             "employees": employees,
-            "total": len(employees),
+            "total": total,
+            "next_cursor": next_cursor,
+            "has_more": has_more,
             "sistema": {
                 "campos_existentes": len(select_fields),
                 "campos_basicos_faltando": missing_basic,
+                "campos_ignorados": ignored_fields,
                 "fallback_aplicado": len(missing_basic) > 0
             }
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Erro ao buscar funcionários: {e}")
-        db = get_db()
+        db = get_sqlite_connection()
         log_system_error(db, "GET_EMPLOYEES_ERROR", f"Erro ao buscar funcionários: {str(e)}", {
             "error": str(e),
             "traceback": traceback.format_exc()
@@ -391,15 +413,69 @@ async def get_employees(
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
 
+@router.get("/search")
+def search_employees(
+        q: str = Query(..., min_length=1),
+        limit: int = Query(20, ge=1, le=100)
+):
+    """Busca textual ranqueada (BM25) para type-ahead de funcionários
+
+    Sem termo com MIN_PREFIX_LENGTH letras (primeira tecla, "a b") cai no
+    LIKE por nome, sem ranking.
+    """
+    fts_query = build_fts_query(q)
+
+    db = get_sqlite_connection()
+    try:
+        if not fts_query:
+            rows = db.execute("""
+                              SELECT e.id, e.nome, e.email, e.cargo, e.equipe, e.status, e.area_id, e.team_id,
+                                     NULL AS rank
+                              FROM employees e
+                              WHERE e.nome LIKE ?
+                                AND e.status != 'DELETED'
+                              ORDER BY e.nome, e.id
+                              LIMIT ?
+                              """, (f"%{q}%", limit)).fetchall()
+            results = [dict(row) for row in rows]
+            return {"query": q, "results": results, "total": len(results)}
+
+        if not schema_registry.has_table("employees_fts"):
+            raise HTTPException(status_code=503, detail="Índice de busca indisponível. Execute as migrations.")
+
+        # Pesos BM25: nome > cargo > email > equipe
+        rows = db.execute("""
+                          SELECT e.id, e.nome, e.email, e.cargo, e.equipe, e.status, e.area_id, e.team_id,
+                                 bm25(employees_fts, 10.0, 2.0, 4.0, 1.0) AS rank
+                          FROM employees_fts
+                                   JOIN employees e ON e.id = employees_fts.rowid
+                          WHERE employees_fts MATCH ?
+                            AND e.status != 'DELETED'
+                          ORDER BY rank
+                          LIMIT ?
+                          """, (fts_query, limit)).fetchall()
+
+        results = [dict(row) for row in rows]
+        return {"query": q, "results": results, "total": len(results)}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Erro na busca de funcionários: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+    finally:
+        db.close()
+
+
 @router.get("/{employee_id}")
-async def get_employee(employee_id: int):
+def get_employee(employee_id: int):
     """Buscar funcionário específico com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "employees")
+        columns = schema_registry.columns("employees")
 
         # Montar query com campos existentes
         existing_fields = [col for col in columns if col in [
@@ -457,7 +533,7 @@ async def get_employee(employee_id: int):
         raise
     except Exception as e:
         logger.error(f"❌ Erro ao buscar funcionário {employee_id}: {e}")
-        db = get_db()
+        db = get_sqlite_connection()
         log_system_error(db, "GET_EMPLOYEE_ERROR", f"Erro ao buscar funcionário {employee_id}: {str(e)}", {
             "employee_id": employee_id,
             "error": str(e),
@@ -468,12 +544,12 @@ async def get_employee(employee_id: int):
 
 
 @router.put("/{employee_id}")
-async def update_employee(employee_id: int, employee_data: Dict[Any, Any], request: Request):
+def update_employee(employee_id: int, employee_data: Dict[Any, Any], request: Request):
     """Atualizar funcionário com fallback gracioso e log detalhado"""
     try:
         logger.info(f"🔍 Atualizando funcionário {employee_id} com fallback gracioso")
 
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se funcionário existe
@@ -520,7 +596,7 @@ async def update_employee(employee_id: int, employee_data: Dict[Any, Any], reque
         raise
     except Exception as e:
         logger.error(f"❌ Erro ao atualizar funcionário {employee_id}: {e}")
-        db = get_db()
+        db = get_sqlite_connection()
         log_system_error(db, "UPDATE_EMPLOYEE_ERROR", f"Erro ao atualizar funcionário {employee_id}: {str(e)}", {
             "employee_id": employee_id,
             "error": str(e),
@@ -531,10 +607,10 @@ async def update_employee(employee_id: int, employee_data: Dict[Any, Any], reque
 
 
 @router.get("/admin/system-health")
-async def get_system_health():
+def get_system_health():
     """Endpoint para admin verificar saúde do sistema e campos faltando"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar estrutura das tabelas principais
@@ -543,11 +619,10 @@ async def get_system_health():
         main_tables = ["employees", "areas", "teams", "managers", "knowledge", "system_logs"]
 
         for table in main_tables:
-            cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table}'")
-            exists = cursor.fetchone() is not None
+            exists = schema_registry.has_table(table)
 
             if exists:
-                columns = safe_get_table_columns(db, table)
+                columns = schema_registry.columns(table)
                 tables_health[table] = {
                     "exists": True,
                     "columns": columns,
@@ -564,14 +639,24 @@ async def get_system_health():
         system_errors = []
         if tables_health.get("system_logs", {}).get("exists"):
             try:
-                cursor.execute("""
-                               SELECT action_type, action_description, metadata, created_at
-                               FROM system_logs
-                               WHERE employee_id IS NULL AND action_type LIKE '%ERROR%'
-                                  OR action_type LIKE '%MISSING%'
-                                  OR action_type = 'IGNORED_FIELDS'
-                               ORDER BY created_at DESC LIMIT 50
-                               """)
+                if "severity" in tables_health["system_logs"]["columns"]:
+                    # Percorre o índice parcial idx_system_logs_problems (migration 006)
+                    cursor.execute("""
+                                   SELECT action_type, action_description, metadata, created_at,
+                                          severity, category
+                                   FROM system_logs
+                                   WHERE severity != 'info'
+                                   ORDER BY created_at DESC LIMIT 50
+                                   """)
+                else:
+                    cursor.execute("""
+                                   SELECT action_type, action_description, metadata, created_at
+                                   FROM system_logs
+                                   WHERE employee_id IS NULL AND action_type LIKE '%ERROR%'
+                                      OR action_type LIKE '%MISSING%'
+                                      OR action_type = 'IGNORED_FIELDS'
+                                   ORDER BY created_at DESC LIMIT 50
+                                   """)
 
                 for row in cursor.fetchall():
                     error_data = dict(row)
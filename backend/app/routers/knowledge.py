@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, Request
-import sqlite3
 import json
 import logging
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import Optional, Dict, Any
+from app.database import get_sqlite_connection, schema_registry
+from app.utils.search_utils import build_fts_query
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -15,37 +16,17 @@ router = APIRouter(
 )
 
 
-def get_db():
-    """Retorna conexão com banco gestao360.db com row_factory"""
-    conn = sqlite3.connect("gestao360.db")
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def safe_get_table_columns(db, table_name: str) -> List[str]:
-    """Obter colunas existentes de uma tabela de forma segura"""
-    try:
-        cursor = db.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = [row[1] for row in cursor.fetchall()]
-        return columns
-    except Exception as e:
-        logger.error(f"❌ Erro ao obter colunas da tabela {table_name}: {e}")
-        return []
-
-
 @router.get("/")
-async def get_knowledge():
+def get_knowledge():
     """Listar todos os conhecimentos com fallback gracioso"""
     try:
         logger.info("🔍 Buscando conhecimentos com fallback gracioso")
 
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela knowledge existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='knowledge'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("knowledge"):
             logger.warning("⚠️ Tabela knowledge não existe")
             return {
                 "error": "Tabela knowledge não existe. Execute a migration primeiro.",
@@ -54,7 +35,7 @@ async def get_knowledge():
             }
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "knowledge")
+        columns = schema_registry.columns("knowledge")
 
         # Campos básicos obrigatórios
         basic_columns = ["id", "nome"]
@@ -123,20 +104,165 @@ async def get_knowledge():
         }
 
 
+# /search é declarada antes de /{knowledge_id} para não ser capturada pela rota com parâmetro
+# Pesos BM25 por coluna do knowledge_fts: nome, descricao, tags, pre_requisitos, fornecedor, vendor
+KNOWLEDGE_FTS_WEIGHTS = "10.0, 2.0, 5.0, 1.0, 3.0, 3.0"
+KNOWLEDGE_FACETS = ["tipo", "categoria", "dificuldade"]
+
+
+@router.get("/search")
+def search_knowledge(
+        q: Optional[str] = None,
+        tipo: Optional[str] = None,
+        categoria: Optional[str] = None,
+        fornecedor: Optional[str] = None,
+        dificuldade: Optional[str] = None,
+        ativo: Optional[bool] = None,
+        popular: Optional[bool] = None,
+        obrigatorio: Optional[bool] = None,
+        limit: Optional[int] = 100
+):
+    """Buscar conhecimentos com ranking BM25, trechos destacados e facetas"""
+    try:
+        db = get_sqlite_connection()
+        cursor = db.cursor()
+
+        # Verificar se tabela existe
+        if not schema_registry.has_table("knowledge"):
+            return {"query": q, "results": [], "total": 0, "facets": {}}
+
+        columns = schema_registry.columns("knowledge")
+
+        # Campos disponíveis
+        available_fields = [f"k.{col}" for col in columns if col in [
+            "id", "nome", "codigo", "tipo", "categoria", "area", "fornecedor", "vendor",
+            "dificuldade", "ativo", "popular", "obrigatorio"
+        ]]
+
+        # Construir query
+        where_conditions = []
+        params = []
+
+        # Busca por texto: FTS5 quando o índice existe; LIKE no nome sem o índice
+        # ou quando build_fts_query não tem termo longo o bastante ("j", "a b")
+        fts_query = build_fts_query(q) if q else None
+        use_fts = bool(fts_query) and schema_registry.has_table("knowledge_fts")
+
+        if use_fts:
+            source = "knowledge_fts JOIN knowledge k ON k.id = knowledge_fts.rowid"
+            where_conditions.append("knowledge_fts MATCH ?")
+            params.append(fts_query)
+            available_fields += [
+                f"bm25(knowledge_fts, {KNOWLEDGE_FTS_WEIGHTS}) AS rank",
+                "highlight(knowledge_fts, 0, '<mark>', '</mark>') AS nome_destacado",
+                "snippet(knowledge_fts, 1, '<mark>', '</mark>', '…', 12) AS trecho",
+            ]
+            order_by = "rank"
+        else:
+            source = "knowledge k"
+            if q and "nome" in columns:
+                where_conditions.append("k.nome LIKE ?")
+                params.append(f"%{q}%")
+            order_by = "k.nome"
+
+        # Filtros específicos
+        filters = {
+            "tipo": tipo,
+            "categoria": categoria,
+            "fornecedor": fornecedor,
+            "dificuldade": dificuldade,
+            "ativo": ativo,
+            "popular": popular,
+            "obrigatorio": obrigatorio
+        }
+
+        for field, value in filters.items():
+            if value is not None and field in columns:
+                # Com FTS o "+" impede o planner de trocar o índice textual pelo índice da coluna
+                where_conditions.append(f"{'+' if use_fts else ''}k.{field} = ?")
+                params.append(value)
+
+        # Montar query final
+        where_clause = ""
+        if where_conditions:
+            where_clause = "WHERE " + " AND ".join(where_conditions)
+
+        # Leitura consistente: resultados e facetas do mesmo snapshot
+        db.execute("BEGIN")
+
+        query = f"SELECT {', '.join(available_fields)} FROM {source} {where_clause} ORDER BY {order_by} LIMIT ?"
+        cursor.execute(query, params + [limit])
+        rows = cursor.fetchall()
+
+        # Facetas: uma única passada agrupada sobre o conjunto encontrado
+        facet_fields = [f for f in KNOWLEDGE_FACETS if f in columns]
+        facets = {field: {} for field in facet_fields}
+        total = 0
+        if facet_fields:
+            facet_query = " UNION ALL ".join(
+                f"SELECT '{field}' AS faceta, {field} AS valor, COUNT(*) AS total FROM matched GROUP BY {field}"
+                for field in facet_fields
+            )
+            select_facets = ", ".join(f"k.{field}" for field in facet_fields)
+            cursor.execute(
+                f"WITH matched AS MATERIALIZED (SELECT {select_facets} FROM {source} {where_clause}) {facet_query}",
+                params
+            )
+            for facet_row in cursor.fetchall():
+                facets[facet_row["faceta"]][facet_row["valor"] or ""] = facet_row["total"]
+            total = sum(facets[facet_fields[0]].values())
+
+        db.rollback()
+
+        results = []
+        for row in rows:
+            item = dict(row)
+
+            # Campos padrão
+            defaults = {
+                "tipo": "CURSO",
+                "categoria": "",
+                "dificuldade": "MEDIO",
+                "ativo": True,
+                "popular": False,
+                "obrigatorio": False
+            }
+
+            for field, default_value in defaults.items():
+                if field not in item:
+                    item[field] = default_value
+
+            results.append(item)
+
+        cursor.close()
+        db.close()
+
+        return {
+            "query": q,
+            "results": results,
+            "total": total if facet_fields else len(results),
+            "facets": facets,
+            "fts": use_fts
+        }
+
+    except Exception as e:
+        logger.error(f"❌ Erro na busca de conhecimentos: {e}")
+        return {"query": q, "results": [], "total": 0, "facets": {}, "error": str(e)}
+
+
 @router.get("/{knowledge_id}")
-async def get_knowledge_by_id(knowledge_id: int):
+def get_knowledge_by_id(knowledge_id: int):
     """Buscar conhecimento por ID com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='knowledge'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("knowledge"):
             raise HTTPException(status_code=500, detail="Tabela knowledge não existe")
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "knowledge")
+        columns = schema_registry.columns("knowledge")
 
         # Campos disponíveis
         available_fields = [col for col in columns if col in [
@@ -198,19 +324,18 @@ async def get_knowledge_by_id(knowledge_id: int):
 
 
 @router.post("/")
-async def create_knowledge(knowledge_data: Dict[Any, Any]):
+def create_knowledge(knowledge_data: Dict[Any, Any]):
     """Criar novo conhecimento com fallback gracioso"""
     try:
         # Validações básicas
         if not knowledge_data.get("nome"):
             raise HTTPException(status_code=400, detail="Nome é obrigatório")
 
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='knowledge'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("knowledge"):
             raise HTTPException(status_code=500, detail="Tabela knowledge não existe")
 
         # Verificar se código já existe (se fornecido)
@@ -221,7 +346,7 @@ async def create_knowledge(knowledge_data: Dict[Any, Any]):
                 raise HTTPException(status_code=400, detail="Código já está em uso")
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "knowledge")
+        columns = schema_registry.columns("knowledge")
 
         # Preparar dados
         fields = []
@@ -302,10 +427,10 @@ async def create_knowledge(knowledge_data: Dict[Any, Any]):
 
 
 @router.put("/{knowledge_id}")
-async def update_knowledge(knowledge_id: int, knowledge_data: Dict[Any, Any]):
+def update_knowledge(knowledge_id: int, knowledge_data: Dict[Any, Any]):
     """Atualizar conhecimento com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se conhecimento existe
@@ -321,7 +446,7 @@ async def update_knowledge(knowledge_id: int, knowledge_data: Dict[Any, Any]):
                 raise HTTPException(status_code=400, detail="Código já está em uso por outro conhecimento")
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "knowledge")
+        columns = schema_registry.columns("knowledge")
 
         # Preparar campos para atualizar
         set_clauses = []
@@ -394,10 +519,10 @@ async def update_knowledge(knowledge_id: int, knowledge_data: Dict[Any, Any]):
 
 
 @router.delete("/{knowledge_id}")
-async def delete_knowledge(knowledge_id: int):
+def delete_knowledge(knowledge_id: int):
     """Deletar conhecimento com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se conhecimento existe
@@ -436,110 +561,14 @@ async def delete_knowledge(knowledge_id: int):
 # 🔍 ENDPOINTS DE BUSCA E FILTROS
 # ============================================================================
 
-@router.get("/search")
-async def search_knowledge(
-        q: Optional[str] = None,
-        tipo: Optional[str] = None,
-        categoria: Optional[str] = None,
-        fornecedor: Optional[str] = None,
-        dificuldade: Optional[str] = None,
-        ativo: Optional[bool] = None,
-        popular: Optional[bool] = None,
-        obrigatorio: Optional[bool] = None,
-        limit: Optional[int] = 100
-):
-    """Buscar conhecimentos com filtros"""
-    try:
-        db = get_db()
-        cursor = db.cursor()
-
-        # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='knowledge'")
-        if not cursor.fetchone():
-            return []
-
-        columns = safe_get_table_columns(db, "knowledge")
-
-        # Campos disponíveis
-        available_fields = [col for col in columns if col in [
-            "id", "nome", "codigo", "tipo", "categoria", "area", "fornecedor", "vendor",
-            "dificuldade", "ativo", "popular", "obrigatorio"
-        ]]
-
-        # Construir query
-        where_conditions = []
-        params = []
-
-        # Busca por texto
-        if q and "nome" in columns:
-            where_conditions.append("nome LIKE ?")
-            params.append(f"%{q}%")
-
-        # Filtros específicos
-        filters = {
-            "tipo": tipo,
-            "categoria": categoria,
-            "fornecedor": fornecedor,
-            "dificuldade": dificuldade,
-            "ativo": ativo,
-            "popular": popular,
-            "obrigatorio": obrigatorio
-        }
-
-        for field, value in filters.items():
-            if value is not None and field in columns:
-                where_conditions.append(f"{field} = ?")
-                params.append(value)
-
-        # Montar query final
-        where_clause = ""
-        if where_conditions:
-            where_clause = "WHERE " + " AND ".join(where_conditions)
-
-        query = f"SELECT {', '.join(available_fields)} FROM knowledge {where_clause} ORDER BY nome LIMIT ?"
-        params.append(limit)
-
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-
-        results = []
-        for row in rows:
-            item = dict(row)
-
-            # Campos padrão
-            defaults = {
-                "tipo": "CURSO",
-                "categoria": "",
-                "dificuldade": "MEDIO",
-                "ativo": True,
-                "popular": False,
-                "obrigatorio": False
-            }
-
-            for field, default_value in defaults.items():
-                if field not in item:
-                    item[field] = default_value
-
-            results.append(item)
-
-        cursor.close()
-        db.close()
-
-        return results
-
-    except Exception as e:
-        logger.error(f"❌ Erro na busca de conhecimentos: {e}")
-        return []
-
-
 @router.get("/types")
-async def get_knowledge_types():
+def get_knowledge_types():
     """Obter tipos de conhecimento disponíveis"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
-        columns = safe_get_table_columns(db, "knowledge")
+        columns = schema_registry.columns("knowledge")
 
         if "tipo" not in columns:
             return ["CURSO", "CERTIFICACAO", "FORMACAO"]  # Padrão
@@ -564,13 +593,13 @@ async def get_knowledge_types():
 
 
 @router.get("/categories")
-async def get_knowledge_categories():
+def get_knowledge_categories():
     """Obter categorias de conhecimento disponíveis"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
-        columns = safe_get_table_columns(db, "knowledge")
+        columns = schema_registry.columns("knowledge")
 
         categories = set()
 
@@ -597,13 +626,13 @@ async def get_knowledge_categories():
 
 
 @router.get("/vendors")
-async def get_knowledge_vendors():
+def get_knowledge_vendors():
     """Obter fornecedores de conhecimento disponíveis"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
-        columns = safe_get_table_columns(db, "knowledge")
+        columns = schema_registry.columns("knowledge")
 
         vendors = set()
 
@@ -631,13 +660,13 @@ async def get_knowledge_vendors():
 
 
 @router.get("/popular")
-async def get_popular_knowledge(limit: int = 10):
+def get_popular_knowledge(limit: int = 10):
     """Obter conhecimentos populares"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
-        columns = safe_get_table_columns(db, "knowledge")
+        columns = schema_registry.columns("knowledge")
 
         # Campos disponíveis
         available_fields = [col for col in columns if col in [
@@ -667,15 +696,14 @@ async def get_popular_knowledge(limit: int = 10):
 
 
 @router.get("/stats/summary")
-async def get_knowledge_stats():
+def get_knowledge_stats():
     """Obter estatísticas dos conhecimentos"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='knowledge'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("knowledge"):
             return {
                 "total": 0,
                 "by_type": [],
@@ -684,7 +712,7 @@ async def get_knowledge_stats():
                 "by_difficulty": []
             }
 
-        columns = safe_get_table_columns(db, "knowledge")
+        columns = schema_registry.columns("knowledge")
 
         stats = {
             "total": 0,
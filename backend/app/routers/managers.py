@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, Request
-import sqlite3
 import json
 import logging
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import Optional, Dict, Any
+from app.database import get_sqlite_connection, schema_registry
+from app.utils.counter_utils import read_counters, ranked_buckets
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -15,37 +16,17 @@ router = APIRouter(
 )
 
 
-def get_db():
-    """Retorna conexão com banco gestao360.db com row_factory"""
-    conn = sqlite3.connect("gestao360.db")
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def safe_get_table_columns(db, table_name: str) -> List[str]:
-    """Obter colunas existentes de uma tabela de forma segura"""
-    try:
-        cursor = db.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = [row[1] for row in cursor.fetchall()]
-        return columns
-    except Exception as e:
-        logger.error(f"❌ Erro ao obter colunas da tabela {table_name}: {e}")
-        return []
-
-
 @router.get("/")
-async def get_managers():
+def get_managers():
     """Listar todos os gerentes com fallback gracioso"""
     try:
         logger.info("🔍 Buscando gerentes com fallback gracioso")
 
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela managers existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='managers'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("managers"):
             logger.warning("⚠️ Tabela managers não existe")
             return {
                 "error": "Tabela managers não existe. Execute a migration primeiro.",
@@ -54,7 +35,7 @@ async def get_managers():
             }
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "managers")
+        columns = schema_registry.columns("managers")
 
         # Campos básicos obrigatórios
         basic_columns = ["id", "nome", "email", "cargo"]
@@ -108,19 +89,18 @@ async def get_managers():
 
 
 @router.get("/{manager_id}")
-async def get_manager(manager_id: int):
+def get_manager(manager_id: int):
     """Buscar gerente por ID com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='managers'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("managers"):
             raise HTTPException(status_code=500, detail="Tabela managers não existe")
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "managers")
+        columns = schema_registry.columns("managers")
 
         # Campos disponíveis
         available_fields = [col for col in columns if col in [
@@ -167,7 +147,7 @@ async def get_manager(manager_id: int):
 
 
 @router.post("/")
-async def create_manager(manager_data: Dict[Any, Any]):
+def create_manager(manager_data: Dict[Any, Any]):
     """Criar novo gerente com fallback gracioso"""
     try:
         # Validações básicas
@@ -176,12 +156,11 @@ async def create_manager(manager_data: Dict[Any, Any]):
             if not manager_data.get(field):
                 raise HTTPException(status_code=400, detail=f"{field} é obrigatório")
 
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='managers'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("managers"):
             raise HTTPException(status_code=500, detail="Tabela managers não existe")
 
         # Verificar se email já existe
@@ -190,7 +169,7 @@ async def create_manager(manager_data: Dict[Any, Any]):
             raise HTTPException(status_code=400, detail="Email já cadastrado")
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "managers")
+        columns = schema_registry.columns("managers")
 
         # Preparar dados
         fields = []
@@ -264,10 +243,10 @@ async def create_manager(manager_data: Dict[Any, Any]):
 
 
 @router.put("/{manager_id}")
-async def update_manager(manager_id: int, manager_data: Dict[Any, Any]):
+def update_manager(manager_id: int, manager_data: Dict[Any, Any]):
     """Atualizar gerente com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se gerente existe
@@ -283,7 +262,7 @@ async def update_manager(manager_id: int, manager_data: Dict[Any, Any]):
                 raise HTTPException(status_code=400, detail="Email já está em uso por outro gerente")
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "managers")
+        columns = schema_registry.columns("managers")
 
         # Preparar campos para atualizar
         set_clauses = []
@@ -344,10 +323,10 @@ async def update_manager(manager_id: int, manager_data: Dict[Any, Any]):
 
 
 @router.delete("/{manager_id}")
-async def delete_manager(manager_id: int):
+def delete_manager(manager_id: int):
     """Deletar gerente com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se gerente existe
@@ -387,13 +366,13 @@ async def delete_manager(manager_id: int):
 # ============================================================================
 
 @router.get("/area/{area_id}")
-async def get_managers_by_area(area_id: int):
+def get_managers_by_area(area_id: int):
     """Buscar gerentes por área"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
-        columns = safe_get_table_columns(db, "managers")
+        columns = schema_registry.columns("managers")
 
         if "area_id" not in columns:
             return []  # Se não tem campo area_id, retorna vazio
@@ -424,13 +403,13 @@ async def get_managers_by_area(area_id: int):
 
 
 @router.patch("/{manager_id}/toggle-active")
-async def toggle_manager_active(manager_id: int):
+def toggle_manager_active(manager_id: int):
     """Alternar status ativo/inativo do gerente"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
-        columns = safe_get_table_columns(db, "managers")
+        columns = schema_registry.columns("managers")
 
         if "ativo" not in columns:
             raise HTTPException(status_code=400, detail="Campo 'ativo' não existe na tabela")
@@ -475,18 +454,17 @@ async def toggle_manager_active(manager_id: int):
 
 
 @router.get("/{manager_id}/team")
-async def get_manager_team(manager_id: int):
+def get_manager_team(manager_id: int):
     """Obter equipe gerenciada por um gerente"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela teams existe e tem campo manager_id
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='teams'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("teams"):
             return []
 
-        team_columns = safe_get_table_columns(db, "teams")
+        team_columns = schema_registry.columns("teams")
         if "manager_id" not in team_columns:
             return []
 
@@ -512,18 +490,17 @@ async def get_manager_team(manager_id: int):
 
 
 @router.get("/{manager_id}/employees")
-async def get_manager_employees(manager_id: int):
+def get_manager_employees(manager_id: int):
     """Obter funcionários gerenciados por um gerente"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela employees existe e tem campo manager_id
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='employees'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("employees"):
             return []
 
-        emp_columns = safe_get_table_columns(db, "employees")
+        emp_columns = schema_registry.columns("employees")
         if "manager_id" not in emp_columns:
             return []
 
@@ -549,15 +526,14 @@ async def get_manager_employees(manager_id: int):
 
 
 @router.get("/stats/summary")
-async def get_managers_stats():
+def get_managers_stats():
     """Obter estatísticas dos gerentes"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='managers'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("managers"):
             return {
                 "total": 0,
                 "active": 0,
@@ -566,7 +542,7 @@ async def get_managers_stats():
                 "by_area": []
             }
 
-        columns = safe_get_table_columns(db, "managers")
+        columns = schema_registry.columns("managers")
 
         stats = {
             "total": 0,
@@ -576,14 +552,26 @@ async def get_managers_stats():
             "by_area": []
         }
 
-        # Total
-        where_clause = "WHERE ativo = 1" if "ativo" in columns else ""
-        query = f"SELECT COUNT(*) FROM managers {where_clause}"
-        cursor.execute(query)
-        stats["total"] = cursor.fetchone()[0]
+        # Contadores materializados para total/status/nível; área não é contada
+        counters = read_counters(db, "managers")
+        if counters is not None:
+            counters = counters["managers"]
+            stats["active"] = counters["ativo"].get(1, 0)
+            stats["inactive"] = counters["ativo"].get(0, 0)
+            stats["total"] = stats["active"] if "ativo" in columns else counters["total"]
+            stats["by_level"] = [
+                {"nivel": nivel, "count": count}
+                for nivel, count in ranked_buckets(counters["nivel_hierarquico"])
+            ]
+        else:
+            # Total
+            where_clause = "WHERE ativo = 1" if "ativo" in columns else ""
+            query = f"SELECT COUNT(*) FROM managers {where_clause}"
+            cursor.execute(query)
+            stats["total"] = cursor.fetchone()[0]
 
         # Por status (se campo existir)
-        if "ativo" in columns:
+        if counters is None and "ativo" in columns:
             cursor.execute("SELECT COUNT(*) FROM managers WHERE ativo = 1")
             stats["active"] = cursor.fetchone()[0]
 
@@ -591,7 +579,7 @@ async def get_managers_stats():
             stats["inactive"] = cursor.fetchone()[0]
 
         # Por nível hierárquico (se campo existir)
-        if "nivel_hierarquico" in columns:
+        if counters is None and "nivel_hierarquico" in columns:
             cursor.execute("""
                            SELECT nivel_hierarquico, COUNT(*) as count
                            FROM managers
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, HTTPException, Request
-import sqlite3
 import json
 import logging
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import Optional, Dict, Any
+from app.database import get_sqlite_connection, schema_registry
+from app.utils.counter_utils import read_counters, ranked_buckets
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -15,37 +16,17 @@ router = APIRouter(
 )
 
 
-def get_db():
-    """Retorna conexão com banco gestao360.db com row_factory"""
-    conn = sqlite3.connect("gestao360.db")
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def safe_get_table_columns(db, table_name: str) -> List[str]:
-    """Obter colunas existentes de uma tabela de forma segura"""
-    try:
-        cursor = db.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = [row[1] for row in cursor.fetchall()]
-        return columns
-    except Exception as e:
-        logger.error(f"❌ Erro ao obter colunas da tabela {table_name}: {e}")
-        return []
-
-
 @router.get("/")
-async def get_teams():
+def get_teams():
     """Listar todas as equipes com fallback gracioso"""
     try:
         logger.info("🔍 Buscando equipes com fallback gracioso")
 
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela teams existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='teams'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("teams"):
             logger.warning("⚠️ Tabela teams não existe")
             return {
                 "error": "Tabela teams não existe. Execute a migration primeiro.",
@@ -54,7 +35,7 @@ async def get_teams():
             }
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "teams")
+        columns = schema_registry.columns("teams")
 
         # Campos básicos obrigatórios
         basic_columns = ["id", "nome"]
@@ -106,19 +87,18 @@ async def get_teams():
 
 
 @router.get("/{team_id}")
-async def get_team(team_id: int):
+def get_team(team_id: int):
     """Buscar equipe por ID com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='teams'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("teams"):
             raise HTTPException(status_code=500, detail="Tabela teams não existe")
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "teams")
+        columns = schema_registry.columns("teams")
 
         # Campos disponíveis
         available_fields = [col for col in columns if col in [
@@ -164,23 +144,22 @@ async def get_team(team_id: int):
 
 
 @router.post("/")
-async def create_team(team_data: Dict[Any, Any]):
+def create_team(team_data: Dict[Any, Any]):
     """Criar nova equipe com fallback gracioso"""
     try:
         # Validações básicas
         if not team_data.get("nome"):
             raise HTTPException(status_code=400, detail="Nome é obrigatório")
 
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='teams'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("teams"):
             raise HTTPException(status_code=500, detail="Tabela teams não existe")
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "teams")
+        columns = schema_registry.columns("teams")
 
         # Preparar dados
         fields = []
@@ -247,10 +226,10 @@ async def create_team(team_data: Dict[Any, Any]):
 
 
 @router.put("/{team_id}")
-async def update_team(team_id: int, team_data: Dict[Any, Any]):
+def update_team(team_id: int, team_data: Dict[Any, Any]):
     """Atualizar equipe com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se equipe existe
@@ -259,7 +238,7 @@ async def update_team(team_id: int, team_data: Dict[Any, Any]):
             raise HTTPException(status_code=404, detail="Equipe não encontrada")
 
         # Obter colunas existentes
-        columns = safe_get_table_columns(db, "teams")
+        columns = schema_registry.columns("teams")
 
         # Preparar campos para atualizar
         set_clauses = []
@@ -318,10 +297,10 @@ async def update_team(team_id: int, team_data: Dict[Any, Any]):
 
 
 @router.delete("/{team_id}")
-async def delete_team(team_id: int):
+def delete_team(team_id: int):
     """Deletar equipe com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se equipe existe
@@ -361,13 +340,13 @@ async def delete_team(team_id: int):
 # ============================================================================
 
 @router.get("/area/{area_id}")
-async def get_teams_by_area(area_id: int):
+def get_teams_by_area(area_id: int):
     """Buscar equipes por área com fallback gracioso"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
-        columns = safe_get_table_columns(db, "teams")
+        columns = schema_registry.columns("teams")
 
         if "area_id" not in columns:
             return []  # Se não tem campo area_id, retorna vazio
@@ -404,13 +383,13 @@ async def get_teams_by_area(area_id: int):
 
 
 @router.patch("/{team_id}/toggle-active")
-async def toggle_team_active(team_id: int):
+def toggle_team_active(team_id: int):
     """Alternar status ativo/inativo da equipe"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
-        columns = safe_get_table_columns(db, "teams")
+        columns = schema_registry.columns("teams")
 
         if "ativo" not in columns:
             raise HTTPException(status_code=400, detail="Campo 'ativo' não existe na tabela")
@@ -455,19 +434,18 @@ async def toggle_team_active(team_id: int):
 
 
 @router.get("/{team_id}/members")
-async def get_team_members(team_id: int):
+def get_team_members(team_id: int):
     """Obter membros de uma equipe"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela employees existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='employees'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("employees"):
             return []
 
         # Verificar se campo team_id existe na tabela employees
-        emp_columns = safe_get_table_columns(db, "employees")
+        emp_columns = schema_registry.columns("employees")
         if "team_id" not in emp_columns:
             return []
 
@@ -493,15 +471,14 @@ async def get_team_members(team_id: int):
 
 
 @router.get("/stats/summary")
-async def get_teams_stats():
+def get_teams_stats():
     """Obter estatísticas das equipes"""
     try:
-        db = get_db()
+        db = get_sqlite_connection()
         cursor = db.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='teams'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("teams"):
             return {
                 "total": 0,
                 "active": 0,
@@ -509,7 +486,7 @@ async def get_teams_stats():
                 "by_area": []
             }
 
-        columns = safe_get_table_columns(db, "teams")
+        columns = schema_registry.columns("teams")
 
         stats = {
             "total": 0,
@@ -518,6 +495,22 @@ async def get_teams_stats():
             "by_area": []
         }
 
+        # Contadores materializados: leitura de poucas linhas, sem varrer a tabela
+        counters = read_counters(db, "teams")
+        if counters is not None:
+            counters = counters["teams"]
+            stats["total"] = counters["total"]
+            stats["active"] = counters["ativo"].get(1, 0)
+            stats["inactive"] = counters["ativo"].get(0, 0)
+            stats["by_area"] = [
+                {"area_id": area_id, "count": count}
+                for area_id, count in ranked_buckets(counters["area_id"])
+            ]
+
+            cursor.close()
+            db.close()
+            return stats
+
         # Total
         cursor.execute("SELECT COUNT(*) FROM teams")
         stats["total"] = cursor.fetchone()[0]
@@ -1,9 +1,15 @@
-import sqlite3
 import json
 import logging
 from datetime import datetime, date
 from typing import Dict, List, Any, Optional
 from pathlib import Path
+import os
+from app.database import get_sqlite_connection, schema_registry
+from app.utils.cache_utils import ttl_cached
+from app.utils.counter_utils import read_counters
+from app.utils.log_reader_utils import LOG_FILE, read_logs, log_stats
+from app.utils.logging_utils import LOG_OUTPUT_FORMAT, get_ring_buffer
+from app.utils.permission_utils import store_permission_mask
 
 logger = logging.getLogger(__name__)
 
@@ -15,12 +21,11 @@ logger = logging.getLogger(__name__)
 def create_default_admin():
     """Criar usuário admin padrão se não existir"""
     try:
-        conn = sqlite3.connect("gestao360.db")
+        conn = get_sqlite_connection()
         cursor = conn.cursor()
 
         # Verificar se tabela users existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("users"):
             # Criar tabela users
             cursor.execute("""
                            CREATE TABLE users
@@ -90,6 +95,7 @@ def create_default_admin():
                            json.dumps(admin_preferences),
                            datetime.now().isoformat()
                        ))
+        store_permission_mask(cursor, cursor.lastrowid, {"is_admin": True})
 
         conn.commit()
         cursor.close()
@@ -106,89 +112,163 @@ def create_default_admin():
 
 
 # ============================================================================
-# 📊 SISTEMA DE LOGS AVANÇADO
+# 📈 ESTATÍSTICAS AGREGADAS
 # ============================================================================
 
-def get_system_logs(limit: int = 100, level: str = None) -> List[Dict[str, Any]]:
-    """Obter logs do sistema do arquivo"""
+STATS_CACHE_TTL = float(os.getenv("GESTAO360_STATS_TTL", "10"))
+
+# tabela → (coluna do filtro, [(chave da resposta, valor)]). Cada contagem é uma
+# subconsulta escalar: COUNT(*) puro usa a contagem otimizada da b-tree e os
+# filtros por valor viram buscas nos índices de status.
+STATS_COUNTERS = {
+    "employees": ("status", [("active", "ATIVO"), ("inactive", "INATIVO")]),
+    "teams": ("ativo", [("active", 1), ("inactive", 0)]),
+    "areas": ("ativa", [("active", 1), ("inactive", 0)]),
+    "managers": (None, []),
+    "knowledge": (None, []),
+    "employee_knowledge": ("status", [("desejado", "DESEJADO"), ("obrigatorio", "OBRIGATORIO"),
+                                      ("obtido", "OBTIDO")]),
+}
+STATS_MAX_COUNTERS = 3
+
+
+def _stats_template() -> Dict[str, Any]:
+    return {
+        "employees": {"total": 0, "active": 0, "inactive": 0},
+        "teams": {"total": 0, "active": 0, "inactive": 0},
+        "areas": {"total": 0, "active": 0, "inactive": 0},
+        "managers": {"total": 0},
+        "knowledge": {"total": 0},
+        "employee_knowledge": {"total": 0, "desejado": 0, "obrigatorio": 0, "obtido": 0},
+        "summary": {
+            "total_records": 0,
+            "completion_rate": 0,
+            "system_health": "healthy",
+            "last_updated": datetime.now().isoformat()
+        }
+    }
+
+
+def _stats_from_counters(stats: Dict[str, Any], counters: Dict[str, Dict[str, Any]]):
+    """Preencher as estatísticas a partir de metric_counters (sem varrer tabelas)"""
+    for table, (column, buckets) in STATS_COUNTERS.items():
+        stats[table]["total"] = counters[table]["total"]
+        for key, value in buckets:
+            stats[table][key] = counters[table][column].get(value, 0)
+
+    # Managers contam apenas os ativos quando a coluna existe
+    if "ativo" in schema_registry.columns("managers"):
+        stats["managers"]["total"] = counters["managers"]["ativo"].get(1, 0)
+
+
+def _stats_from_tables(conn, stats: Dict[str, Any]):
+    """Contar direto nas tabelas em uma única consulta (banco sem contadores)"""
+    parts = []
+    params = []
+    layout = {}
+    for table, (column, counters) in STATS_COUNTERS.items():
+        if not schema_registry.has_table(table):
+            continue
+        columns = schema_registry.columns(table)
+
+        total_sql = f"(SELECT COUNT(*) FROM {table})"
+        # Managers contam apenas os ativos quando a coluna existe
+        if table == "managers" and "ativo" in columns:
+            total_sql = f"(SELECT COUNT(*) FROM {table} WHERE ativo = 1)"
+
+        available = counters if column in columns else []
+        layout[table] = [key for key, _ in available]
+
+        exprs = [total_sql]
+        for _, value in available:
+            exprs.append(f"(SELECT COUNT(*) FROM {table} WHERE {column} = ?)")
+            params.append(value)
+        exprs += ["NULL"] * (1 + STATS_MAX_COUNTERS - len(exprs))
+        parts.append(f"SELECT '{table}', {', '.join(exprs)}")
+
+    rows = conn.execute(" UNION ALL ".join(parts), params).fetchall() if parts else []
+
+    for row in rows:
+        table = row[0]
+        stats[table]["total"] = row[1]
+        for index, key in enumerate(layout[table]):
+            stats[table][key] = row[2 + index]
+
+
+@ttl_cached("admin_stats", ttl=STATS_CACHE_TTL, maxsize=1)
+def compute_admin_stats() -> Dict[str, Any]:
+    """Contagens do /admin/stats (contadores materializados ou uma única consulta)"""
+    stats = _stats_template()
+
+    # Emprestar a conexão primeiro: é ela que sincroniza o schema_registry
+    conn = get_sqlite_connection()
     try:
-        log_file = Path("gestao360.log")
-        if not log_file.exists():
-            return []
+        counters = read_counters(conn, *STATS_COUNTERS)
+        if counters is not None:
+            _stats_from_counters(stats, counters)
+        else:
+            _stats_from_tables(conn, stats)
+    finally:
+        conn.close()
 
-        logs = []
-        with open(log_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+    stats["summary"]["total_records"] = sum(
+        stats[table]["total"] for table in STATS_COUNTERS
+    )
 
-        # Pegar as últimas linhas
-        recent_lines = lines[-limit:] if len(lines) > limit else lines
+    links = stats["employee_knowledge"]
+    if links["total"] > 0:
+        stats["summary"]["completion_rate"] = round(links["obtido"] / links["total"] * 100, 2)
 
-        for line in recent_lines:
-            try:
-                # Parse básico do log
-                if " - " in line:
-                    parts = line.strip().split(" - ")
-                    if len(parts) >= 4:
-                        timestamp = parts[0]
-                        module = parts[1]
-                        log_level = parts[2]
-                        message = " - ".join(parts[3:])
-
-                        # Filtrar por nível se especificado
-                        if level and log_level.upper() != level.upper():
-                            continue
-
-                        logs.append({
-                            "timestamp": timestamp,
-                            "module": module,
-                            "level": log_level,
-                            "message": message,
-                            "raw": line.strip()
-                        })
-            except Exception:
-                # Se não conseguir parsear, adiciona como raw
-                logs.append({
-                    "timestamp": datetime.now().isoformat(),
-                    "module": "system",
-                    "level": "INFO",
-                    "message": line.strip(),
-                    "raw": line.strip()
-                })
+    return stats
+
+
+# ============================================================================
+# 📊 SISTEMA DE LOGS AVANÇADO
+# ============================================================================
 
-        return logs
+def get_system_logs(limit: int = 100, level: str = None, since: str = None, until: str = None,
+                    search: str = None, module: str = None, route: str = None, request_id: str = None,
+                    source: str = "auto") -> Dict[str, Any]:
+    """Obter os logs mais recentes, do buffer em memória ou do arquivo
+
+    ``source="auto"`` usa o buffer quando ele sozinho completa o pedido (sem
+    filtro de período); caso contrário lê o arquivo de trás para frente, que
+    também traz o histórico anterior ao último restart.
+    """
+    try:
+        buffer = get_ring_buffer()
+        use_memory = buffer is not None and source != "file" and (source == "memory" or not (since or until))
+
+        if use_memory:
+            logs = buffer.query(limit, level=level, module=module, route=route,
+                                request_id=request_id, search=search)
+            # Em formato texto o arquivo não guarda request_id/rota: só o buffer responde
+            context_only = (route or request_id) and LOG_OUTPUT_FORMAT != "json"
+            if source == "memory" or len(logs) >= limit or context_only:
+                logs.reverse()
+                return {"logs": logs, "source": "memory"}
+
+        # read_logs devolve do mais novo ao mais antigo; a API mantém a ordem cronológica
+        logs = read_logs(limit, level=level, since=since, until=until, contains=search,
+                         module=module, route=route, request_id=request_id)
+        logs.reverse()
+        return {"logs": logs, "source": "file"}
 
     except Exception as e:
         logger.error(f"❌ Erro ao ler logs: {e}")
-        return []
+        return {"logs": [], "source": source, "error": str(e)}
 
 
 def get_log_stats() -> Dict[str, Any]:
-    """Obter estatísticas dos logs"""
+    """Obter estatísticas dos logs (índice incremental: só lê o que foi anexado)"""
     try:
-        log_file = Path("gestao360.log")
-        if not log_file.exists():
+        stats = log_stats()
+        if not stats["files"]:
             return {"total": 0, "size": 0, "levels": {}}
 
-        size = log_file.stat().st_size
-
-        levels = {"INFO": 0, "WARNING": 0, "ERROR": 0, "CRITICAL": 0, "DEBUG": 0}
-        total = 0
-
-        with open(log_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                total += 1
-                for level in levels.keys():
-                    if f" - {level} - " in line:
-                        levels[level] += 1
-                        break
-
-        return {
-            "total": total,
-            "size": size,
-            "size_mb": round(size / 1024 / 1024, 2),
-            "levels": levels,
-            "file_path": str(log_file.absolute())
-        }
+        stats["size_mb"] = round(stats["size"] / 1024 / 1024, 2)
+        stats["file_path"] = str(LOG_FILE.absolute())
+        return stats
 
     except Exception as e:
         logger.error(f"❌ Erro ao obter stats dos logs: {e}")
@@ -199,41 +279,14 @@ def get_log_stats() -> Dict[str, Any]:
 # 🔧 OPERAÇÕES DE SISTEMA
 # ============================================================================
 
-def backup_database(backup_name: str = None) -> Dict[str, Any]:
-    """Fazer backup do banco de dados"""
-    try:
-        if not backup_name:
-            backup_name = f"gestao360_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-
-        import shutil
-
-        source = Path("gestao360.db")
-        backup_dir = Path("backups")
-        backup_dir.mkdir(exist_ok=True)
-
-        backup_path = backup_dir / backup_name
-
-        if source.exists():
-            shutil.copy2(source, backup_path)
-
-            return {
-                "success": True,
-                "backup_path": str(backup_path),
-                "size": backup_path.stat().st_size,
-                "timestamp": datetime.now().isoformat()
-            }
-        else:
-            return {
-                "success": False,
-                "error": "Banco de dados não encontrado"
-            }
+def backup_database(backup_name: str = None, compress: bool = False) -> Dict[str, Any]:
+    """Fazer backup do banco de dados (online, via API de backup do SQLite)"""
+    from app.utils.backup_utils import start_backup
 
-    except Exception as e:
-        logger.error(f"❌ Erro no backup: {e}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    result = start_backup(backup_name, compress=compress, wait=True)
+    if result.get("status") == "completed":
+        result["timestamp"] = result["finished_at"]
+    return result
 
 
 def get_system_info() -> Dict[str, Any]:
@@ -309,8 +362,7 @@ def get_system_info() -> Dict[str, Any]:
 def get_dashboard_data() -> Dict[str, Any]:
     """Obter dados completos para dashboard administrativo"""
     try:
-        conn = sqlite3.connect("gestao360.db")
-        conn.row_factory = sqlite3.Row
+        conn = get_sqlite_connection()
         cursor = conn.cursor()
 
         dashboard = {
@@ -426,8 +478,7 @@ def get_dashboard_data() -> Dict[str, Any]:
 def get_all_users() -> List[Dict[str, Any]]:
     """Obter todos os usuários (sem senhas)"""
     try:
-        conn = sqlite3.connect("gestao360.db")
-        conn.row_factory = sqlite3.Row
+        conn = get_sqlite_connection()
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -487,7 +538,7 @@ def create_user(user_data: Dict[str, Any]) -> Dict[str, Any]:
                 "details": password_validation["errors"]
             }
 
-        conn = sqlite3.connect("gestao360.db")
+        conn = get_sqlite_connection()
         cursor = conn.cursor()
 
         # Verificar se usuário já existe
@@ -518,6 +569,7 @@ def create_user(user_data: Dict[str, Any]) -> Dict[str, Any]:
                        ))
 
         user_id = cursor.lastrowid
+        store_permission_mask(cursor, user_id, user_data)
         conn.commit()
         cursor.close()
         conn.close()
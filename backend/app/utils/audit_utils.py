@@ -0,0 +1,320 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.database import SQLITE_DB_PATH, apply_pragmas, schema_registry
+
+logger = logging.getLogger(__name__)
+
+# Registros aguardando gravação; acima disso novos registros são descartados
+LOG_QUEUE_MAXSIZE = int(os.getenv("GESTAO360_LOG_QUEUE_SIZE", "10000"))
+
+# Grava quando juntar LOG_BATCH_SIZE registros ou LOG_FLUSH_INTERVAL segundos após o primeiro
+LOG_BATCH_SIZE = int(os.getenv("GESTAO360_LOG_BATCH_SIZE", "200"))
+LOG_FLUSH_INTERVAL = float(os.getenv("GESTAO360_LOG_FLUSH_INTERVAL", "0.5"))
+
+# Destino quando a tabela system_logs não existe ou recusa o registro
+FALLBACK_LOG_FILE = "system_errors.log"
+
+# Colunas de system_logs preenchidas pela fila (as ausentes no banco são ignoradas)
+SYSTEM_LOG_FIELDS = (
+    "employee_id", "action_type", "action_description", "old_data", "new_data",
+    "user_who_made_change", "ip_address", "user_agent", "metadata", "created_at",
+    "severity", "category",
+)
+
+
+# ============================================================================
+# 📥 FILA EM MEMÓRIA
+# ============================================================================
+
+_queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=LOG_QUEUE_MAXSIZE)
+_stop = threading.Event()
+_writer: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+# True só entre start_log_writer() (startup) e stop_log_writer() (shutdown); fora
+# disso o registro é gravado na hora, nunca fica numa fila que ninguém consome
+_accepting = False
+
+_stats_lock = threading.Lock()
+_stats = {
+    "enqueued": 0,
+    "written": 0,
+    "dropped": 0,
+    "rejected": 0,
+    "failed": 0,
+    "batches": 0,
+    "last_batch_size": 0,
+    "last_flush_ms": None,
+}
+
+
+def _count(**increments):
+    with _stats_lock:
+        for key, value in increments.items():
+            _stats[key] += value
+
+
+def _json(value: Optional[Dict]) -> Optional[str]:
+    return json.dumps(value, ensure_ascii=False, default=str) if value else None
+
+
+def classify_action(action_type: str) -> Tuple[str, str]:
+    """(severity, category) de um action_type; mesma regra do backfill da migration 006"""
+    action = (action_type or "").upper()
+    if "ERROR" in action:
+        return "error", "error"
+    if "MISSING" in action or action == "IGNORED_FIELDS":
+        return "warning", "schema"
+    return "info", "audit"
+
+
+def enqueue_system_log(employee_id: Optional[int], action_type: str, description: str,
+                       user: str = "Sistema", old_data: Dict = None, new_data: Dict = None,
+                       metadata: Dict = None, ip_address: str = None,
+                       severity: str = None, category: str = None) -> bool:
+    """Enfileirar um registro de system_logs sem tocar no banco
+
+    severity/category são deduzidos do action_type quando não informados.
+    Retorna False quando a fila está cheia (o registro é descartado e contado).
+    Sem a thread de gravação (antes do startup, depois do shutdown, scripts)
+    o registro é gravado de forma síncrona.
+    """
+    default_severity, default_category = classify_action(action_type)
+    record = {
+        "employee_id": employee_id,
+        "action_type": action_type,
+        "action_description": description,
+        "old_data": _json(old_data),
+        "new_data": _json(new_data),
+        "user_who_made_change": user,
+        "ip_address": ip_address,
+        "metadata": _json(metadata),
+        # Mesmo formato de datetime('now'): horário do evento, não da gravação
+        "created_at": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        "severity": severity or default_severity,
+        "category": category or default_category,
+    }
+
+    with _writer_lock:
+        queued = _accepting
+        if queued:
+            try:
+                _queue.put_nowait(record)
+            except queue.Full:
+                _count(dropped=1)
+                return False
+
+    if not queued:
+        return _write_now([record])
+
+    _count(enqueued=1)
+    return True
+
+
+def get_log_queue_stats() -> Dict[str, Any]:
+    """Profundidade da fila e contadores de gravação/descarte"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["depth"] = _queue.qsize()
+    stats["max_size"] = LOG_QUEUE_MAXSIZE
+    stats["writer_running"] = _writer is not None and _writer.is_alive()
+    return stats
+
+
+# ============================================================================
+# 💾 GRAVAÇÃO EM LOTE
+# ============================================================================
+
+def _write_fallback_file(batch: List[Dict[str, Any]]):
+    with open(FALLBACK_LOG_FILE, "a") as f:
+        for record in batch:
+            f.write(f"{record['created_at']} - {record['action_type']}: {record['action_description']}\n")
+            if record.get("metadata"):
+                f.write(f"Detalhes: {record['metadata']}\n")
+            f.write("---\n")
+
+
+def _insert_group(conn: sqlite3.Connection, fields: tuple, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Inserir registros com as mesmas colunas; retorna os que o banco recusou"""
+    sql = f"INSERT INTO system_logs ({', '.join(fields)}) VALUES ({', '.join('?' for _ in fields)})"
+    rows = [tuple(record[f] for f in fields) for record in records]
+
+    conn.execute("SAVEPOINT log_batch")
+    try:
+        conn.executemany(sql, rows)
+        conn.execute("RELEASE log_batch")
+        return []
+    except sqlite3.IntegrityError:
+        conn.execute("ROLLBACK TO log_batch")
+        conn.execute("RELEASE log_batch")
+
+    # Um registro inválido não derruba o lote: regravar um a um
+    rejected = []
+    for record, row in zip(records, rows):
+        try:
+            conn.execute(sql, row)
+        except sqlite3.IntegrityError as e:
+            logger.warning(f"⚠️ Log {record['action_type']} recusado pelo banco ({e}), gravando em arquivo")
+            rejected.append(record)
+    return rejected
+
+
+def _flush(conn: sqlite3.Connection, batch: List[Dict[str, Any]]):
+    started = time.perf_counter()
+    schema_registry.sync(conn)
+
+    if not schema_registry.has_table("system_logs"):
+        _write_fallback_file(batch)
+        _count(written=len(batch), batches=1)
+        return
+
+    columns = set(schema_registry.columns("system_logs"))
+
+    # Colunas sem valor ficam de fora para valerem os DEFAULTs da tabela
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for record in batch:
+        fields = tuple(f for f in SYSTEM_LOG_FIELDS if f in columns and record.get(f) is not None)
+        groups.setdefault(fields, []).append(record)
+
+    rejected = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for fields, records in groups.items():
+            rejected += _insert_group(conn, fields, records)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    if rejected:
+        _write_fallback_file(rejected)
+
+    with _stats_lock:
+        _stats["written"] += len(batch)
+        _stats["rejected"] += len(rejected)
+        _stats["batches"] += 1
+        _stats["last_batch_size"] = len(batch)
+        _stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+
+def _write_now(batch: List[Dict[str, Any]]) -> bool:
+    """Gravar na thread do chamador, com conexão própria (writer parado)"""
+    conn = sqlite3.connect(SQLITE_DB_PATH, isolation_level=None)
+    apply_pragmas(conn)
+    try:
+        _flush(conn, batch)
+        return True
+    except Exception as e:
+        _count(failed=len(batch))
+        logger.error(f"❌ Erro ao gravar {len(batch)} log(s) sem a fila: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def _next_batch() -> List[Dict[str, Any]]:
+    """Esperar o primeiro registro e juntar outros até o tamanho ou o prazo do lote"""
+    try:
+        batch = [_queue.get(timeout=LOG_FLUSH_INTERVAL)]
+    except queue.Empty:
+        return []
+
+    deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+    while len(batch) < LOG_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining > 0:
+                batch.append(_queue.get(timeout=remaining))
+            else:
+                # Prazo vencido: levar só o que já está na fila
+                batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _writer_loop():
+    # Conexão própria: transações explícitas e nenhuma vaga do pool ocupada
+    conn = sqlite3.connect(SQLITE_DB_PATH, isolation_level=None)
+    apply_pragmas(conn)
+    try:
+        while True:
+            batch = _next_batch()
+            if not batch:
+                if _stop.is_set():
+                    break
+                continue
+
+            try:
+                _flush(conn, batch)
+            except Exception as e:
+                _count(failed=len(batch))
+                logger.error(f"❌ Erro ao gravar lote de {len(batch)} log(s): {e}")
+            finally:
+                for _ in batch:
+                    _queue.task_done()
+    finally:
+        conn.close()
+
+
+def start_log_writer():
+    """Iniciar a thread de gravação e passar a enfileirar (startup; idempotente)"""
+    global _writer, _accepting
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _stop.clear()
+            _writer = threading.Thread(target=_writer_loop, name="gestao360-log-writer", daemon=True)
+            _writer.start()
+        _accepting = True
+
+
+def drain_system_logs(timeout: float = 5.0) -> bool:
+    """Esperar a fila esvaziar e os lotes em andamento serem gravados"""
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def stop_log_writer(timeout: float = 5.0):
+    """Gravar o que estiver na fila e encerrar a thread (shutdown)
+
+    Registros enviados depois daqui são gravados de forma síncrona por
+    enqueue_system_log: a thread não é reiniciada.
+    """
+    global _writer, _accepting
+    with _writer_lock:
+        _accepting = False
+    if _writer is None:
+        return
+
+    drain_system_logs(timeout)
+    _stop.set()
+    _writer.join(timeout=LOG_FLUSH_INTERVAL + 1)
+    if _writer.is_alive():
+        # Lote travado no banco: a thread segue com ele, o restante fica para trás
+        logger.warning(f"⚠️ Fila de logs encerrada com {_queue.qsize()} registro(s) pendente(s)")
+        _writer = None
+        return
+    _writer = None
+
+    # Sobras que chegaram entre a drenagem e o fim da thread
+    leftover = []
+    while True:
+        try:
+            leftover.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+        _queue.task_done()
+    if leftover:
+        _write_now(leftover)
@@ -1,12 +1,25 @@
-from passlib.context import CryptContext
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 import hashlib
+import os
 import secrets
+import json
 import logging
+import threading
+import time
+
+from app.database import get_sqlite_connection, schema_registry
+from app.utils.login_utils import record_login
+from app.utils.password_utils import (
+    PasswordPoolSaturated, verify_password_blocking, hash_password_blocking
+)
+from app.utils.permission_utils import (
+    permission_bit, store_permission_mask, token_permission_mask, user_permission_mask
+)
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -15,8 +28,7 @@ logger = logging.getLogger(__name__)
 # 🔐 CONFIGURAÇÕES DE SEGURANÇA
 # ============================================================================
 
-# Configuração do password context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Custo do bcrypt e pool de hash configurados em password_utils
 
 # Configurações JWT
 SECRET_KEY = "gestao360-sua-chave-secreta-aqui-mude-em-producao-2024"
@@ -36,27 +48,13 @@ oauth2_scheme = OAuth2PasswordBearer(
 # ============================================================================
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verificar se a senha plain confere com a hash"""
-    try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except Exception as e:
-        logger.warning(f"Erro na verificação de senha: {e}")
-        # Fallback para desenvolvimento
-        try:
-            simple_hash = hashlib.sha256(plain_password.encode()).hexdigest()
-            return hashed_password == simple_hash
-        except:
-            return False
+    """Verificar se a senha plain confere com a hash (executa no pool de bcrypt)"""
+    return verify_password_blocking(plain_password, hashed_password)[0]
 
 
 def get_password_hash(password: str) -> str:
-    """Gerar hash da senha"""
-    try:
-        return pwd_context.hash(password)
-    except Exception as e:
-        logger.warning(f"Erro ao gerar hash: {e}")
-        # Fallback para desenvolvimento
-        return hashlib.sha256(password.encode()).hexdigest()
+    """Gerar hash da senha (executa no pool de bcrypt)"""
+    return hash_password_blocking(password)
 
 
 def generate_secure_token() -> str:
@@ -116,14 +114,162 @@ def create_refresh_token(data: dict) -> str:
         )
 
 
-def verify_token(token: str, token_type: str = "access") -> Optional[Dict[str, Any]]:
-    """Verificar JWT token"""
+# ============================================================================
+# 🗂️ CACHE DE TOKENS VERIFICADOS E REVOGAÇÃO
+# ============================================================================
+# Cada request autenticado decodificaria o mesmo JWT (HMAC + parse das claims).
+# O payload verificado fica em um LRU indexado pelo SHA-256 do token até o seu
+# "exp"; tokens revogados (logout) são lidos da tabela revoked_tokens e nunca
+# são servidos pelo cache.
+
+TOKEN_CACHE_SIZE = int(os.getenv("GESTAO360_TOKEN_CACHE_SIZE", "4096"))
+
+# Intervalo (s) para buscar revogações feitas por outros workers
+REVOCATION_REFRESH_SECONDS = float(os.getenv("GESTAO360_REVOCATION_REFRESH", "5"))
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class VerifiedTokenCache:
+    """LRU limitado de payloads já verificados, com expiração pelo exp do token"""
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "revoked": 0}
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[digest]
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(digest)
+            self._stats["hits"] += 1
+        # Cópia rasa: quem recebe o payload pode alterá-lo sem afetar o cache
+        return dict(entry[0])
+
+    def put(self, digest: str, payload: Dict[str, Any]):
+        exp = payload.get("exp")
+        if not exp:
+            return
+        with self._lock:
+            self._entries[digest] = (dict(payload), float(exp))
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def discard(self, digest: str):
+        with self._lock:
+            if self._entries.pop(digest, None) is not None:
+                self._stats["revoked"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "max_size": self.maxsize}
+
+
+token_cache = VerifiedTokenCache()
+
+# digest → exp dos tokens revogados (espelho da tabela revoked_tokens)
+_revoked: Dict[str, float] = {}
+_revoked_last_id = 0
+_revoked_next_refresh = 0.0
+_revoked_lock = threading.Lock()
+
+
+def _refresh_revocations(force: bool = False):
+    """Trazer revogações novas da tabela (incremental por id, no máximo a cada N segundos)"""
+    global _revoked_last_id, _revoked_next_refresh
+    now = time.monotonic()
+    if not force and now < _revoked_next_refresh:
+        return
+
+    with _revoked_lock:
+        if not force and now < _revoked_next_refresh:
+            return
+        _revoked_next_refresh = now + REVOCATION_REFRESH_SECONDS
+        try:
+            conn = get_sqlite_connection()
+            try:
+                if not schema_registry.has_table("revoked_tokens"):
+                    return
+                rows = conn.execute(
+                    "SELECT id, digest, expires_at FROM revoked_tokens WHERE id > ? AND expires_at > ?",
+                    (_revoked_last_id, int(time.time()))
+                ).fetchall()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"Erro ao carregar tokens revogados: {e}")
+            return
+
+        for row_id, digest, expires_at in rows:
+            _revoked[digest] = expires_at
+            token_cache.discard(digest)
+            _revoked_last_id = max(_revoked_last_id, row_id)
+
+        # Revogações vencidas não precisam mais ser checadas (o próprio exp recusa o token)
+        current = time.time()
+        for digest in [d for d, exp in _revoked.items() if exp <= current]:
+            del _revoked[digest]
+
+
+def is_token_revoked(digest: str) -> bool:
+    _refresh_revocations()
+    return digest in _revoked
+
+
+def revoke_token(token: str) -> bool:
+    """Revogar um token (logout) em todos os workers; False se o token já não é válido"""
+    payload = _decode_token(token)
+    if not payload or not payload.get("exp"):
+        return False
+
+    digest = token_digest(token)
+    expires_at = int(payload["exp"])
+    conn = get_sqlite_connection()
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        if schema_registry.has_table("revoked_tokens"):
+            conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (int(time.time()),))
+            conn.execute(
+                "INSERT OR IGNORE INTO revoked_tokens (digest, expires_at) VALUES (?, ?)",
+                (digest, expires_at)
+            )
+            conn.commit()
+        else:
+            logger.warning("Tabela revoked_tokens não existe, revogação vale só para este worker")
+    finally:
+        conn.close()
 
-        # Verificar tipo do token
-        if payload.get("type") != token_type:
-            return None
+    with _revoked_lock:
+        _revoked[digest] = expires_at
+    token_cache.discard(digest)
+    return True
+
+
+def get_token_cache_stats() -> Dict[str, Any]:
+    """Hits/misses do cache de tokens e quantidade de revogações ativas"""
+    stats = token_cache.stats()
+    stats["revoked_tokens"] = len(_revoked)
+    return stats
+
+
+def _decode_token(token: str) -> Optional[Dict[str, Any]]:
+    """Decodificar e validar assinatura/expiração (sem cache)"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
         # Verificar expiração
         exp = payload.get("exp")
@@ -140,6 +286,42 @@ def verify_token(token: str, token_type: str = "access") -> Optional[Dict[str, A
         return None
 
 
+def verify_token(token: str, token_type: str = "access") -> Optional[Dict[str, Any]]:
+    """Verificar JWT token (payload servido do cache até o exp, exceto se revogado)"""
+    digest = token_digest(token)
+    if is_token_revoked(digest):
+        return None
+
+    payload = token_cache.get(digest)
+    if payload is None:
+        payload = _decode_token(token)
+        if payload is None:
+            return None
+        token_cache.put(digest, payload)
+
+    # Verificar tipo do token
+    if payload.get("type") != token_type:
+        return None
+
+    return payload
+
+
+def token_subject(token: str) -> Optional[str]:
+    """sub de um token com assinatura válida, sem consultar revogações
+
+    Usado pelo rate limiter no event loop (sem I/O): um token revogado ainda
+    é recusado depois, pela dependência de autenticação da rota.
+    """
+    digest = token_digest(token)
+    payload = token_cache.get(digest)
+    if payload is None:
+        payload = _decode_token(token)
+        if payload is None:
+            return None
+        token_cache.put(digest, payload)
+    return payload.get("sub")
+
+
 def decode_token(token: str) -> Optional[str]:
     """Decodificar token e retornar username"""
     payload = verify_token(token)
@@ -152,23 +334,20 @@ def decode_token(token: str) -> Optional[str]:
 # 👤 FUNÇÕES DE AUTENTICAÇÃO (COM FALLBACK SQLITE)
 # ============================================================================
 
-def authenticate_user_sqlite(username: str, password: str) -> Optional[Dict[str, Any]]:
-    """Autenticar usuário usando SQLite direto (fallback)"""
-    import sqlite3
-
+def find_user_sqlite(username: str) -> Optional[Dict[str, Any]]:
+    """Buscar usuário por username ou email (None se não existe ou sem tabela users)"""
+    conn = get_sqlite_connection()
     try:
-        conn = sqlite3.connect("gestao360.db")
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
         # Verificar se tabela users existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("users"):
             logger.warning("Tabela users não existe")
             return None
 
-        # Buscar usuário
-        cursor.execute("""
+        # permission_mask só existe depois da migration 008
+        mask_column = ", permission_mask" if "permission_mask" in schema_registry.columns("users") else ""
+
+        cursor = conn.cursor()
+        cursor.execute(f"""
                        SELECT id,
                               username,
                               email,
@@ -178,7 +357,7 @@ def authenticate_user_sqlite(username: str, password: str) -> Optional[Dict[str,
                               permissions,
                               preferences,
                               last_login,
-                              login_count
+                              login_count{mask_column}
                        FROM users
                        WHERE username = ?
                           OR email = ?
@@ -186,39 +365,34 @@ def authenticate_user_sqlite(username: str, password: str) -> Optional[Dict[str,
 
         user_row = cursor.fetchone()
         cursor.close()
+        return dict(user_row) if user_row else None
+    finally:
         conn.close()
 
-        if not user_row:
-            return None
 
-        user = dict(user_row)
+def authenticate_user_sqlite(username: str, password: str) -> Optional[Dict[str, Any]]:
+    """Autenticar usuário usando SQLite direto (fallback)"""
 
-        # Verificar senha
-        if not verify_password(password, user["hashed_password"]):
+    try:
+        user = find_user_sqlite(username)
+        if not user:
+            return None
+
+        # Verificar senha (novo hash quando o custo do bcrypt mudou)
+        valid, new_hash = verify_password_blocking(password, user["hashed_password"])
+        if not valid:
             return None
 
         # Verificar se usuário está ativo
         if not user.get("is_active", True):
             return None
 
-        # Atualizar último login
-        try:
-            conn = sqlite3.connect("gestao360.db")
-            cursor = conn.cursor()
-            cursor.execute("""
-                           UPDATE users
-                           SET last_login  = ?,
-                               login_count = login_count + 1
-                           WHERE id = ?
-                           """, (datetime.now().isoformat(), user["id"]))
-            conn.commit()
-            cursor.close()
-            conn.close()
-        except Exception as e:
-            logger.warning(f"Erro ao atualizar último login: {e}")
-
+        # Último login/contador gravados em lote: o login não abre transação de escrita
+        record_login(user["id"], new_hash)
         return user
 
+    except PasswordPoolSaturated:
+        raise
     except Exception as e:
         logger.error(f"Erro na autenticação SQLite: {e}")
         return None
@@ -236,19 +410,20 @@ def authenticate_user_sqlalchemy(db, username: str, password: str) -> Optional[A
         if not user:
             return None
 
-        if not verify_password(password, user.hashed_password):
+        valid, new_hash = verify_password_blocking(password, user.hashed_password)
+        if not valid:
             return None
 
         if not user.is_active:
             return None
 
-        # Atualizar último login
-        user.last_login = datetime.utcnow()
-        user.login_count = (user.login_count or 0) + 1
-        db.commit()
+        # Último login/contador gravados em lote, fora da sessão do request
+        record_login(user.id, new_hash)
 
         return user
 
+    except PasswordPoolSaturated:
+        raise
     except Exception as e:
         logger.error(f"Erro na autenticação SQLAlchemy: {e}")
         return None
@@ -268,6 +443,7 @@ def authenticate_user(username: str, password: str, db=None) -> Optional[Dict[st
                 "is_admin": user.is_admin,
                 "is_active": user.is_active,
                 "permissions": user.permissions or {},
+                "permission_mask": user_permission_mask(user),
                 "preferences": user.preferences or {}
             }
 
@@ -319,16 +495,19 @@ def require_admin(current_user: Dict[str, Any] = Depends(get_current_user_requir
     return current_user
 
 
-def require_permission(permission: str):
-    """Factory para exigir permissão específica"""
+def require_permission(permission: str, action: str = "read"):
+    """Factory para exigir permissão específica (ex.: require_permission("employees", "write"))
 
-    def check_permission(current_user: Dict[str, Any] = Depends(get_current_user_required)) -> Dict[str, Any]:
-        permissions = current_user.get("permissions", {})
+    O bit é resolvido aqui, uma vez por rota; no request a checagem é um AND
+    com a máscara que veio no token.
+    """
+    required = permission_bit(permission, action)
 
-        if not permissions.get(permission, {}).get("read", False):
+    def check_permission(current_user: Dict[str, Any] = Depends(get_current_user_required)) -> Dict[str, Any]:
+        if not token_permission_mask(current_user) & required:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Permissão '{permission}' necessária"
+                detail=f"Permissão '{permission}.{action}' necessária"
             )
 
         return current_user
@@ -351,14 +530,12 @@ def optional_auth(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[Dic
 def create_user_sqlite(user_data: Dict[str, Any]) -> Optional[int]:
     """Criar usuário no SQLite"""
     try:
-        import sqlite3
 
-        conn = sqlite3.connect("gestao360.db")
+        conn = get_sqlite_connection()
         cursor = conn.cursor()
 
         # Verificar se tabela existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users'")
-        if not cursor.fetchone():
+        if not schema_registry.has_table("users"):
             # Criar tabela users básica
             cursor.execute("""
                            CREATE TABLE users
@@ -394,6 +571,7 @@ def create_user_sqlite(user_data: Dict[str, Any]) -> Optional[int]:
                        ))
 
         user_id = cursor.lastrowid
+        store_permission_mask(cursor, user_id, user_data)
         conn.commit()
         cursor.close()
         conn.close()
@@ -451,13 +629,13 @@ def validate_password_strength(password: str) -> Dict[str, Any]:
 # ============================================================================
 
 def create_session_data(user: Dict[str, Any]) -> Dict[str, Any]:
-    """Criar dados de sessão"""
+    """Criar dados de sessão (permissões vão compiladas em perm_mask, não no JSON)"""
     return {
         "sub": user["username"],
         "user_id": user["id"],
         "email": user["email"],
-        "is_admin": user.get("is_admin", False),
-        "permissions": user.get("permissions", {}),
+        "is_admin": bool(user.get("is_admin", False)),
+        "perm_mask": user_permission_mask(user),
         "session_id": generate_secure_token()
     }
 
@@ -473,7 +651,8 @@ def refresh_access_token(refresh_token: str) -> Optional[str]:
         "sub": payload["sub"],
         "user_id": payload["user_id"],
         "email": payload["email"],
-        "is_admin": payload.get("is_admin", False)
+        "is_admin": payload.get("is_admin", False),
+        "perm_mask": token_permission_mask(payload)
     }
 
     return create_access_token(new_payload)
@@ -0,0 +1,191 @@
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from app.database import SQLITE_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = Path("backups")
+
+# Páginas copiadas por passo da API de backup; entre passos o banco fica livre
+BACKUP_PAGES_PER_STEP = int(os.getenv("GESTAO360_BACKUP_PAGES", "256"))
+BACKUP_STEP_SLEEP = float(os.getenv("GESTAO360_BACKUP_SLEEP", "0.005"))
+BACKUP_CHUNK_SIZE = 1024 * 1024
+
+# Escritas de outras conexões reiniciam a cópia incremental; depois deste número
+# de reinícios a cópia é feita em um único passo (snapshot de leitura)
+BACKUP_MAX_RESTARTS = int(os.getenv("GESTAO360_BACKUP_MAX_RESTARTS", "3"))
+
+# Quantos jobs manter em memória para consulta de progresso
+BACKUP_JOB_HISTORY = 50
+
+
+# ============================================================================
+# 📋 REGISTRO DE JOBS
+# ============================================================================
+
+_jobs: Dict[str, Dict[str, Any]] = {}
+_jobs_lock = threading.Lock()
+
+# Um único worker: backups simultâneos entram na fila em vez de competir pelo disco
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gestao360-backup")
+
+
+def _update_job(job_id: str, **fields):
+    with _jobs_lock:
+        _jobs[job_id].update(fields)
+
+
+def get_backup_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Estado atual de um job de backup"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def list_backup_jobs() -> List[Dict[str, Any]]:
+    """Jobs de backup recentes, do mais novo para o mais antigo"""
+    with _jobs_lock:
+        return [dict(job) for job in reversed(list(_jobs.values()))]
+
+
+def _register_job(backup_name: str, compress: bool) -> Dict[str, Any]:
+    job = {
+        "job_id": uuid.uuid4().hex[:12],
+        "backup_name": backup_name,
+        "compress": compress,
+        "status": "queued",
+        "progress": 0.0,
+        "pages_total": None,
+        "pages_remaining": None,
+        "backup_path": None,
+        "size": None,
+        "integrity": None,
+        "restarts": 0,
+        "error": None,
+        "created_at": datetime.now().isoformat(),
+        "finished_at": None,
+    }
+    with _jobs_lock:
+        _jobs[job["job_id"]] = job
+        while len(_jobs) > BACKUP_JOB_HISTORY:
+            _jobs.pop(next(iter(_jobs)))
+    return dict(job)
+
+
+# ============================================================================
+# 🗃️ BACKUP ONLINE (API DE BACKUP DO SQLITE)
+# ============================================================================
+
+class _BackupRestarted(Exception):
+    """Cópia incremental reiniciada vezes demais por escritas concorrentes"""
+
+
+def _compress_file(source: Path, target: Path):
+    """Comprimir em streaming, sem carregar o arquivo em memória"""
+    with open(source, "rb") as src, gzip.open(target, "wb") as dst:
+        shutil.copyfileobj(src, dst, BACKUP_CHUNK_SIZE)
+
+
+def _run_backup(job_id: str, db_path: str):
+    job = get_backup_job(job_id)
+    BACKUP_DIR.mkdir(exist_ok=True)
+
+    final_path = BACKUP_DIR / (job["backup_name"] + (".gz" if job["compress"] else ""))
+    partial_path = BACKUP_DIR / (job["backup_name"] + ".partial")
+
+    state = {"remaining": None, "restarts": 0}
+
+    def progress(status, remaining, total):
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > BACKUP_MAX_RESTARTS:
+                raise _BackupRestarted()
+        state["remaining"] = remaining
+
+        _update_job(
+            job_id,
+            pages_total=total,
+            pages_remaining=remaining,
+            progress=round((total - remaining) / total * 100, 1) if total else 100.0
+        )
+
+    try:
+        _update_job(job_id, status="running")
+        logger.info(f"💾 Backup {job_id} iniciado: {final_path}")
+
+        source = sqlite3.connect(db_path)
+        target = sqlite3.connect(str(partial_path))
+        try:
+            # Copia em lotes de páginas; escritas concorrentes continuam liberadas
+            try:
+                source.backup(target, pages=BACKUP_PAGES_PER_STEP, progress=progress, sleep=BACKUP_STEP_SLEEP)
+            except _BackupRestarted:
+                # Em WAL o passo único só segura um snapshot de leitura e não bloqueia escritores
+                logger.warning(f"⚠️ Backup {job_id} reiniciado {state['restarts']}x, copiando em passo único")
+                _update_job(job_id, restarts=state["restarts"])
+                source.backup(target, pages=-1)
+
+            _update_job(job_id, status="verifying")
+            integrity = target.execute("PRAGMA integrity_check").fetchone()[0]
+        finally:
+            target.close()
+            source.close()
+
+        if integrity != "ok":
+            raise RuntimeError(f"integrity_check falhou: {integrity}")
+
+        if job["compress"]:
+            _update_job(job_id, status="compressing")
+            _compress_file(partial_path, final_path)
+            partial_path.unlink()
+        else:
+            partial_path.replace(final_path)
+
+        _update_job(
+            job_id,
+            status="completed",
+            progress=100.0,
+            integrity=integrity,
+            backup_path=str(final_path),
+            size=final_path.stat().st_size,
+            finished_at=datetime.now().isoformat()
+        )
+        logger.info(f"✅ Backup {job_id} concluído: {final_path}")
+
+    except Exception as e:
+        logger.error(f"❌ Erro no backup {job_id}: {e}")
+        if partial_path.exists():
+            partial_path.unlink()
+        _update_job(job_id, status="failed", error=str(e), finished_at=datetime.now().isoformat())
+
+
+def start_backup(backup_name: str = None, compress: bool = False, wait: bool = False,
+                 db_path: str = SQLITE_DB_PATH) -> Dict[str, Any]:
+    """Enfileirar um backup online; com wait=True bloqueia até terminar"""
+    if not os.path.exists(db_path):
+        return {"success": False, "error": "Banco de dados não encontrado"}
+
+    if not backup_name:
+        backup_name = f"gestao360_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+    # Apenas o nome do arquivo: o destino é sempre o diretório de backups
+    backup_name = Path(backup_name).name
+
+    job = _register_job(backup_name, compress)
+    future = _executor.submit(_run_backup, job["job_id"], db_path)
+
+    if wait:
+        future.result()
+        job = get_backup_job(job["job_id"])
+
+    job["success"] = job["status"] != "failed"
+    return job
@@ -0,0 +1,83 @@
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from app.database import get_write_generation
+
+# ============================================================================
+# ⏱️ CACHE TTL INVALIDADO POR ESCRITA
+# ============================================================================
+# Cada entrada guarda a geração de escrita do momento em que foi calculada:
+# qualquer commit com alterações pelo pool invalida o cache na hora. Escritas
+# feitas por outros workers só são vistas quando o TTL expira.
+
+_caches: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """Cache em memória com expiração por tempo e por geração de escrita"""
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 256):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: Dict[Any, Tuple[Any, float, int]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+        _caches[name] = self
+
+    def get(self, key) -> Tuple[bool, Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now and entry[2] == get_write_generation():
+                self._stats["hits"] += 1
+                return True, entry[0]
+            self._stats["misses"] += 1
+            return False, None
+
+    def set(self, key, value, generation: int = None):
+        if generation is None:
+            generation = get_write_generation()
+        with self._lock:
+            if len(self._entries) >= self.maxsize and key not in self._entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (value, time.monotonic() + self.ttl, generation)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "ttl": self.ttl}
+
+
+def ttl_cached(name: str, ttl: float, maxsize: int = 256) -> Callable:
+    """Decorator: memoriza o retorno por argumentos até o TTL ou a próxima escrita"""
+    cache = TTLCache(name, ttl, maxsize)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            hit, value = cache.get(key)
+            if hit:
+                return value
+
+            # Geração lida antes de calcular: escrita concorrente invalida o resultado
+            generation = get_write_generation()
+            value = func(*args, **kwargs)
+            cache.set(key, value, generation)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hits/misses de todos os caches registrados"""
+    return {name: cache.stats() for name, cache in _caches.items()}
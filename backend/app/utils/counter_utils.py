@@ -0,0 +1,145 @@
+import logging
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.database import SQLITE_DB_PATH, apply_pragmas, schema_registry, bump_write_generation
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_TABLE = "metric_counters"
+
+# Dimensões mantidas pelas triggers da migration 005 (tabela → colunas contadas).
+# Alterar aqui exige uma migration que recrie as triggers correspondentes.
+COUNTER_DIMENSIONS: Dict[str, Tuple[str, ...]] = {
+    "employees": ("status", "area_id", "team_id"),
+    "teams": ("ativo", "area_id"),
+    "areas": ("ativa",),
+    "managers": ("ativo", "nivel_hierarquico"),
+    "knowledge": (),
+    "employee_knowledge": ("status", "prioridade"),
+}
+
+# Chave usada para o total da tabela e marcador de NULL nos buckets
+TOTAL_DIMENSION = "total"
+TOTAL_BUCKET = "*"
+NULL_BUCKET = ""
+
+
+# ============================================================================
+# 📖 LEITURA DOS CONTADORES
+# ============================================================================
+
+def counters_available() -> bool:
+    """Contadores existem no banco (migration 005 aplicada)"""
+    return schema_registry.has_table(COUNTERS_TABLE)
+
+
+def read_counters(conn, *entities: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Ler contadores das tabelas pedidas em uma única consulta indexada
+
+    Retorna ``{tabela: {"total": n, dimensão: {valor: n}}}``; buckets zerados são
+    omitidos e o marcador de NULL volta a ser ``None``. Sem a tabela de
+    contadores retorna ``None`` para o chamador usar a consulta original.
+    """
+    if not counters_available():
+        return None
+
+    placeholders = ", ".join("?" for _ in entities)
+    rows = conn.execute(
+        f"SELECT entity, dimension, bucket, value FROM {COUNTERS_TABLE} "
+        f"WHERE entity IN ({placeholders}) AND value != 0",
+        entities
+    ).fetchall()
+
+    counters = {
+        entity: {TOTAL_DIMENSION: 0, **{dimension: {} for dimension in COUNTER_DIMENSIONS.get(entity, ())}}
+        for entity in entities
+    }
+    for entity, dimension, bucket, value in rows:
+        if dimension == TOTAL_DIMENSION:
+            counters[entity][TOTAL_DIMENSION] = value
+        else:
+            counters[entity].setdefault(dimension, {})[None if bucket == NULL_BUCKET else bucket] = value
+
+    return counters
+
+
+def ranked_buckets(buckets: Dict[Any, int], include_null: bool = False,
+                   limit: Optional[int] = None) -> List[Tuple[Any, int]]:
+    """Buckets ordenados por contagem decrescente (equivalente ao GROUP BY ... ORDER BY count DESC)"""
+    items = [(bucket, count) for bucket, count in buckets.items() if include_null or bucket is not None]
+    items.sort(key=lambda item: item[1], reverse=True)
+    return items[:limit] if limit else items
+
+
+# ============================================================================
+# 🔧 RECONCILIAÇÃO
+# ============================================================================
+
+def _expected_counters(conn: sqlite3.Connection) -> Dict[Tuple[str, str, Any], int]:
+    """Contagens recalculadas a partir das tabelas de origem"""
+    parts = []
+    for entity, dimensions in COUNTER_DIMENSIONS.items():
+        parts.append(f"SELECT '{entity}', '{TOTAL_DIMENSION}', '{TOTAL_BUCKET}', COUNT(*) FROM {entity}")
+        for dimension in dimensions:
+            parts.append(
+                f"SELECT '{entity}', '{dimension}', IFNULL({dimension}, '{NULL_BUCKET}'), COUNT(*) "
+                f"FROM {entity} GROUP BY 3"
+            )
+
+    rows = conn.execute(" UNION ALL ".join(parts)).fetchall()
+    return {(entity, dimension, bucket): value for entity, dimension, bucket, value in rows}
+
+
+def reconcile_counters(db_path: str = SQLITE_DB_PATH) -> Dict[str, Any]:
+    """Reconstruir metric_counters a partir das tabelas e relatar o drift encontrado
+
+    Roda em BEGIN IMMEDIATE: nenhuma escrita acontece entre a contagem e a
+    regravação, então o resultado é exato no momento do commit.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    apply_pragmas(conn)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expected = _expected_counters(conn)
+            current = {
+                (entity, dimension, bucket): value
+                for entity, dimension, bucket, value in conn.execute(
+                    f"SELECT entity, dimension, bucket, value FROM {COUNTERS_TABLE}"
+                )
+            }
+
+            drift = []
+            for key in sorted(set(expected) | set(current), key=str):
+                stored, actual = current.get(key, 0), expected.get(key, 0)
+                if stored != actual:
+                    entity, dimension, bucket = key
+                    drift.append({
+                        "entity": entity,
+                        "dimension": dimension,
+                        "bucket": None if bucket == NULL_BUCKET else bucket,
+                        "stored": stored,
+                        "actual": actual,
+                    })
+
+            conn.execute(f"DELETE FROM {COUNTERS_TABLE}")
+            conn.executemany(
+                f"INSERT INTO {COUNTERS_TABLE} (entity, dimension, bucket, value) VALUES (?, ?, ?, ?)",
+                [(*key, value) for key, value in expected.items()]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+    bump_write_generation()
+
+    if drift:
+        logger.warning(f"⚠️ Contadores reconciliados com {len(drift)} divergência(s)")
+    else:
+        logger.info("✅ Contadores consistentes")
+
+    return {"counters": len(expected), "drift": drift}
@@ -0,0 +1,368 @@
+import gzip
+import json
+import os
+import re
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+LOG_FILE = Path(os.getenv("GESTAO360_LOG_FILE", "gestao360.log"))
+
+# Leitura de trás para frente em blocos deste tamanho
+LOG_READ_BLOCK = 64 * 1024
+
+# A cada N registros o índice guarda (offset, timestamp) para buscas por período
+LOG_INDEX_STRIDE = 1000
+
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+# Cabeçalho do formato de main.py: "%(asctime)s - %(name)s - %(levelname)s - %(message)s".
+# Linhas sem cabeçalho (tracebacks) pertencem ao registro anterior.
+_HEADER_PATTERN = re.compile(
+    r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - (.*?) - (" + "|".join(LOG_LEVELS) + r") - (.*)$",
+    re.DOTALL
+)
+_HEADER_BYTES = re.compile(
+    rb"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - .*? - (" + "|".join(LOG_LEVELS).encode() + rb") - "
+)
+
+# Modo JSON (GESTAO360_LOG_FORMAT=json): timestamp e level são sempre as primeiras chaves
+_JSON_HEADER_BYTES = re.compile(rb'^\{"timestamp": "([^"]+)", "level": "(' + "|".join(LOG_LEVELS).encode() + rb')"')
+
+
+def _match_header(line: bytes) -> Optional[Tuple[str, str]]:
+    """(timestamp comparável, nível) se a linha inicia um registro de texto ou JSON"""
+    match = _HEADER_BYTES.match(line)
+    if match:
+        return match.group(1).decode("ascii"), match.group(2).decode("ascii")
+    match = _JSON_HEADER_BYTES.match(line)
+    if match:
+        return _normalize_time(match.group(1).decode("ascii")), match.group(2).decode("ascii")
+    return None
+
+
+# ============================================================================
+# 📂 ARQUIVOS (ATUAL + ROTACIONADOS)
+# ============================================================================
+
+_SEGMENT_PATTERN = re.compile(r"\.(\d{8}-\d{6})(?:-(\d+))?(?:\.gz)?$")
+_NUMBERED_PATTERN = re.compile(r"\.(\d+)(?:\.gz)?$")
+
+
+def segment_sort_key(path: Path) -> Tuple[int, str, int]:
+    """Ordem cronológica dos segmentos pelo nome (mtime muda quando o segmento é comprimido)
+
+    ``gestao360.log.<AAAAMMDD-HHMMSS>[-n]`` vem da rotação atual; ``gestao360.log.N``
+    (formato antigo do RotatingFileHandler) é mais antigo e N maior é mais velho.
+    """
+    match = _SEGMENT_PATTERN.search(path.name)
+    if match:
+        return 1, match.group(1), int(match.group(2) or 0)
+    match = _NUMBERED_PATTERN.search(path.name)
+    if match:
+        return 0, "", -int(match.group(1))
+    return 0, "", 0
+
+
+def log_files(log_file: Path = LOG_FILE) -> List[Path]:
+    """Arquivo atual seguido dos segmentos rotacionados (texto ou .gz), do mais novo ao mais antigo"""
+    files = [log_file] if log_file.exists() else []
+    rotated = [
+        path for path in log_file.parent.glob(log_file.name + ".*")
+        if path.is_file() and not path.name.endswith(".partial")
+    ]
+    rotated.sort(key=segment_sort_key, reverse=True)
+    return files + rotated
+
+
+def _is_compressed(path: Path) -> bool:
+    return path.suffix == ".gz"
+
+
+def _normalize_time(value: Optional[str]) -> Optional[str]:
+    """Aceitar ISO ("2024-05-01T10:00") no formato do asctime para comparar como texto"""
+    return value.replace("T", " ").replace(".", ",") if value else None
+
+
+# ============================================================================
+# 🗂️ ÍNDICE INCREMENTAL
+# ============================================================================
+
+class _FileIndex:
+    """Contadores e checkpoints de um arquivo, atualizados só com os bytes novos"""
+
+    def __init__(self):
+        self.offset = 0
+        self.total = 0
+        self.levels = {level: 0 for level in LOG_LEVELS}
+        self.checkpoints: List[Tuple[int, str]] = []
+        self.first_timestamp: Optional[str] = None
+        self.last_timestamp: Optional[str] = None
+        self.complete = False
+
+    def scan(self, path: Path):
+        # Segmentos comprimidos não mudam mais: lidos (em streaming) uma única vez
+        if self.complete:
+            return
+        opener = gzip.open if _is_compressed(path) else open
+        with opener(path, "rb") as f:
+            f.seek(self.offset)
+            position = self.offset
+            pending = b""
+            while True:
+                chunk = f.read(LOG_READ_BLOCK)
+                if not chunk:
+                    break
+                pending += chunk
+                lines = pending.split(b"\n")
+                # Última linha pode estar incompleta: fica para a próxima leitura
+                pending = lines.pop()
+                for line in lines:
+                    self._index_line(line, position)
+                    position += len(line) + 1
+            self.offset = position
+        self.complete = _is_compressed(path)
+
+    def _index_line(self, line: bytes, position: int):
+        header = _match_header(line)
+        if not header:
+            return
+        timestamp, level = header
+        if self.total % LOG_INDEX_STRIDE == 0:
+            self.checkpoints.append((position, timestamp))
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+        self.total += 1
+        self.levels[level] += 1
+
+    def end_offset_before(self, until: str) -> Optional[int]:
+        """Offset do primeiro checkpoint posterior a ``until`` (nada depois dele interessa)"""
+        for offset, timestamp in self.checkpoints:
+            if timestamp > until:
+                return offset
+        return None
+
+
+_indexes: Dict[Tuple[int, int], _FileIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _index_for(path: Path) -> _FileIndex:
+    """Índice do arquivo, identificado por inode (sobrevive ao rename da rotação)"""
+    stat = path.stat()
+    key = (stat.st_dev, stat.st_ino)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        # Arquivo truncado ou inode reaproveitado: recomeçar
+        if index is None or (not index.complete and stat.st_size < index.offset):
+            index = _indexes[key] = _FileIndex()
+        index.scan(path)
+        return index
+
+
+def _prune_indexes(paths: List[Path]):
+    alive = set()
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        alive.add((stat.st_dev, stat.st_ino))
+    with _indexes_lock:
+        for key in list(_indexes):
+            if key not in alive:
+                del _indexes[key]
+
+
+# ============================================================================
+# 🔎 LEITURA REVERSA E FILTROS
+# ============================================================================
+
+def iter_lines_reverse(path: Path, end: Optional[int] = None) -> Iterator[bytes]:
+    """Linhas do arquivo da última para a primeira, lendo blocos a partir do fim"""
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END) if end is None else end
+        pending = b""
+        while position > 0:
+            size = min(LOG_READ_BLOCK, position)
+            position -= size
+            f.seek(position)
+            pending = f.read(size) + pending
+            lines = pending.split(b"\n")
+            # A primeira linha do bloco pode continuar no bloco anterior
+            pending = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line
+        if pending:
+            yield pending
+
+
+def _parse_record(raw: bytes) -> Dict[str, Any]:
+    text = raw.decode("utf-8", errors="replace")
+    if text.startswith("{"):
+        try:
+            record = json.loads(text)
+            record["raw"] = text
+            return record
+        except ValueError:
+            pass
+    match = _HEADER_PATTERN.match(text)
+    if match is None:
+        # JSON truncado (ainda sendo gravado) ou quebrado em várias linhas:
+        # registro bruto com o timestamp/nível do cabeçalho
+        timestamp, level = _match_header(raw) or (None, None)
+        return {"timestamp": timestamp, "module": None, "level": level, "message": text, "raw": text}
+    timestamp, module, level, message = match.groups()
+    return {"timestamp": timestamp, "module": module, "level": level, "message": message, "raw": text}
+
+
+def _iter_records_reverse(path: Path, end: Optional[int] = None) -> Iterator[Tuple[str, str, bytes]]:
+    """(timestamp, nível, bytes do registro) do mais novo ao mais antigo
+
+    Só o cabeçalho é reconhecido aqui; decodificar e separar os campos fica
+    para os registros que passarem nos filtros.
+    """
+    continuation: List[bytes] = []
+    for line in iter_lines_reverse(path, end):
+        line = line.rstrip(b"\r")
+        header = _match_header(line)
+        if header:
+            raw = b"\n".join([line] + continuation[::-1]) if continuation else line
+            yield header[0], header[1], raw
+            continuation = []
+        else:
+            continuation.append(line)
+
+
+def _iter_records_forward(path: Path) -> Iterator[Tuple[str, str, bytes]]:
+    """Registros de um segmento .gz do mais antigo ao mais novo (gzip não permite ler de trás)"""
+    header = None
+    lines: List[bytes] = []
+    with gzip.open(path, "rb") as f:
+        for line in f:
+            line = line.rstrip(b"\r\n")
+            match = _match_header(line)
+            if match:
+                if header is not None:
+                    yield header[0], header[1], b"\n".join(lines)
+                header = match
+                lines = [line]
+            elif header is not None:
+                lines.append(line)
+    if header is not None:
+        yield header[0], header[1], b"\n".join(lines)
+
+
+def _record_matches(timestamp: str, record_level: str, raw: bytes, level: Optional[str],
+                    until: Optional[str], needle: Optional[str], needle_bytes: Optional[bytes]) -> bool:
+    if until and timestamp > until:
+        return False
+    if level and record_level != level:
+        return False
+    if needle_bytes is not None:
+        return needle_bytes in raw.lower()
+    if needle:
+        return needle in raw.decode("utf-8", errors="replace").lower()
+    return True
+
+
+def _fields_match(record: Dict[str, Any], module: Optional[str], route: Optional[str],
+                  request_id: Optional[str]) -> bool:
+    # Módulo, rota e request só são conhecidos depois de separar os campos do registro
+    if module and not record.get("module", "").startswith(module):
+        return False
+    if route and record.get("route") != route:
+        return False
+    if request_id and record.get("request_id") != request_id:
+        return False
+    return True
+
+
+def read_logs(limit: int = 100, level: str = None, since: str = None, until: str = None,
+              contains: str = None, module: str = None, route: str = None, request_id: str = None,
+              log_file: Path = LOG_FILE) -> List[Dict[str, Any]]:
+    """Últimos ``limit`` registros que passam nos filtros, do mais novo ao mais antigo
+
+    Lê de trás para frente e para ao completar o limite ou passar de ``since``;
+    ``until`` usa os checkpoints do índice para pular o fim do arquivo.
+    Segmentos ``.gz`` são lidos em streaming e descartados pelo período quando possível.
+    """
+    level = level.upper() if level else None
+    since, until = _normalize_time(since), _normalize_time(until)
+
+    # Busca sem diferenciar maiúsculas direto nos bytes quando o termo é ASCII
+    needle = contains.lower() if contains else None
+    needle_bytes = needle.encode("ascii") if needle and needle.isascii() else None
+
+    logs = []
+    for path in log_files(log_file):
+        try:
+            index = _index_for(path)
+            # Índice diz o período do arquivo: pular os que não cruzam o filtro
+            if since and index.last_timestamp and index.last_timestamp < since:
+                return logs
+            if until and index.first_timestamp and index.first_timestamp > until:
+                continue
+
+            if _is_compressed(path):
+                # Guardar só os últimos que passam no filtro (memória limitada ao limite)
+                matches = deque(maxlen=limit - len(logs))
+                for timestamp, record_level, raw in _iter_records_forward(path):
+                    if since and timestamp < since:
+                        continue
+                    if _record_matches(timestamp, record_level, raw, level, until, needle, needle_bytes):
+                        record = _parse_record(raw)
+                        if _fields_match(record, module, route, request_id):
+                            matches.append(record)
+                logs.extend(reversed(matches))
+                if len(logs) >= limit:
+                    return logs
+                continue
+
+            end = index.end_offset_before(until) if until else None
+            for timestamp, record_level, raw in _iter_records_reverse(path, end):
+                if since and timestamp < since:
+                    # Registros mais antigos que "since": este arquivo e os anteriores acabaram
+                    return logs
+                if not _record_matches(timestamp, record_level, raw, level, until, needle, needle_bytes):
+                    continue
+                record = _parse_record(raw)
+                if not _fields_match(record, module, route, request_id):
+                    continue
+
+                logs.append(record)
+                if len(logs) >= limit:
+                    return logs
+
+        except FileNotFoundError:
+            # Segmento comprimido/removido durante a leitura: a versão .gz aparece na próxima consulta
+            continue
+
+    return logs
+
+
+def log_stats(log_file: Path = LOG_FILE) -> Dict[str, Any]:
+    """Totais por nível de todos os arquivos, lendo apenas o que foi anexado desde a última chamada"""
+    files = log_files(log_file)
+    _prune_indexes(files)
+
+    levels = {level: 0 for level in LOG_LEVELS}
+    total = 0
+    size = 0
+    per_file = []
+    for path in files:
+        try:
+            index = _index_for(path)
+            file_size = path.stat().st_size
+        except FileNotFoundError:
+            continue
+        total += index.total
+        size += file_size
+        for level, count in index.levels.items():
+            levels[level] += count
+        per_file.append({"path": str(path), "size": file_size, "total": index.total})
+
+    return {"total": total, "size": size, "levels": levels, "files": per_file}
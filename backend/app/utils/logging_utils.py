@@ -0,0 +1,384 @@
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.utils.log_reader_utils import LOG_FILE, _match_header, segment_sort_key
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# "text" mantém o formato de linha original; "json" grava um objeto por linha
+LOG_OUTPUT_FORMAT = os.getenv("GESTAO360_LOG_FORMAT", "text").lower()
+
+# Registros recentes mantidos em memória para o /admin/logs (0 desativa)
+LOG_BUFFER_SIZE = int(os.getenv("GESTAO360_LOG_BUFFER_SIZE", "2000"))
+
+# Rotação: o que vier primeiro entre tamanho e idade do arquivo atual
+LOG_MAX_BYTES = int(os.getenv("GESTAO360_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_ROTATE_SECONDS = float(os.getenv("GESTAO360_LOG_ROTATE_HOURS", "24")) * 3600
+
+# Retenção dos segmentos rotacionados (quantidade e idade)
+LOG_BACKUP_COUNT = int(os.getenv("GESTAO360_LOG_BACKUPS", "14"))
+LOG_RETENTION_DAYS = float(os.getenv("GESTAO360_LOG_RETENTION_DAYS", "30"))
+
+# Registros aguardando o listener; acima disso são descartados (nunca bloqueia o request)
+LOG_HANDLER_QUEUE_SIZE = int(os.getenv("GESTAO360_LOG_HANDLER_QUEUE", "10000"))
+
+LOG_COMPRESS_CHUNK = 1024 * 1024
+
+
+# ============================================================================
+# 🔄 ROTAÇÃO POR TAMANHO E TEMPO
+# ============================================================================
+
+# Um único worker: segmentos são comprimidos em ordem, fora da thread de logging
+_compressor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_compressor() -> ThreadPoolExecutor:
+    global _compressor
+    if _compressor is None:
+        _compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gestao360-log-gzip")
+    return _compressor
+
+
+def _compress_segment(path: Path):
+    """Comprimir um segmento rotacionado (gestao360.log.<data>) e remover o original"""
+    target = path.with_name(path.name + ".gz")
+    partial = path.with_name(path.name + ".gz.partial")
+    if not path.exists():
+        # Já removido pela retenção antes de chegar a vez dele
+        return
+    try:
+        with open(path, "rb") as src, gzip.open(partial, "wb") as dst:
+            shutil.copyfileobj(src, dst, LOG_COMPRESS_CHUNK)
+        partial.replace(target)
+        path.unlink()
+    except Exception as e:
+        # Sem logging aqui: estamos dentro do próprio sistema de logs
+        print(f"❌ Erro ao comprimir {path}: {e}")
+        if partial.exists():
+            partial.unlink()
+
+
+def rotated_segments(log_file: Path = LOG_FILE) -> List[Path]:
+    """Segmentos rotacionados (comprimidos ou não), do mais antigo ao mais novo"""
+    segments = [
+        path for path in log_file.parent.glob(log_file.name + ".*")
+        if path.is_file() and not path.name.endswith(".partial")
+    ]
+    segments.sort(key=segment_sort_key)
+    return segments
+
+
+def apply_retention(log_file: Path = LOG_FILE, backup_count: int = LOG_BACKUP_COUNT,
+                    retention_days: float = LOG_RETENTION_DAYS) -> List[str]:
+    """Apagar segmentos além da quantidade máxima ou mais velhos que a retenção"""
+    segments = rotated_segments(log_file)
+    cutoff = time.time() - retention_days * 86400
+
+    removed = []
+    for index, path in enumerate(segments):
+        too_many = len(segments) - index > backup_count
+        try:
+            if too_many or path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed.append(path.name)
+        except FileNotFoundError:
+            # Segmento trocado pela versão .gz enquanto a retenção rodava
+            continue
+    return removed
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    """Rotaciona ao passar de ``max_bytes`` ou ``interval`` segundos e comprime em segundo plano
+
+    Segmentos recebem o horário da rotação no nome (gestao360.log.20240501-103000)
+    e viram ``.gz`` no worker de compressão; a retenção roda a cada rotação.
+    """
+
+    def __init__(self, filename: str, max_bytes: int = LOG_MAX_BYTES, interval: float = LOG_ROTATE_SECONDS,
+                 backup_count: int = LOG_BACKUP_COUNT, retention_days: float = LOG_RETENTION_DAYS,
+                 compress: bool = True, encoding: str = "utf-8"):
+        super().__init__(filename, "a", encoding=encoding, delay=False)
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self.retention_days = retention_days
+        self.compress = compress
+        self.rollovers = 0
+        self._opened_at = self._file_start_time()
+
+    def _file_start_time(self) -> float:
+        # Arquivo existente: idade contada a partir do primeiro registro dele
+        # (texto ou JSON, reconhecido pelo mesmo cabeçalho do leitor de logs)
+        try:
+            with open(self.baseFilename, "rb") as f:
+                header = _match_header(f.readline(256))
+            if header is None:
+                return time.time()
+            return datetime.strptime(header[0][:19], "%Y-%m-%d %H:%M:%S").timestamp()
+        except (OSError, ValueError):
+            return time.time()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.stream is None:
+            self.stream = self._open()
+        if self.interval and time.time() - self._opened_at >= self.interval:
+            return True
+        if self.max_bytes:
+            self.stream.seek(0, os.SEEK_END)
+            if self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes:
+                return True
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        base = Path(self.baseFilename)
+        segment = base.with_name(f"{base.name}.{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+        suffix = 1
+        while segment.exists() or segment.with_name(segment.name + ".gz").exists():
+            segment = base.with_name(f"{base.name}.{datetime.now().strftime('%Y%m%d-%H%M%S')}-{suffix}")
+            suffix += 1
+
+        if base.exists() and base.stat().st_size > 0:
+            base.rename(segment)
+            if self.compress:
+                _get_compressor().submit(_compress_segment, segment)
+
+        apply_retention(base, self.backup_count, self.retention_days)
+
+        self.stream = self._open()
+        self._opened_at = time.time()
+        self.rollovers += 1
+
+
+# ============================================================================
+# 🧾 REGISTROS ESTRUTURADOS (JSON + CONTEXTO DO REQUEST)
+# ============================================================================
+
+# Preenchido pelo middleware de request: {"request_id": ..., "scope": scope ASGI}
+_request_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_context", default=None)
+
+# Atributos extras levados para o registro estruturado quando presentes
+STRUCTURED_EXTRA_FIELDS = ("latency_ms", "status", "method", "db_ms", "queries", "rows", "json_ms")
+
+
+def bind_request_context(request_id: str, scope: Dict[str, Any]):
+    """Associar os logs do contexto atual ao request (retorna o token para reset)"""
+    return _request_context.set({"request_id": request_id, "scope": scope})
+
+
+def reset_request_context(token):
+    _request_context.reset(token)
+
+
+def route_of(scope: Dict[str, Any]) -> str:
+    """Template da rota (/employees/{employee_id}) quando já resolvida, senão o path"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path", "")
+
+
+class RequestContextFilter(logging.Filter):
+    """Anexar request_id e rota ao registro na thread que loga (antes da fila)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _request_context.get()
+        if context is not None:
+            if not hasattr(record, "request_id"):
+                record.request_id = context["request_id"]
+            if not hasattr(record, "route"):
+                # O scope é o mesmo dict que o roteador atualiza: já traz a rota resolvida
+                record.route = route_of(context["scope"])
+        return True
+
+
+def record_to_dict(record: logging.LogRecord) -> Dict[str, Any]:
+    """Registro estruturado: timestamp ISO, nível, módulo, mensagem e contexto do request"""
+    data = {
+        "timestamp": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+        "level": record.levelname,
+        "module": record.name,
+        "message": record.getMessage(),
+        "request_id": getattr(record, "request_id", None),
+        "route": getattr(record, "route", None),
+    }
+    for field in STRUCTURED_EXTRA_FIELDS:
+        value = getattr(record, field, None)
+        if value is not None:
+            data[field] = value
+    if record.exc_info and not record.exc_text:
+        record.exc_text = logging.Formatter().formatException(record.exc_info)
+    if record.exc_text:
+        data["exception"] = record.exc_text
+    return data
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha; timestamp e level primeiro (lidos direto dos bytes pelo leitor)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record_to_dict(record), ensure_ascii=False, default=str)
+
+
+class RingBufferHandler(logging.Handler):
+    """Últimos registros estruturados em memória (roda na thread do listener)"""
+
+    def __init__(self, capacity: int = LOG_BUFFER_SIZE):
+        super().__init__()
+        self.capacity = capacity
+        self.records: deque = deque(maxlen=capacity)
+        self.seen = 0
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.records.append(record_to_dict(record))
+            self.seen += 1
+        except Exception:
+            self.handleError(record)
+
+    def query(self, limit: int = 100, level: str = None, module: str = None, route: str = None,
+              request_id: str = None, search: str = None) -> List[Dict[str, Any]]:
+        """Registros mais recentes primeiro, filtrados sem tocar no disco"""
+        level = level.upper() if level else None
+        needle = search.lower() if search else None
+
+        with self.lock:
+            snapshot = list(self.records)
+
+        results = []
+        for item in reversed(snapshot):
+            if level and item["level"] != level:
+                continue
+            if module and not item["module"].startswith(module):
+                continue
+            if route and item.get("route") != route:
+                continue
+            if request_id and item.get("request_id") != request_id:
+                continue
+            if needle and needle not in item["message"].lower():
+                continue
+            results.append(item)
+            if len(results) >= limit:
+                break
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self.records), "capacity": self.capacity, "seen": self.seen}
+
+
+_ring_buffer: Optional[RingBufferHandler] = None
+
+
+def get_ring_buffer() -> Optional[RingBufferHandler]:
+    """Buffer de registros recentes (None se desativado ou logging não configurado)"""
+    return _ring_buffer
+
+
+# ============================================================================
+# 📤 QUEUEHANDLER / QUEUELISTENER
+# ============================================================================
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que descarta (e conta) em vez de bloquear quando a fila enche"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+_file_handler: Optional[SizeAndTimeRotatingFileHandler] = None
+_setup_lock = threading.Lock()
+
+
+def setup_logging(level: int = logging.INFO, log_file: Path = LOG_FILE):
+    """Configurar o root logger: requests só enfileiram, um listener grava arquivo e console"""
+    global _listener, _queue_handler, _file_handler, _ring_buffer
+
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        text_formatter = logging.Formatter(LOG_FORMAT)
+
+        _file_handler = SizeAndTimeRotatingFileHandler(str(log_file))
+        _file_handler.setFormatter(JsonFormatter() if LOG_OUTPUT_FORMAT == "json" else text_formatter)
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(text_formatter)
+        handlers = [_file_handler, console_handler]
+
+        if LOG_BUFFER_SIZE > 0:
+            _ring_buffer = RingBufferHandler(LOG_BUFFER_SIZE)
+            handlers.append(_ring_buffer)
+
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_HANDLER_QUEUE_SIZE)
+        _queue_handler = DroppingQueueHandler(log_queue)
+        # Contexto do request só existe na thread que loga: anexar antes de enfileirar
+        _queue_handler.addFilter(RequestContextFilter())
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Gravar os registros pendentes e parar o listener (idempotente)"""
+    global _listener, _compressor
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+        if _compressor is not None:
+            _compressor.shutdown(wait=True)
+            _compressor = None
+        if _file_handler is not None:
+            _file_handler.close()
+
+
+def get_logging_stats() -> Dict[str, Any]:
+    """Fila do listener, rotações feitas e segmentos arquivados"""
+    segments = rotated_segments()
+    return {
+        "queue_depth": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "queue_max_size": LOG_HANDLER_QUEUE_SIZE,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+        "rollovers": _file_handler.rollovers if _file_handler else 0,
+        "segments": len(segments),
+        "segments_size": sum(path.stat().st_size for path in segments),
+        "max_bytes": LOG_MAX_BYTES,
+        "rotate_hours": LOG_ROTATE_SECONDS / 3600,
+        "backup_count": LOG_BACKUP_COUNT,
+        "retention_days": LOG_RETENTION_DAYS,
+        "format": LOG_OUTPUT_FORMAT,
+        "buffer": _ring_buffer.stats() if _ring_buffer else None,
+    }
@@ -0,0 +1,158 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.database import SQLITE_DB_PATH, apply_pragmas
+
+logger = logging.getLogger(__name__)
+
+# Intervalo (s) entre gravações dos logins acumulados
+LOGIN_FLUSH_INTERVAL = float(os.getenv("GESTAO360_LOGIN_FLUSH_INTERVAL", "2"))
+
+
+# ============================================================================
+# 📥 LOGINS PENDENTES (COALESCIDOS POR USUÁRIO)
+# ============================================================================
+# Vários logins do mesmo usuário entre duas gravações viram um único UPDATE:
+# último horário, soma dos logins e o hash refeito mais recente (se houver).
+
+_pending: Dict[int, Dict[str, Any]] = {}
+_pending_lock = threading.Lock()
+
+_stop = threading.Event()
+_writer: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+# True entre start_login_writer() (startup) e stop_login_writer() (shutdown)
+_accepting = False
+
+_stats = {"recorded": 0, "flushed_users": 0, "flushed_logins": 0, "batches": 0, "failed": 0,
+          "last_flush_ms": None}
+
+
+def record_login(user_id: int, new_hash: Optional[str] = None):
+    """Registrar um login sem tocar no banco (gravado no próximo flush)
+
+    Sem a thread de gravação (fora do ciclo de vida da app) grava na hora.
+    """
+    now = datetime.now().isoformat()
+    with _pending_lock:
+        entry = _pending.get(user_id)
+        if entry is None:
+            _pending[user_id] = {"last_login": now, "count": 1, "hashed_password": new_hash}
+        else:
+            entry["last_login"] = now
+            entry["count"] += 1
+            if new_hash:
+                entry["hashed_password"] = new_hash
+        _stats["recorded"] += 1
+
+    if not _accepting:
+        try:
+            flush_logins()
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao gravar último login sem o writer: {e}")
+
+
+def get_login_buffer_stats() -> Dict[str, Any]:
+    with _pending_lock:
+        stats = dict(_stats)
+        stats["pending_users"] = len(_pending)
+    stats["writer_running"] = _writer is not None and _writer.is_alive()
+    return stats
+
+
+# ============================================================================
+# 💾 GRAVAÇÃO EM LOTE
+# ============================================================================
+
+def flush_logins(db_path: str = SQLITE_DB_PATH) -> int:
+    """Gravar os logins acumulados em uma transação; retorna usuários atualizados"""
+    with _pending_lock:
+        if not _pending:
+            return 0
+        batch = dict(_pending)
+        _pending.clear()
+
+    started = time.perf_counter()
+    rows = [(entry["last_login"], entry["count"], entry["hashed_password"], user_id)
+            for user_id, entry in batch.items()]
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    apply_pragmas(conn)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("""
+                             UPDATE users
+                             SET last_login      = ?,
+                                 login_count     = IFNULL(login_count, 0) + ?,
+                                 hashed_password = IFNULL(?, hashed_password)
+                             WHERE id = ?
+                             """, rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    except Exception:
+        # Devolver ao buffer para a próxima tentativa, somando a logins novos
+        with _pending_lock:
+            for user_id, entry in batch.items():
+                current = _pending.get(user_id)
+                if current is None:
+                    _pending[user_id] = entry
+                else:
+                    current["count"] += entry["count"]
+                    current["hashed_password"] = current["hashed_password"] or entry["hashed_password"]
+            _stats["failed"] += 1
+        raise
+    finally:
+        conn.close()
+
+    with _pending_lock:
+        _stats["flushed_users"] += len(rows)
+        _stats["flushed_logins"] += sum(entry["count"] for entry in batch.values())
+        _stats["batches"] += 1
+        _stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return len(rows)
+
+
+def _writer_loop():
+    while not _stop.wait(LOGIN_FLUSH_INTERVAL):
+        try:
+            flush_logins()
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao gravar últimos logins (nova tentativa no próximo ciclo): {e}")
+
+
+def start_login_writer():
+    """Iniciar a thread de gravação periódica (startup; idempotente)"""
+    global _writer, _accepting
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _stop.clear()
+            _writer = threading.Thread(target=_writer_loop, name="gestao360-login-writer", daemon=True)
+            _writer.start()
+        _accepting = True
+
+
+def stop_login_writer():
+    """Encerrar a thread e gravar o que estiver pendente (shutdown)
+
+    Logins registrados depois daqui são gravados na hora por record_login.
+    """
+    global _writer, _accepting
+    _accepting = False
+    if _writer is not None:
+        _stop.set()
+        _writer.join(timeout=LOGIN_FLUSH_INTERVAL + 1)
+        _writer = None
+
+    try:
+        flush_logins()
+    except Exception as e:
+        logger.error(f"❌ Logins pendentes não gravados no shutdown: {e}")
@@ -0,0 +1,262 @@
+import os
+import time
+from typing import Dict, List, Tuple
+
+# Limites (segundos) dos buckets do histograma de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Rótulo das requisições que não casaram com nenhuma rota (evita um rótulo por URL)
+UNMATCHED_ROUTE = "<unmatched>"
+
+PROCESS_START_TIME = time.time()
+
+
+# ============================================================================
+# 📈 CONTADORES POR ROTA
+# ============================================================================
+# Atualizados só pelo middleware HTTP, que roda na thread do event loop, e
+# lidos pelo /metrics (também async): nenhuma outra thread escreve, então
+# não há lock no caminho do request.
+
+class _RouteMetrics:
+    __slots__ = ("buckets", "count", "seconds", "db_seconds", "queries")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.db_seconds = 0.0
+        self.queries = 0
+
+
+_routes: Dict[Tuple[str, str], _RouteMetrics] = {}
+_responses: Dict[Tuple[str, str, int], int] = {}
+_in_flight = 0
+
+
+def request_started():
+    global _in_flight
+    _in_flight += 1
+
+
+def observe_request(method: str, route: str, status: int, seconds: float,
+                    db_seconds: float = 0.0, queries: int = 0):
+    """Registrar um request concluído (chamado pelo middleware no event loop)"""
+    global _in_flight
+    _in_flight -= 1
+
+    key = (method, route or UNMATCHED_ROUTE)
+    metrics = _routes.get(key)
+    if metrics is None:
+        metrics = _routes[key] = _RouteMetrics()
+
+    index = 0
+    while index < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[index]:
+        index += 1
+    metrics.buckets[index] += 1
+    metrics.count += 1
+    metrics.seconds += seconds
+    metrics.db_seconds += db_seconds
+    metrics.queries += queries
+
+    response_key = (key[0], key[1], status)
+    _responses[response_key] = _responses.get(response_key, 0) + 1
+
+
+# ============================================================================
+# 🖥️ PROCESSO
+# ============================================================================
+
+def process_rss_bytes() -> int:
+    """Memória residente atual (/proc no Linux; pico do processo nos demais)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        # ru_maxrss vem em KiB no Linux e em bytes no macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return 0
+
+
+# ============================================================================
+# 📝 EXPOSIÇÃO EM TEXTO (PROMETHEUS)
+# ============================================================================
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample(name: str, value, **labels) -> str:
+    if labels:
+        rendered = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        return f"{name}{{{rendered}}} {value}"
+    return f"{name} {value}"
+
+
+def _family(lines: List[str], name: str, kind: str, help_text: str):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _http_metrics(lines: List[str]):
+    _family(lines, "http_requests_total", "counter", "Requisições HTTP concluídas")
+    for (method, route, status), count in sorted(_responses.items()):
+        lines.append(_sample("http_requests_total", count, method=method, route=route, status=status))
+
+    _family(lines, "http_requests_in_flight", "gauge", "Requisições HTTP em andamento")
+    lines.append(_sample("http_requests_in_flight", _in_flight))
+
+    _family(lines, "http_request_duration_seconds", "histogram", "Latência das requisições HTTP")
+    for (method, route), metrics in sorted(_routes.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, metrics.buckets):
+            cumulative += count
+            lines.append(_sample("http_request_duration_seconds_bucket", cumulative,
+                                 method=method, route=route, le=bound))
+        lines.append(_sample("http_request_duration_seconds_bucket", metrics.count,
+                             method=method, route=route, le="+Inf"))
+        lines.append(_sample("http_request_duration_seconds_sum", round(metrics.seconds, 6),
+                             method=method, route=route))
+        lines.append(_sample("http_request_duration_seconds_count", metrics.count,
+                             method=method, route=route))
+
+    _family(lines, "http_request_db_seconds_total", "counter", "Tempo em SQLite por rota")
+    for (method, route), metrics in sorted(_routes.items()):
+        lines.append(_sample("http_request_db_seconds_total", round(metrics.db_seconds, 6),
+                             method=method, route=route))
+
+    _family(lines, "http_request_queries_total", "counter", "Comandos SQL executados por rota")
+    for (method, route), metrics in sorted(_routes.items()):
+        lines.append(_sample("http_request_queries_total", metrics.queries, method=method, route=route))
+
+
+def _database_metrics(lines: List[str]):
+    from app.database import get_pool_stats, get_busy_error_count
+
+    pool = get_pool_stats()
+    _family(lines, "gestao360_db_pool_connections", "gauge", "Conexões do pool SQLite por estado")
+    lines.append(_sample("gestao360_db_pool_connections", pool["in_use"], state="in_use"))
+    lines.append(_sample("gestao360_db_pool_connections", pool["idle"], state="idle"))
+    _family(lines, "gestao360_db_pool_size", "gauge", "Tamanho configurado do pool SQLite")
+    lines.append(_sample("gestao360_db_pool_size", pool["pool_size"]))
+    _family(lines, "gestao360_db_pool_checkouts_total", "counter", "Empréstimos de conexão do pool")
+    lines.append(_sample("gestao360_db_pool_checkouts_total", pool["checkouts"]))
+    _family(lines, "gestao360_db_pool_waits_total", "counter", "Empréstimos que esperaram uma conexão livre")
+    lines.append(_sample("gestao360_db_pool_waits_total", pool["waits"]))
+    _family(lines, "gestao360_db_pool_timeouts_total", "counter", "Empréstimos desistidos com o pool esgotado (503)")
+    lines.append(_sample("gestao360_db_pool_timeouts_total", pool["timeouts"]))
+
+    _family(lines, "gestao360_sqlite_busy_errors_total", "counter",
+            "Comandos que falharam com database is locked/busy após o busy_timeout")
+    lines.append(_sample("gestao360_sqlite_busy_errors_total", get_busy_error_count()))
+
+
+def _cache_metrics(lines: List[str]):
+    from app.utils.cache_utils import get_cache_stats
+
+    caches = get_cache_stats()
+    _family(lines, "gestao360_cache_requests_total", "counter", "Consultas aos caches TTL por resultado")
+    for name, stats in sorted(caches.items()):
+        lines.append(_sample("gestao360_cache_requests_total", stats["hits"], cache=name, result="hit"))
+        lines.append(_sample("gestao360_cache_requests_total", stats["misses"], cache=name, result="miss"))
+
+    _family(lines, "gestao360_cache_hit_ratio", "gauge", "Proporção de hits desde o início do processo")
+    for name, stats in sorted(caches.items()):
+        total = stats["hits"] + stats["misses"]
+        lines.append(_sample("gestao360_cache_hit_ratio", round(stats["hits"] / total, 4) if total else 0,
+                             cache=name))
+
+
+def _queue_metrics(lines: List[str]):
+    from app.utils.audit_utils import get_log_queue_stats
+    from app.utils.logging_utils import get_logging_stats
+
+    audit = get_log_queue_stats()
+    logging_stats = get_logging_stats()
+
+    _family(lines, "gestao360_log_queue_depth", "gauge", "Registros aguardando gravação")
+    lines.append(_sample("gestao360_log_queue_depth", audit["depth"], queue="system_logs"))
+    lines.append(_sample("gestao360_log_queue_depth", logging_stats["queue_depth"], queue="logging"))
+    _family(lines, "gestao360_log_queue_dropped_total", "counter", "Registros descartados com a fila cheia")
+    lines.append(_sample("gestao360_log_queue_dropped_total", audit["dropped"], queue="system_logs"))
+    lines.append(_sample("gestao360_log_queue_dropped_total", logging_stats["dropped"], queue="logging"))
+
+
+def _login_metrics(lines: List[str]):
+    from app.utils.login_utils import get_login_buffer_stats
+
+    stats = get_login_buffer_stats()
+    _family(lines, "gestao360_login_buffer_pending", "gauge", "Usuários com último login ainda não gravado")
+    lines.append(_sample("gestao360_login_buffer_pending", stats["pending_users"]))
+    _family(lines, "gestao360_login_buffer_flushed_total", "counter", "Logins gravados pelos flushes em lote")
+    lines.append(_sample("gestao360_login_buffer_flushed_total", stats["flushed_logins"]))
+
+
+def _password_metrics(lines: List[str]):
+    from app.utils.password_utils import get_password_pool_stats
+
+    stats = get_password_pool_stats()
+    _family(lines, "gestao360_password_pool_pending", "gauge", "Operações de bcrypt executando ou na fila")
+    lines.append(_sample("gestao360_password_pool_pending", stats["pending"]))
+    _family(lines, "gestao360_password_pool_rejected_total", "counter", "Operações recusadas com o pool cheio (429)")
+    lines.append(_sample("gestao360_password_pool_rejected_total", stats["rejected"]))
+    _family(lines, "gestao360_password_rehashed_total", "counter", "Hashes refeitos no login")
+    lines.append(_sample("gestao360_password_rehashed_total", stats["rehashed"]))
+
+
+def _token_metrics(lines: List[str]):
+    from app.utils.auth import get_token_cache_stats
+
+    stats = get_token_cache_stats()
+    _family(lines, "gestao360_token_cache_requests_total", "counter", "Consultas ao cache de JWT verificados")
+    lines.append(_sample("gestao360_token_cache_requests_total", stats["hits"], result="hit"))
+    lines.append(_sample("gestao360_token_cache_requests_total", stats["misses"], result="miss"))
+    _family(lines, "gestao360_token_cache_entries", "gauge", "Tokens verificados em cache")
+    lines.append(_sample("gestao360_token_cache_entries", stats["entries"]))
+    _family(lines, "gestao360_revoked_tokens", "gauge", "Tokens revogados ainda dentro da validade")
+    lines.append(_sample("gestao360_revoked_tokens", stats["revoked_tokens"]))
+
+
+def _rate_limit_metrics(lines: List[str]):
+    from app.utils.ratelimit_utils import get_rate_limit_stats
+
+    stats = get_rate_limit_stats()
+    _family(lines, "gestao360_rate_limit_requests_total", "counter",
+            "Decisões do rate limiter por orçamento, escopo (ip/user) e resultado")
+    for budget, scopes in stats["decisions"].items():
+        for scope, results in scopes.items():
+            for result, count in results.items():
+                lines.append(_sample("gestao360_rate_limit_requests_total", count,
+                                     budget=budget, scope=scope, result=result))
+    _family(lines, "gestao360_rate_limit_buckets", "gauge", "Token buckets ativos em memória")
+    lines.append(_sample("gestao360_rate_limit_buckets", stats["buckets"]))
+    _family(lines, "gestao360_rate_limit_evicted_total", "counter", "Buckets ociosos descartados")
+    lines.append(_sample("gestao360_rate_limit_evicted_total", stats["evicted"]))
+
+
+def _process_metrics(lines: List[str]):
+    _family(lines, "process_resident_memory_bytes", "gauge", "Memória residente do processo")
+    lines.append(_sample("process_resident_memory_bytes", process_rss_bytes()))
+    _family(lines, "process_cpu_seconds_total", "counter", "Tempo de CPU do processo")
+    lines.append(_sample("process_cpu_seconds_total", round(time.process_time(), 3)))
+    _family(lines, "process_start_time_seconds", "gauge", "Início do processo (epoch)")
+    lines.append(_sample("process_start_time_seconds", round(PROCESS_START_TIME, 3)))
+
+
+def render_metrics() -> str:
+    """Todas as métricas no formato de exposição em texto do Prometheus (0.0.4)"""
+    lines: List[str] = []
+    _http_metrics(lines)
+    # Fontes opcionais: uma falha não derruba o scrape inteiro
+    sections = (_database_metrics, _cache_metrics, _queue_metrics, _login_metrics,
+                _password_metrics, _token_metrics, _rate_limit_metrics, _process_metrics)
+    for section in sections:
+        try:
+            section(lines)
+        except Exception as e:
+            lines.append(f"# {section.__name__[1:]} indisponível: {_escape(e)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# Custo do bcrypt (2^rounds iterações); hashes com outro custo são refeitos no próximo login
+BCRYPT_ROUNDS = int(os.getenv("GESTAO360_BCRYPT_ROUNDS", "12"))
+
+# Threads dedicadas ao bcrypt (a lib libera o GIL durante o hash) e fila máxima de espera
+HASH_WORKERS = int(os.getenv("GESTAO360_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_SIZE = int(os.getenv("GESTAO360_HASH_QUEUE_SIZE", "32"))
+
+# min/max iguais ao padrão: needs_update() marca qualquer hash com custo diferente
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+class PasswordPoolSaturated(Exception):
+    """Pool de hash com a fila cheia: o chamador deve responder 429"""
+
+
+# ============================================================================
+# 🔑 HASH E VERIFICAÇÃO (EXECUTADOS NAS THREADS DO POOL)
+# ============================================================================
+
+def _legacy_sha256(password: str) -> str:
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(senha confere, novo hash quando o atual deve ser refeito)"""
+    if not hashed_password:
+        return False, None
+
+    if pwd_context.identify(hashed_password, required=False) is None:
+        # Hash SHA-256 do fallback de desenvolvimento: migra para bcrypt no primeiro login
+        if hmac.compare_digest(hashed_password, _legacy_sha256(plain_password)):
+            return True, pwd_context.hash(plain_password)
+        return False, None
+
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except ValueError as e:
+        logger.warning(f"Erro na verificação de senha: {e}")
+        return False, None
+
+
+def _hash(password: str) -> str:
+    try:
+        return pwd_context.hash(password)
+    except Exception as e:
+        logger.warning(f"Erro ao gerar hash: {e}")
+        # Fallback para desenvolvimento
+        return _legacy_sha256(password)
+
+
+# ============================================================================
+# 🧵 POOL LIMITADO COM BACK-PRESSURE
+# ============================================================================
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="gestao360-bcrypt")
+_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE_SIZE)
+
+_stats_lock = threading.Lock()
+_stats = {"submitted": 0, "rejected": 0, "rehashed": 0}
+
+
+def _submit(func, *args) -> Future:
+    """Enviar ao pool sem bloquear; sem vaga (executando + fila) levanta PasswordPoolSaturated"""
+    if not _slots.acquire(blocking=False):
+        with _stats_lock:
+            _stats["rejected"] += 1
+        raise PasswordPoolSaturated(f"{HASH_WORKERS + HASH_QUEUE_SIZE} operações de senha pendentes")
+
+    with _stats_lock:
+        _stats["submitted"] += 1
+    try:
+        future = _executor.submit(func, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def _count_rehash(result: Tuple[bool, Optional[str]]) -> Tuple[bool, Optional[str]]:
+    if result[1]:
+        with _stats_lock:
+            _stats["rehashed"] += 1
+    return result
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verificar no pool sem ocupar o event loop nem o threadpool dos handlers
+
+    Retorna ``(ok, novo_hash)``; ``novo_hash`` vem preenchido quando o custo
+    configurado mudou (ou o hash é legado) e deve ser gravado no usuário.
+    """
+    result = await asyncio.wrap_future(_submit(_verify_and_update, plain_password, hashed_password))
+    return _count_rehash(result)
+
+
+def verify_password_blocking(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Versão para código síncrono: a thread do chamador espera, mas o CPU fica limitado ao pool"""
+    return _count_rehash(_submit(_verify_and_update, plain_password, hashed_password).result())
+
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.wrap_future(_submit(_hash, password))
+
+
+def hash_password_blocking(password: str) -> str:
+    return _submit(_hash, password).result()
+
+
+def get_password_pool_stats() -> Dict[str, Any]:
+    """Operações enviadas/recusadas, hashes refeitos e ocupação atual do pool"""
+    with _stats_lock:
+        stats = dict(_stats)
+    capacity = HASH_WORKERS + HASH_QUEUE_SIZE
+    stats["pending"] = capacity - _slots._value
+    stats["workers"] = HASH_WORKERS
+    stats["queue_size"] = HASH_QUEUE_SIZE
+    stats["bcrypt_rounds"] = BCRYPT_ROUNDS
+    return stats
@@ -0,0 +1,141 @@
+import json
+from typing import Any, Dict, Optional, Union
+
+# Ordem fixa: a posição define o bit. Recursos novos entram SEMPRE no fim
+# (reordenar muda o significado das máscaras já gravadas e dos tokens emitidos).
+RESOURCES = ("employees", "teams", "managers", "knowledge", "areas", "admin", "users", "system")
+ACTIONS = ("read", "write", "delete")
+
+
+# ============================================================================
+# 🧮 TABELA DE BITS (RECURSO × AÇÃO)
+# ============================================================================
+# bit = índice_do_recurso * len(ACTIONS) + índice_da_ação
+#   employees.read = 1 << 0, employees.write = 1 << 1, employees.delete = 1 << 2,
+#   teams.read     = 1 << 3, ...
+
+PERMISSION_BITS: Dict[tuple, int] = {
+    (resource, action): 1 << (r * len(ACTIONS) + a)
+    for r, resource in enumerate(RESOURCES)
+    for a, action in enumerate(ACTIONS)
+}
+
+ALL_PERMISSIONS = (1 << (len(RESOURCES) * len(ACTIONS))) - 1
+
+
+def permission_bit(resource: str, action: str = "read") -> int:
+    """Bit de uma permissão; recurso/ação desconhecidos levantam ValueError"""
+    try:
+        return PERMISSION_BITS[(resource, action)]
+    except KeyError:
+        raise ValueError(f"Permissão desconhecida: {resource}.{action}") from None
+
+
+def _parse_permissions(permissions: Union[Dict[str, Any], str, None]) -> Dict[str, Any]:
+    """dict de permissões a partir do dict ou do texto de users.permissions ({} se inválido)"""
+    if isinstance(permissions, str):
+        try:
+            permissions = json.loads(permissions) if permissions.strip() else {}
+        except ValueError:
+            return {}
+    return permissions if isinstance(permissions, dict) else {}
+
+
+def compile_permissions(permissions: Union[Dict[str, Any], str, None]) -> int:
+    """Converter o JSON aninhado ({"employees": {"read": true, ...}}) em máscara
+
+    Recursos/ações fora da tabela são ignorados; aceita o dict ou o texto
+    JSON como está gravado em users.permissions.
+    """
+    mask = 0
+    for resource, actions in _parse_permissions(permissions).items():
+        if not isinstance(actions, dict):
+            continue
+        for action, allowed in actions.items():
+            if allowed:
+                mask |= PERMISSION_BITS.get((resource, action), 0)
+    return mask
+
+
+def expand_permissions(mask: int) -> Dict[str, Dict[str, bool]]:
+    """Inverso de compile_permissions (para respostas da API e telas de admin)"""
+    return {
+        resource: {action: bool(mask & PERMISSION_BITS[(resource, action)]) for action in ACTIONS}
+        for resource in RESOURCES
+    }
+
+
+# ============================================================================
+# 👥 MÁSCARAS POR PAPEL (PRÉ-CALCULADAS)
+# ============================================================================
+
+# Mesmo padrão de models.user.User.permissions: leitura dos cadastros, sem admin
+DEFAULT_USER_PERMISSIONS = {
+    "employees": {"read": True},
+    "teams": {"read": True},
+    "managers": {"read": True},
+    "knowledge": {"read": True},
+    "areas": {"read": True},
+}
+
+ROLE_MASKS: Dict[str, int] = {
+    "admin": ALL_PERMISSIONS,
+    "user": compile_permissions(DEFAULT_USER_PERMISSIONS),
+}
+
+
+def role_of(user: Any) -> str:
+    is_admin = user.get("is_admin") if isinstance(user, dict) else getattr(user, "is_admin", False)
+    return "admin" if is_admin else "user"
+
+
+def user_permission_mask(user: Any) -> int:
+    """Máscara efetiva de um usuário (dict do SQLite, modelo ORM ou payload de token)
+
+    Admin tem tudo; senão vale a máscara gravada (permission_mask), depois o
+    JSON de permissões e, se o usuário não tem nenhuma definida, a do papel.
+    """
+    def field(name: str) -> Optional[Any]:
+        return user.get(name) if isinstance(user, dict) else getattr(user, name, None)
+
+    role = role_of(user)
+    if role == "admin":
+        return ROLE_MASKS["admin"]
+
+    stored = field("permission_mask")
+    if stored is not None:
+        return int(stored)
+
+    permissions = _parse_permissions(field("permissions"))
+    if permissions:
+        return compile_permissions(permissions)
+    return ROLE_MASKS[role]
+
+
+def has_permission(mask: int, resource: str, action: str = "read") -> bool:
+    return bool(mask & permission_bit(resource, action))
+
+
+def token_permission_mask(payload: Dict[str, Any]) -> int:
+    """Máscara de um payload de JWT; tokens anteriores à máscara caem no JSON/papel"""
+    mask = payload.get("perm_mask")
+    if mask is not None:
+        return mask
+    return user_permission_mask(payload)
+
+
+# ============================================================================
+# 💾 PERSISTÊNCIA
+# ============================================================================
+
+def store_permission_mask(cursor, user_id: int, user: Any):
+    """Gravar a máscara compilada do usuário recém-criado
+
+    Sem a coluna (banco antes da migration 008) não faz nada: o login
+    compila a partir de users.permissions.
+    """
+    from app.database import schema_registry
+
+    if "permission_mask" in schema_registry.columns("users"):
+        cursor.execute("UPDATE users SET permission_mask = ? WHERE id = ?",
+                       (user_permission_mask(user), user_id))
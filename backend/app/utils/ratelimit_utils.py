@@ -0,0 +1,220 @@
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# GESTAO360_RATE_LIMIT=0 desliga o limitador (ex.: testes de carga)
+RATE_LIMIT_ENABLED = os.getenv("GESTAO360_RATE_LIMIT", "1") != "0"
+
+# Atrás de proxy reverso o IP do cliente vem no X-Forwarded-For (só confiar se configurado)
+TRUST_PROXY = os.getenv("GESTAO360_TRUST_PROXY", "0") == "1"
+
+# Intervalo (s) entre varreduras de buckets ociosos e limite antes de forçar uma varredura
+EVICT_INTERVAL = float(os.getenv("GESTAO360_RATE_EVICT_INTERVAL", "60"))
+MAX_BUCKETS = int(os.getenv("GESTAO360_RATE_MAX_BUCKETS", "50000"))
+
+WRITE_METHODS = frozenset(("POST", "PUT", "PATCH", "DELETE"))
+
+
+# ============================================================================
+# 📏 ORÇAMENTOS POR ROTA
+# ============================================================================
+# Cada orçamento tem um bucket por IP e, quando o cliente se identifica, um por
+# usuário. Valores no formato "rajada/por_minuto", ajustáveis por env, ex.:
+# GESTAO360_RATE_LOGIN_IP=20/60.
+
+class Limit:
+    __slots__ = ("burst", "rate")
+
+    def __init__(self, burst: int, per_minute: float):
+        self.burst = float(burst)
+        self.rate = per_minute / 60.0  # tokens por segundo
+
+    def __repr__(self):
+        return f"{int(self.burst)}/{round(self.rate * 60, 2)}"
+
+
+def _limit(name: str, default: str) -> Limit:
+    value = os.getenv(f"GESTAO360_RATE_{name}", default)
+    try:
+        burst, per_minute = value.split("/")
+        return Limit(int(burst), float(per_minute))
+    except ValueError:
+        logger.warning(f"⚠️ GESTAO360_RATE_{name}='{value}' inválido, usando {default}")
+        burst, per_minute = default.split("/")
+        return Limit(int(burst), float(per_minute))
+
+
+LIMITS: Dict[str, Dict[str, Limit]] = {
+    # bcrypt a cada tentativa; "user" é o username tentado (checado no handler de login)
+    "login": {"ip": _limit("LOGIN_IP", "10/30"), "user": _limit("LOGIN_USER", "5/10")},
+    # Jobs administrativos pesados (backup, retenção, reconciliação de contadores)
+    "admin_jobs": {"ip": _limit("ADMIN_JOBS_IP", "5/10"), "user": _limit("ADMIN_JOBS_USER", "3/6")},
+    # Demais escritas: disputam o lock de escrita do SQLite
+    "write": {"ip": _limit("WRITE_IP", "60/600"), "user": _limit("WRITE_USER", "30/300")},
+}
+
+ROUTE_BUDGETS: Dict[Tuple[str, str], str] = {
+    ("POST", "/auth/token"): "login",
+    ("POST", "/admin/backup"): "admin_jobs",
+    ("POST", "/admin/logs/retention"): "admin_jobs",
+    ("POST", "/admin/counters/reconcile"): "admin_jobs",
+}
+
+
+def budget_for(method: str, path: str) -> Optional[str]:
+    """Orçamento aplicável ao request (None para leituras)"""
+    budget = ROUTE_BUDGETS.get((method, path.rstrip("/") or "/"))
+    if budget:
+        return budget
+    return "write" if method in WRITE_METHODS else None
+
+
+# ============================================================================
+# 🪣 TOKEN BUCKETS
+# ============================================================================
+# Acessados só pelo event loop (middleware e handler async de login): sem lock,
+# como os contadores do metrics_utils. Um bucket ocioso volta a ficar cheio e
+# então é equivalente a um bucket novo, por isso a varredura o descarta sem
+# mudar o comportamento.
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+_buckets: Dict[Tuple[str, str, str], _Bucket] = {}
+_next_eviction = 0.0
+
+# (orçamento, escopo, resultado) → requests
+_decisions: Dict[Tuple[str, str, str], int] = {}
+_stats = {"evicted": 0, "eviction_runs": 0}
+
+
+def _count(budget: str, scope: str, result: str):
+    key = (budget, scope, result)
+    _decisions[key] = _decisions.get(key, 0) + 1
+
+
+def evict_idle_buckets(now: Optional[float] = None) -> int:
+    """Descartar buckets que já reabasteceram por completo"""
+    now = time.monotonic() if now is None else now
+    idle = []
+    for key, bucket in _buckets.items():
+        limit = LIMITS[key[0]][key[1]]
+        if bucket.tokens + (now - bucket.updated) * limit.rate >= limit.burst:
+            idle.append(key)
+    for key in idle:
+        del _buckets[key]
+    _stats["evicted"] += len(idle)
+    _stats["eviction_runs"] += 1
+    return len(idle)
+
+
+def consume(budget: str, scope: str, identity: str) -> float:
+    """Gastar um token; retorna 0 se permitido ou os segundos até o próximo token"""
+    if not RATE_LIMIT_ENABLED:
+        return 0.0
+
+    global _next_eviction
+    now = time.monotonic()
+    if now >= _next_eviction or len(_buckets) >= MAX_BUCKETS:
+        evict_idle_buckets(now)
+        _next_eviction = now + EVICT_INTERVAL
+
+    limit = LIMITS[budget][scope]
+    key = (budget, scope, identity)
+    bucket = _buckets.get(key)
+    if bucket is None:
+        bucket = _buckets[key] = _Bucket(limit.burst, now)
+    else:
+        bucket.tokens = min(limit.burst, bucket.tokens + (now - bucket.updated) * limit.rate)
+        bucket.updated = now
+
+    if bucket.tokens >= 1:
+        bucket.tokens -= 1
+        _count(budget, scope, "allowed")
+        return 0.0
+
+    _count(budget, scope, "limited")
+    return (1 - bucket.tokens) / limit.rate if limit.rate > 0 else float(EVICT_INTERVAL)
+
+
+def retry_after_header(retry_after: float) -> Dict[str, str]:
+    """Retry-After em segundos inteiros (arredondado para cima, mínimo 1)"""
+    return {"Retry-After": str(max(1, math.ceil(retry_after)))}
+
+
+def too_many_requests(retry_after: float, detail: str = "Muitas requisições, tente novamente") -> JSONResponse:
+    """429 no mesmo formato do HTTPException"""
+    return JSONResponse(status_code=429, content={"detail": detail}, headers=retry_after_header(retry_after))
+
+
+# ============================================================================
+# 🚦 CHECAGEM DO REQUEST (MIDDLEWARE)
+# ============================================================================
+
+def client_ip(request: Request) -> str:
+    if TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _request_user(request: Request) -> Optional[str]:
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+
+    from app.utils.auth import token_subject
+    return token_subject(token)
+
+
+def check_request(request: Request) -> Optional[JSONResponse]:
+    """Resposta 429 se o request estourou o orçamento da rota (None para seguir)"""
+    if not RATE_LIMIT_ENABLED:
+        return None
+
+    budget = budget_for(request.method, request.url.path)
+    if budget is None:
+        return None
+
+    retry_after = consume(budget, "ip", client_ip(request))
+    # O bucket por usuário do login é checado no handler, que conhece o username
+    if not retry_after and budget != "login":
+        user = _request_user(request)
+        if user:
+            retry_after = consume(budget, "user", user)
+
+    if retry_after:
+        logger.warning(f"🚦 Limite '{budget}' atingido: {request.method} {request.url.path} "
+                       f"(retry em {math.ceil(retry_after)}s)")
+        return too_many_requests(retry_after)
+    return None
+
+
+def get_rate_limit_stats() -> Dict[str, Any]:
+    """Decisões por orçamento/escopo, buckets ativos e limites configurados"""
+    decisions: Dict[str, Dict[str, Dict[str, int]]] = {}
+    for (budget, scope, result), count in sorted(_decisions.items()):
+        decisions.setdefault(budget, {}).setdefault(scope, {})[result] = count
+
+    return {
+        "enabled": RATE_LIMIT_ENABLED,
+        "buckets": len(_buckets),
+        "decisions": decisions,
+        "limits": {budget: {scope: repr(limit) for scope, limit in scopes.items()}
+                   for budget, scopes in LIMITS.items()},
+        **_stats,
+    }
@@ -0,0 +1,274 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from app.database import SQLITE_DB_PATH, apply_pragmas
+
+logger = logging.getLogger(__name__)
+
+
+def _env_days(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"⚠️ {name}='{value}' inválido, usando {default:g} dias")
+        return default
+
+
+# Linhas de system_logs mais antigas que isso saem da tabela principal (0 desativa).
+# Variável própria: GESTAO360_LOG_RETENTION_DAYS é a idade dos arquivos de log (logging_utils)
+SYSTEM_LOGS_RETENTION_DAYS = _env_days("GESTAO360_SYSTEM_LOGS_RETENTION_DAYS", 90)
+
+# Banco anexado com as tabelas mensais; vazio = tabelas mensais no próprio banco
+LOG_ARCHIVE_DB = os.getenv(
+    "GESTAO360_LOG_ARCHIVE_DB",
+    os.path.join(os.path.dirname(SQLITE_DB_PATH), "gestao360_archive.db")
+)
+
+# Meses de arquivo mantidos; tabelas mensais mais antigas são removidas (0 = manter todas)
+LOG_ARCHIVE_MONTHS = int(os.getenv("GESTAO360_LOG_ARCHIVE_MONTHS", "0"))
+
+# Linhas movidas por transação e pausa entre lotes: a tabela nunca fica travada por muito tempo
+LOG_RETENTION_BATCH = int(os.getenv("GESTAO360_LOG_RETENTION_BATCH", "500"))
+LOG_RETENTION_PAUSE = float(os.getenv("GESTAO360_LOG_RETENTION_PAUSE", "0.05"))
+
+# Intervalo entre execuções do job em segundos
+LOG_RETENTION_INTERVAL = float(os.getenv("GESTAO360_LOG_RETENTION_INTERVAL", "3600"))
+
+ARCHIVE_SCHEMA = "archive"
+ARCHIVE_TABLE_PATTERN = re.compile(r"^system_logs_(\d{6})$")
+
+
+# ============================================================================
+# 🗄️ TABELAS DE ARQUIVO
+# ============================================================================
+
+def archive_table_name(month: str) -> str:
+    """Tabela mensal para um mês ``YYYY-MM`` (system_logs_YYYYMM)"""
+    return f"system_logs_{month.replace('-', '')}"
+
+
+def _attach_archive(conn: sqlite3.Connection, archive_db: str) -> str:
+    """Anexar o banco de arquivo (se configurado) e retornar o schema das tabelas mensais"""
+    if not archive_db:
+        return "main"
+    conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (archive_db,))
+    return ARCHIVE_SCHEMA
+
+
+def _archive_tables(conn: sqlite3.Connection, schema: str) -> List[str]:
+    rows = conn.execute(
+        f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table' AND name LIKE 'system_logs_%'"
+    ).fetchall()
+    return sorted(name for (name,) in rows if ARCHIVE_TABLE_PATTERN.match(name))
+
+
+def _ensure_archive_table(conn: sqlite3.Connection, schema: str, table: str, columns: List[str]):
+    # Sem tipos nem FKs: o arquivo só guarda o que existia; id único torna a cópia idempotente
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {schema}.{table} ({', '.join(columns)})")
+    conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {schema}.{table}_id ON {table}(id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.{table}_created_at ON {table}(created_at)")
+
+
+# ============================================================================
+# ✂️ PODA INCREMENTAL
+# ============================================================================
+
+_last_run: Optional[Dict[str, Any]] = None
+_run_lock = threading.Lock()
+
+# Sinaliza shutdown: a poda em andamento para no próximo lote
+_stop = threading.Event()
+
+
+def _move_batch(conn: sqlite3.Connection, schema: str, columns: List[str],
+                cutoff: str, batch_size: int, months: Dict[str, int]) -> int:
+    """Copiar um lote para as tabelas mensais e só então removê-lo de system_logs"""
+    rows = conn.execute(
+        "SELECT id, substr(created_at, 1, 7) FROM main.system_logs "
+        "WHERE created_at < ? ORDER BY created_at LIMIT ?",
+        (cutoff, batch_size)
+    ).fetchall()
+    if not rows:
+        return 0
+
+    by_month: Dict[str, List[int]] = {}
+    for row_id, month in rows:
+        by_month.setdefault(month, []).append(row_id)
+
+    column_list = ", ".join(columns)
+
+    # Logs são só de inserção: as linhas antigas não mudam entre as duas transações.
+    # Uma queda entre elas deixa cópias que o INSERT OR IGNORE absorve na próxima execução.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for month, ids in by_month.items():
+            table = archive_table_name(month)
+            _ensure_archive_table(conn, schema, table, columns)
+            conn.execute(
+                f"INSERT OR IGNORE INTO {schema}.{table} ({column_list}) "
+                f"SELECT {column_list} FROM main.system_logs WHERE id IN ({', '.join('?' for _ in ids)})",
+                ids
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    ids = [row_id for row_id, _ in rows]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(f"DELETE FROM main.system_logs WHERE id IN ({', '.join('?' for _ in ids)})", ids)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    for month, ids in by_month.items():
+        months[month] = months.get(month, 0) + len(ids)
+    return len(rows)
+
+
+def _drop_expired_archives(conn: sqlite3.Connection, schema: str, keep_months: int) -> List[str]:
+    if keep_months <= 0:
+        return []
+
+    now = datetime.now(timezone.utc)
+    # Primeiro mês mantido, contando o mês atual
+    month_index = now.year * 12 + now.month - 1 - (keep_months - 1)
+    oldest_kept = f"{month_index // 12:04d}{month_index % 12 + 1:02d}"
+
+    dropped = []
+    for table in _archive_tables(conn, schema):
+        if ARCHIVE_TABLE_PATTERN.match(table).group(1) < oldest_kept:
+            conn.execute(f"DROP TABLE {schema}.{table}")
+            dropped.append(table)
+    return dropped
+
+
+def prune_system_logs(retention_days: float = SYSTEM_LOGS_RETENTION_DAYS, db_path: str = SQLITE_DB_PATH,
+                      archive_db: str = LOG_ARCHIVE_DB, batch_size: int = LOG_RETENTION_BATCH,
+                      max_batches: Optional[int] = None) -> Dict[str, Any]:
+    """Mover para o arquivo mensal as linhas de system_logs mais antigas que ``retention_days``
+
+    Trabalha em lotes de ``batch_size`` linhas com transações curtas, para que a
+    fila de auditoria e os requests continuem gravando durante a poda.
+    """
+    report = {
+        "retention_days": retention_days,
+        "archived": 0,
+        "batches": 0,
+        "months": {},
+        "dropped_tables": [],
+        "archive": archive_db or "main",
+        "started_at": datetime.now().isoformat(),
+    }
+    if retention_days <= 0:
+        report["skipped"] = "retenção desativada"
+        return report
+
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+    report["cutoff"] = cutoff
+    started = time.perf_counter()
+
+    with _run_lock:
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        apply_pragmas(conn)
+        try:
+            columns = [row[1] for row in conn.execute("PRAGMA main.table_info(system_logs)")]
+            if not columns:
+                report["skipped"] = "tabela system_logs não encontrada"
+                return report
+
+            # Consulta barata antes do ATTACH: sem linhas vencidas o arquivo nem é aberto
+            # (a não ser para descartar meses expirados de um arquivo que já existe)
+            has_expired_rows = conn.execute(
+                "SELECT 1 FROM main.system_logs WHERE created_at < ? LIMIT 1", (cutoff,)
+            ).fetchone() is not None
+            archive_exists = not archive_db or os.path.exists(archive_db)
+            if not has_expired_rows and not (LOG_ARCHIVE_MONTHS > 0 and archive_exists):
+                report["skipped"] = "nenhuma linha anterior ao corte"
+            else:
+                schema = _attach_archive(conn, archive_db)
+
+                while has_expired_rows and (max_batches is None or report["batches"] < max_batches):
+                    if _stop.is_set():
+                        break
+                    moved = _move_batch(conn, schema, columns, cutoff, batch_size, report["months"])
+                    if not moved:
+                        break
+                    report["archived"] += moved
+                    report["batches"] += 1
+                    if moved < batch_size:
+                        break
+                    time.sleep(LOG_RETENTION_PAUSE)
+
+                report["dropped_tables"] = _drop_expired_archives(conn, schema, LOG_ARCHIVE_MONTHS)
+                report["archive_tables"] = _archive_tables(conn, schema)
+        finally:
+            conn.close()
+
+    report["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    global _last_run
+    _last_run = report
+
+    if report["archived"] or report["dropped_tables"]:
+        logger.info(f"🗄️ Retenção de logs: {report['archived']} linha(s) arquivada(s) em "
+                    f"{report['batches']} lote(s), {len(report['dropped_tables'])} tabela(s) removida(s)")
+    return report
+
+
+# ============================================================================
+# ⏱️ JOB EM BACKGROUND
+# ============================================================================
+
+_job: Optional[threading.Thread] = None
+
+
+def _job_loop():
+    while not _stop.is_set():
+        try:
+            prune_system_logs()
+        except Exception as e:
+            logger.error(f"❌ Erro na retenção de system_logs: {e}")
+        _stop.wait(LOG_RETENTION_INTERVAL)
+
+
+def start_retention_job():
+    """Iniciar a poda periódica de system_logs (idempotente; não inicia com retenção 0)"""
+    global _job
+    if SYSTEM_LOGS_RETENTION_DAYS <= 0 or (_job is not None and _job.is_alive()):
+        return
+    _stop.clear()
+    _job = threading.Thread(target=_job_loop, name="gestao360-log-retention", daemon=True)
+    _job.start()
+
+
+def stop_retention_job(timeout: float = 5.0):
+    global _job
+    if _job is None:
+        return
+    _stop.set()
+    _job.join(timeout=timeout)
+    _job = None
+
+
+def get_retention_stats() -> Dict[str, Any]:
+    """Configuração da retenção e relatório da última execução"""
+    return {
+        "retention_days": SYSTEM_LOGS_RETENTION_DAYS,
+        "archive": LOG_ARCHIVE_DB or "main",
+        "archive_months": LOG_ARCHIVE_MONTHS,
+        "interval_seconds": LOG_RETENTION_INTERVAL,
+        "job_running": _job is not None and _job.is_alive(),
+        "last_run": _last_run,
+    }
@@ -0,0 +1,43 @@
+import re
+from typing import Optional
+
+# Palavras (incluindo letras acentuadas); pontuação e operadores FTS são descartados
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Tokens muito curtos geram prefixos caros e pouco seletivos
+MIN_PREFIX_LENGTH = 2
+
+
+# ============================================================================
+# 🔎 CONSULTAS FTS5
+# ============================================================================
+
+def build_fts_query(text: str, prefix: bool = True) -> Optional[str]:
+    """Converter texto livre em expressão MATCH segura (todos os termos, AND)
+
+    Cada termo vira uma frase entre aspas, então caracteres como ``"``, ``*``,
+    ``-`` ou ``OR`` digitados pelo usuário nunca são interpretados como sintaxe.
+    Com ``prefix`` o termo casa prefixos (type-ahead: "and" → "André").
+
+    Retorna None quando não sobra nenhum termo com MIN_PREFIX_LENGTH letras
+    ("p", "a b"): o chamador usa a busca por LIKE, que casa qualquer trecho.
+    """
+    if not text:
+        return None
+
+    tokens = _TOKEN_PATTERN.findall(text)
+    # Último termo curto é a palavra ainda sendo digitada ("aws c"): como
+    # frase exata não casaria nada, então fica de fora da expressão
+    if prefix and tokens and len(tokens[-1]) < MIN_PREFIX_LENGTH:
+        tokens.pop()
+    if not any(len(token) >= MIN_PREFIX_LENGTH for token in tokens):
+        return None
+
+    terms = []
+    for token in tokens:
+        if prefix and len(token) >= MIN_PREFIX_LENGTH:
+            terms.append(f'"{token}"*')
+        else:
+            terms.append(f'"{token}"')
+
+    return " ".join(terms)
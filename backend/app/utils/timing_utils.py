@@ -0,0 +1,82 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+
+# Requests acima disso (ms) são logados como WARNING com o detalhamento de tempos
+SLOW_REQUEST_MS = float(os.getenv("GESTAO360_SLOW_REQUEST_MS", "500"))
+
+
+# ============================================================================
+# ⏱️ TEMPOS DO REQUEST
+# ============================================================================
+
+class RequestTimings:
+    """Acumulador de um request: consultas SQL, linhas lidas e tempo em SQLite/JSON
+
+    Preenchido pelas conexões do pool (database.TracedCursor) e pela resposta
+    JSON; a thread do handler recebe uma cópia do contexto, mas o objeto é o mesmo.
+    """
+    __slots__ = ("queries", "rows", "db_seconds", "json_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.db_seconds = 0.0
+        self.json_seconds = 0.0
+
+    @property
+    def db_ms(self) -> float:
+        return round(self.db_seconds * 1000, 2)
+
+    @property
+    def json_ms(self) -> float:
+        return round(self.json_seconds * 1000, 2)
+
+
+_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """Acumulador do request atual (None fora de um request)"""
+    return _timings.get()
+
+
+def start_request_timings():
+    """Iniciar a medição do request; retorna (acumulador, token para reset)"""
+    timings = RequestTimings()
+    return timings, _timings.set(timings)
+
+
+def finish_request_timings(token):
+    _timings.reset(token)
+
+
+def server_timing_header(timings: RequestTimings, total_ms: float) -> str:
+    """Valor do header Server-Timing (aparece na aba Network do navegador)"""
+    return (
+        f'db;dur={timings.db_ms};desc="{timings.queries} queries, {timings.rows} rows", '
+        f'json;dur={timings.json_ms}, '
+        f'total;dur={total_ms}'
+    )
+
+
+# ============================================================================
+# 📦 RESPOSTA JSON MEDIDA
+# ============================================================================
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse que soma o tempo de serialização ao request atual"""
+
+    def render(self, content: Any) -> bytes:
+        timings = _timings.get()
+        if timings is None:
+            return super().render(content)
+
+        started = time.perf_counter()
+        try:
+            return super().render(content)
+        finally:
+            timings.json_seconds += time.perf_counter() - started
@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+"""Benchmarks de performance do backend Gestão 360.
+
+Uso:
+    python benchmark.py pragmas [--seconds 5] [--readers 4] [--rows 5000]
+    python benchmark.py concurrency [--url http://localhost:8000] [--seconds 10]
+    python benchmark.py plans [--db ./gestao360.db]
+    python benchmark.py search [--rows 100000]
+    python benchmark.py catalog [--rows 30000]
+    python benchmark.py stats [--rows 100000]
+    python benchmark.py logins [--url http://localhost:8000] [--db ./gestao360.db] [--clients 16]
+    python benchmark.py tokens [--repeat 20000]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from app.database import SQLITE_PRAGMA_PROFILES, apply_pragmas
+from app.migrate import run_migrations
+from app.utils.search_utils import build_fts_query
+
+
+# ============================================================================
+# 🗃️ PERFIS DE PRAGMA: LEITURA/ESCRITA CONCORRENTES
+# ============================================================================
+
+def _seed_employees(path: str, rows: int, profile: str):
+    conn = sqlite3.connect(path)
+    apply_pragmas(conn, profile)
+    conn.execute("""
+                 CREATE TABLE employees
+                 (
+                     id         INTEGER PRIMARY KEY AUTOINCREMENT,
+                     nome       TEXT NOT NULL,
+                     email      TEXT,
+                     cargo      TEXT,
+                     status     TEXT DEFAULT 'ATIVO',
+                     area_id    INTEGER,
+                     team_id    INTEGER,
+                     updated_at TEXT
+                 )
+                 """)
+    conn.executemany(
+        "INSERT INTO employees (nome, email, cargo, status, area_id, team_id) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (f"Funcionário {i}", f"user{i}@ol360.com", "Analista", "ATIVO" if i % 7 else "INATIVO", i % 4, i % 12)
+            for i in range(rows)
+        ]
+    )
+    conn.commit()
+    conn.close()
+
+
+def bench_pragmas(seconds: float, readers: int, rows: int):
+    """Comparar throughput de leitura/escrita concorrentes entre perfis"""
+    print(f"📊 {readers} leitores + 1 escritor por {seconds}s, {rows} funcionários")
+    print(f"{'perfil':<12} {'leituras/s':>12} {'escritas/s':>12} {'locked':>8}")
+
+    for profile in SQLITE_PRAGMA_PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            _seed_employees(path, rows, profile)
+
+            stop = threading.Event()
+            counters = {"reads": 0, "writes": 0, "locked": 0}
+            lock = threading.Lock()
+
+            def reader():
+                conn = sqlite3.connect(path, timeout=5)
+                apply_pragmas(conn, profile)
+                local = 0
+                while not stop.is_set():
+                    conn.execute("SELECT status, COUNT(*) FROM employees GROUP BY status").fetchall()
+                    conn.execute("SELECT id, nome FROM employees WHERE area_id = ? ORDER BY nome LIMIT 50",
+                                 (local % 4,)).fetchall()
+                    local += 1
+                conn.close()
+                with lock:
+                    counters["reads"] += local
+
+            def writer():
+                conn = sqlite3.connect(path, timeout=5)
+                apply_pragmas(conn, profile)
+                local = 0
+                locked = 0
+                while not stop.is_set():
+                    try:
+                        conn.execute("UPDATE employees SET updated_at = datetime('now'), cargo = ? WHERE id = ?",
+                                     (f"Analista {local}", local % rows + 1))
+                        conn.commit()
+                        local += 1
+                    except sqlite3.OperationalError:
+                        locked += 1
+                conn.close()
+                with lock:
+                    counters["writes"] += local
+                    counters["locked"] += locked
+
+            threads = [threading.Thread(target=reader) for _ in range(readers)]
+            threads.append(threading.Thread(target=writer))
+            for t in threads:
+                t.start()
+            time.sleep(seconds)
+            stop.set()
+            for t in threads:
+                t.join()
+
+            print(f"{profile:<12} {counters['reads'] / seconds:>12.0f} "
+                  f"{counters['writes'] / seconds:>12.0f} {counters['locked']:>8}")
+
+
+# ============================================================================
+# ⚡ CONCORRÊNCIA: LATÊNCIA DE ENDPOINTS LEVES COM LISTAGEM PESADA EM CURSO
+# ============================================================================
+
+def _percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def bench_concurrency(url: str, seconds: float, heavy_path: str, heavy_clients: int, cheap_paths):
+    """Medir p50/p99 de endpoints leves enquanto uma listagem pesada está em curso"""
+    import requests
+
+    stop = threading.Event()
+    heavy_done = []
+
+    def heavy():
+        session = requests.Session()
+        while not stop.is_set():
+            started = time.perf_counter()
+            session.get(f"{url}{heavy_path}", timeout=60)
+            heavy_done.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=heavy) for _ in range(heavy_clients)]
+    for t in threads:
+        t.start()
+
+    session = requests.Session()
+    samples = {path: [] for path in cheap_paths}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for path in cheap_paths:
+            started = time.perf_counter()
+            session.get(f"{url}{path}", timeout=60)
+            samples[path].append((time.perf_counter() - started) * 1000)
+
+    stop.set()
+    for t in threads:
+        t.join()
+
+    print(f"📊 {heavy_clients} cliente(s) em {heavy_path} "
+          f"({len(heavy_done)} respostas, média {statistics.mean(heavy_done) * 1000 if heavy_done else 0:.0f} ms)")
+    print(f"{'endpoint':<24} {'n':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for path, values in samples.items():
+        if values:
+            print(f"{path:<24} {len(values):>6} {_percentile(values, 50):>8.1f} {_percentile(values, 99):>8.1f}")
+
+
+# ============================================================================
+# 📇 PLANOS DE CONSULTA: NENHUMA CONSULTA QUENTE PODE VIRAR FULL SCAN
+# ============================================================================
+
+# (descrição, SQL, índice esperado no plano)
+HOT_QUERY_PLANS = [
+    ("employees listagem",
+     "SELECT id, nome FROM employees WHERE status != 'DELETED' ORDER BY nome",
+     "idx_employees_active_nome"),
+    ("employees página (cursor)",
+     "SELECT id, nome FROM employees WHERE status != 'DELETED' AND (nome, id) > (?, ?) ORDER BY nome, id LIMIT ?",
+     "idx_employees_active_nome"),
+    ("employees por área",
+     "SELECT id, nome FROM employees WHERE status != 'DELETED' AND area_id = ? ORDER BY nome",
+     "idx_employees_area_nome"),
+    ("employees por equipe",
+     "SELECT id, nome FROM employees WHERE status != 'DELETED' AND team_id = ? ORDER BY nome",
+     "idx_employees_team_nome"),
+    ("employees por gestor",
+     "SELECT id, nome FROM employees WHERE manager_id = ?",
+     "idx_employees_manager"),
+    ("vínculos por funcionário",
+     "SELECT ek.id FROM employee_knowledge ek WHERE ek.employee_id = ? ORDER BY ek.id",
+     "idx_employee_knowledge_employee"),
+    ("vínculos por item",
+     "SELECT ek.id FROM employee_knowledge ek WHERE ek.learning_item_id = ? ORDER BY ek.status, ek.prioridade",
+     "idx_employee_knowledge_item"),
+    ("certificações vencendo",
+     "SELECT COUNT(*) FROM employee_knowledge "
+     "WHERE data_expiracao <= date('now', '+30 days') AND status = 'OBTIDO'",
+     "idx_employee_knowledge_expiry"),
+]
+
+
+def _plan_problems(plan_lines, expected_index):
+    problems = []
+    for line in plan_lines:
+        if line.startswith("SCAN ") and " USING " not in line:
+            problems.append(f"full scan: {line}")
+        if "USE TEMP B-TREE" in line:
+            problems.append(f"ordenação sem índice: {line}")
+    if not any(expected_index in line for line in plan_lines):
+        problems.append(f"índice {expected_index} não utilizado")
+    return problems
+
+
+def check_plans(db_path=None) -> int:
+    """Verificar EXPLAIN QUERY PLAN das consultas quentes; retorna 1 em regressão"""
+    with tempfile.TemporaryDirectory() as tmp:
+        if db_path is None:
+            db_path = os.path.join(tmp, "plans.db")
+            report = run_migrations(db_path)
+            print(f"🗃️ Schema novo: {', '.join(report['applied'])}")
+
+        conn = sqlite3.connect(db_path)
+
+        failures = 0
+        for description, sql, expected_index in HOT_QUERY_PLANS:
+            params = (1,) * sql.count("?")
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            problems = _plan_problems(plan, expected_index)
+            print(f"{'❌' if problems else '✅'} {description:<26} {' | '.join(plan)}")
+            for problem in problems:
+                print(f"    ↳ {problem}")
+            failures += bool(problems)
+        conn.close()
+
+    return 1 if failures else 0
+
+
+# ============================================================================
+# 🔎 BUSCA: LIKE '%x%' x FTS5
+# ============================================================================
+
+FIRST_NAMES = ["André", "Breno", "Danilo", "Luís", "Rogério", "Sérgio", "Willian", "Ana", "Júlia", "Márcia",
+               "Patrícia", "Fábio", "João", "Mônica", "Cláudio", "Letícia", "Otávio", "Vinícius", "Bárbara", "Caio"]
+LAST_NAMES = ["Araújo", "Brazioli", "Cavalcante", "Dias", "Kubo", "Pegorário", "Arévalo", "Conceição",
+              "Simões", "Gonçalves", "Magalhães", "Guimarães", "Assunção", "Falcão", "Brandão"]
+ROLES = ["Analista", "Desenvolvedor Backend", "Desenvolvedor Frontend", "Gerente de Projetos",
+         "Arquiteto de Soluções", "Engenheiro de Dados", "Analista de Segurança", "Diretor Técnico"]
+SQUADS = ["Plataforma", "Pagamentos", "Dados", "Infraestrutura", "Mobile", "Atendimento"]
+
+
+def _seed_search_employees(path: str, rows: int):
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO employees (nome, email, cpf, data_nascimento, cargo, equipe, data_admissao) "
+        "VALUES (?, ?, ?, '1990-01-01', ?, ?, '2020-01-01')",
+        [
+            (f"{FIRST_NAMES[i % 20]} {LAST_NAMES[(i // 20) % 15]} {i}",
+             f"user{i}@ol360.com", f"{i:011d}", ROLES[i % 8], SQUADS[i % 6])
+            for i in range(rows)
+        ]
+    )
+    conn.commit()
+    conn.close()
+
+
+def bench_search(rows: int, repeat: int):
+    """Comparar latência de busca LIKE x FTS5 com N funcionários"""
+    queries = ["rogerio", "Pegorário", "and ara", "segurança", "user4242", "Mônica Falcão"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "search.db")
+        run_migrations(path)
+        started = time.perf_counter()
+        _seed_search_employees(path, rows)
+        print(f"📊 {rows} funcionários indexados em {time.perf_counter() - started:.1f}s")
+
+        conn = sqlite3.connect(path)
+        like_sql = "SELECT id FROM employees WHERE status != 'DELETED' AND nome LIKE ? ORDER BY nome LIMIT 20"
+        fts_sql = ("SELECT e.id FROM employees_fts JOIN employees e ON e.id = employees_fts.rowid "
+                   "WHERE employees_fts MATCH ? AND e.status != 'DELETED' "
+                   "ORDER BY bm25(employees_fts, 10.0, 2.0, 4.0, 1.0) LIMIT 20")
+
+        print(f"{'consulta':<16} {'LIKE ms':>9} {'hits':>6} {'FTS ms':>9} {'hits':>6}")
+        for text in queries:
+            timings = {}
+            for label, sql, param in (("like", like_sql, f"%{text}%"), ("fts", fts_sql, build_fts_query(text))):
+                samples = []
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    hits = len(conn.execute(sql, (param,)).fetchall())
+                    samples.append((time.perf_counter() - t0) * 1000)
+                timings[label] = (statistics.median(samples), hits)
+            print(f"{text:<16} {timings['like'][0]:>9.2f} {timings['like'][1]:>6} "
+                  f"{timings['fts'][0]:>9.2f} {timings['fts'][1]:>6}")
+        conn.close()
+
+
+# ============================================================================
+# 📚 CATÁLOGO: BUSCA RANQUEADA COM FACETAS EM /knowledge/search
+# ============================================================================
+
+TOPICS = ["Python", "AWS", "Kubernetes", "Segurança", "Gestão de Projetos", "Dados", "Redes", "React",
+          "Liderança", "Scrum", "Azure", "Machine Learning", "SQL", "Linux", "DevOps"]
+VENDORS = ["Amazon", "Microsoft", "Google", "Cisco", "PMI", "Linux Foundation", "Alura", "Udemy"]
+KINDS = ["CURSO", "CERTIFICACAO", "FORMACAO"]
+LEVELS = ["FACIL", "MEDIO", "DIFICIL"]
+
+
+def bench_catalog(rows: int, repeat: int):
+    """Latência de /knowledge/search (ranking + trechos + facetas) com N itens"""
+    with tempfile.TemporaryDirectory() as tmp:
+        # O banco da aplicação é relativo ao diretório atual
+        previous_cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            run_migrations("./gestao360.db")
+            conn = sqlite3.connect("./gestao360.db")
+            conn.executemany(
+                "INSERT INTO knowledge (nome, tipo, categoria, fornecedor, descricao, tags, pre_requisitos, dificuldade) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (f"{TOPICS[i % 15]} {['Fundamentos', 'Avançado', 'Na Prática', 'Especialista'][i % 4]} {i}",
+                     KINDS[i % 3], TOPICS[(i // 3) % 15], VENDORS[i % 8],
+                     f"Curso de {TOPICS[i % 15]} com foco em {TOPICS[(i * 7) % 15]} e projetos reais para times ágeis",
+                     f"{TOPICS[i % 15].lower()},{TOPICS[(i * 3) % 15].lower()}",
+                     f"Conhecimentos básicos de {TOPICS[(i * 5) % 15]}", LEVELS[i % 3])
+                    for i in range(rows)
+                ]
+            )
+            conn.commit()
+            conn.close()
+
+            from app.routers.knowledge import search_knowledge
+
+            print(f"📊 {rows} itens no catálogo")
+            print(f"{'consulta':<28} {'p50 ms':>8} {'max ms':>8} {'total':>7}")
+            cases = [
+                {"q": "kubernetes"},
+                {"q": "seguranca avan"},
+                {"q": "python", "tipo": "CERTIFICACAO"},
+                {"q": "microsoft azure"},
+                {"q": "liderança scrum", "dificuldade": "FACIL"},
+                {"q": "12345"},
+            ]
+            for case in cases:
+                samples = []
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    result = search_knowledge(limit=20, **case)
+                    samples.append((time.perf_counter() - t0) * 1000)
+                label = " ".join(f"{k}={v}" for k, v in case.items())
+                print(f"{label:<28} {statistics.median(samples):>8.2f} {max(samples):>8.2f} {result['total']:>7}")
+        finally:
+            os.chdir(previous_cwd)
+
+
+# ============================================================================
+# 📈 /admin/stats: CONSULTAS POR CHAMADA E LATÊNCIA (SEM CACHE x CACHE)
+# ============================================================================
+
+def bench_stats(rows: int, repeat: int):
+    """Contar consultas e medir /admin/stats com N funcionários"""
+    with tempfile.TemporaryDirectory() as tmp:
+        previous_cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            run_migrations("./gestao360.db")
+            _seed_search_employees("./gestao360.db", rows)
+            conn = sqlite3.connect("./gestao360.db")
+            conn.executemany(
+                "INSERT INTO employee_knowledge (employee_id, learning_item_id, status) VALUES (?, ?, ?)",
+                [(i, j, ["DESEJADO", "OBTIDO", "OBRIGATORIO"][(i + j) % 3])
+                 for i in range(1, rows // 2 + 1) for j in range(1, 5)]
+            )
+            conn.commit()
+            conn.close()
+
+            from app.database import sqlite_pool
+            from app.routers.admin import get_admin_stats
+            from app.utils.admin_utils import compute_admin_stats
+
+            statements = []
+            traced = sqlite_pool.acquire()
+            traced.set_trace_callback(statements.append)
+            traced.close()
+
+            print(f"📊 {rows} funcionários, {rows * 2} vínculos")
+            for label, invalidate in (("sem cache", True), ("com cache", False)):
+                get_admin_stats()
+                statements.clear()
+                samples = []
+                for _ in range(repeat):
+                    if invalidate:
+                        compute_admin_stats.cache.invalidate()
+                    t0 = time.perf_counter()
+                    get_admin_stats()
+                    samples.append((time.perf_counter() - t0) * 1000)
+                print(f"{label:<10} consultas/chamada={len(statements) / repeat:.1f} "
+                      f"p50={statistics.median(samples):.2f} ms max={max(samples):.2f} ms")
+        finally:
+            os.chdir(previous_cwd)
+
+
+# ============================================================================
+# 🔐 RAJADA DE LOGINS: THROUGHPUT DO BCRYPT E p99 DOS DEMAIS ENDPOINTS
+# ============================================================================
+
+BENCH_LOGIN_USER = "bench_login"
+BENCH_LOGIN_PASSWORD = "bench-login-123"
+
+
+def _seed_login_user(db_path: str):
+    """Criar (ou resetar) o usuário do benchmark com hash bcrypt no custo configurado"""
+    from app.utils.password_utils import hash_password_blocking
+
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO users (username, email, hashed_password, is_active) VALUES (?, ?, ?, 1) "
+        "ON CONFLICT(username) DO UPDATE SET hashed_password = excluded.hashed_password, is_active = 1",
+        (BENCH_LOGIN_USER, f"{BENCH_LOGIN_USER}@gestao360.local", hash_password_blocking(BENCH_LOGIN_PASSWORD))
+    )
+    conn.commit()
+    conn.close()
+
+
+def bench_logins(url: str, db_path: str, seconds: float, clients: int, cheap_paths):
+    """Logins/s e p50/p99 de endpoints leves durante uma rajada de logins
+
+    Suba o servidor com GESTAO360_RATE_LIMIT=0 para medir o pool de bcrypt;
+    com o rate limiter ativo os 429 vêm do bucket de login.
+    """
+    import requests
+
+    _seed_login_user(db_path)
+
+    stop = threading.Event()
+    results = {"ok": 0, "throttled": 0, "failed": 0}
+    results_lock = threading.Lock()
+
+    def storm():
+        session = requests.Session()
+        form = {"username": BENCH_LOGIN_USER, "password": BENCH_LOGIN_PASSWORD}
+        while not stop.is_set():
+            status = session.post(f"{url}/auth/token", data=form, timeout=60).status_code
+            key = "ok" if status == 200 else "throttled" if status == 429 else "failed"
+            with results_lock:
+                results[key] += 1
+            if status == 429:
+                time.sleep(0.05)
+
+    threads = [threading.Thread(target=storm) for _ in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+
+    session = requests.Session()
+    samples = {path: [] for path in cheap_paths}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for path in cheap_paths:
+            t0 = time.perf_counter()
+            session.get(f"{url}{path}", timeout=60)
+            samples[path].append((time.perf_counter() - t0) * 1000)
+
+    stop.set()
+    elapsed = time.perf_counter() - started
+    with results_lock:
+        measured = dict(results)
+    for t in threads:
+        t.join()
+
+    print(f"🔐 {clients} cliente(s) em /auth/token por {elapsed:.1f}s: "
+          f"{measured['ok'] / elapsed:.1f} logins/s, {measured['throttled']} respostas 429, "
+          f"{measured['failed']} falhas")
+    print(f"{'endpoint':<24} {'n':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for path, values in samples.items():
+        if values:
+            print(f"{path:<24} {len(values):>6} {_percentile(values, 50):>8.1f} {_percentile(values, 99):>8.1f}")
+
+
+# ============================================================================
+# 🎫 DEPENDÊNCIAS DE AUTENTICAÇÃO: JWT DECODIFICADO x CACHE
+# ============================================================================
+
+def bench_tokens(repeat: int):
+    """Custo de get_current_user_required + require_admin com e sem o cache de tokens"""
+    with tempfile.TemporaryDirectory() as tmp:
+        previous_cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            run_migrations("./gestao360.db")
+
+            from app.utils.auth import (
+                create_access_token, get_current_user_required, require_admin, token_cache, revoke_token
+            )
+
+            token = create_access_token({"sub": "admin", "user_id": 1, "is_admin": True,
+                                         "permissions": {"admin": {"read": True, "write": True}}})
+            require_admin(get_current_user_required(token))
+
+            for label, cold in (("jwt.decode", True), ("cache", False)):
+                samples = []
+                for _ in range(repeat):
+                    if cold:
+                        token_cache.clear()
+                    t0 = time.perf_counter()
+                    require_admin(get_current_user_required(token))
+                    samples.append((time.perf_counter() - t0) * 1_000_000)
+                print(f"{label:<11} p50={statistics.median(samples):.1f} µs "
+                      f"p99={_percentile(samples, 99):.1f} µs")
+
+            revoke_token(token)
+            try:
+                get_current_user_required(token)
+                print("❌ token revogado ainda aceito")
+                return 1
+            except Exception:
+                print("✅ token revogado recusado")
+        finally:
+            os.chdir(previous_cwd)
+
+
+def bench_permissions(repeat: int):
+    """require_permission: JSON aninhado do token x AND com perm_mask"""
+    from app.utils.auth import require_permission
+    from app.utils.permission_utils import DEFAULT_USER_PERMISSIONS, compile_permissions
+
+    legacy = {"sub": "ana", "permissions": DEFAULT_USER_PERMISSIONS}
+    compiled = {"sub": "ana", "perm_mask": compile_permissions(DEFAULT_USER_PERMISSIONS)}
+    check = require_permission("areas", "read")
+
+    for label, payload in (("json", legacy), ("perm_mask", compiled)):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            check(payload)
+        print(f"{label:<10} {(time.perf_counter() - t0) / repeat * 1_000_000_000:.0f} ns/checagem")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks Gestão 360")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("pragmas", help="Leitura/escrita concorrentes por perfil de PRAGMA")
+    p.add_argument("--seconds", type=float, default=5.0)
+    p.add_argument("--readers", type=int, default=4)
+    p.add_argument("--rows", type=int, default=5000)
+
+    p = sub.add_parser("concurrency", help="p99 de endpoints leves com listagem pesada em curso")
+    p.add_argument("--url", default="http://localhost:8000")
+    p.add_argument("--seconds", type=float, default=10.0)
+    p.add_argument("--heavy-path", default="/employee-knowledge/")
+    p.add_argument("--heavy-clients", type=int, default=4)
+    p.add_argument("--cheap-path", action="append", dest="cheap_paths")
+
+    p = sub.add_parser("plans", help="EXPLAIN QUERY PLAN das consultas quentes (falha em full scan)")
+    p.add_argument("--db", default=None, help="Banco já migrado a verificar (padrão: schema novo em arquivo temporário)")
+
+    p = sub.add_parser("search", help="Latência de busca LIKE x FTS5")
+    p.add_argument("--rows", type=int, default=100000)
+    p.add_argument("--repeat", type=int, default=20)
+
+    p = sub.add_parser("catalog", help="Latência de /knowledge/search com facetas")
+    p.add_argument("--rows", type=int, default=30000)
+    p.add_argument("--repeat", type=int, default=20)
+
+    p = sub.add_parser("stats", help="Consultas e latência de /admin/stats")
+    p.add_argument("--rows", type=int, default=100000)
+    p.add_argument("--repeat", type=int, default=10)
+
+    p = sub.add_parser("logins", help="Logins/s e p99 de endpoints leves durante rajada de logins")
+    p.add_argument("--url", default="http://localhost:8000")
+    p.add_argument("--db", default="./gestao360.db", help="Banco do servidor (recebe o usuário do benchmark)")
+    p.add_argument("--seconds", type=float, default=10.0)
+    p.add_argument("--clients", type=int, default=16)
+    p.add_argument("--cheap-path", action="append", dest="cheap_paths")
+
+    p = sub.add_parser("tokens", help="Custo das dependências de auth com e sem cache de JWT")
+    p.add_argument("--repeat", type=int, default=20000)
+
+    p = sub.add_parser("permissions", help="Checagem de permissão por JSON x máscara de bits")
+    p.add_argument("--repeat", type=int, default=200000)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "pragmas":
+        bench_pragmas(args.seconds, args.readers, args.rows)
+    elif args.command == "concurrency":
+        bench_concurrency(args.url, args.seconds, args.heavy_path, args.heavy_clients,
+                          args.cheap_paths or ["/auth/health", "/areas/1"])
+    elif args.command == "plans":
+        return check_plans(args.db)
+    elif args.command == "search":
+        bench_search(args.rows, args.repeat)
+    elif args.command == "catalog":
+        bench_catalog(args.rows, args.repeat)
+    elif args.command == "stats":
+        bench_stats(args.rows, args.repeat)
+    elif args.command == "tokens":
+        return bench_tokens(args.repeat)
+    elif args.command == "permissions":
+        bench_permissions(args.repeat)
+    elif args.command == "logins":
+        bench_logins(args.url, args.db, args.seconds, args.clients,
+                     args.cheap_paths or ["/auth/health", "/areas/1"])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
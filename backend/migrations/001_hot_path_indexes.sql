@@ -0,0 +1,33 @@
+-- ============================================================================
+-- OL 360 - MIGRATION 001: INDICES PARA AS CONSULTAS MAIS FREQUENTES
+-- ============================================================================
+-- Idempotente: pode ser aplicada em bancos novos ou existentes.
+
+-- EMPLOYEES: listagem ignora DELETED e ordena por nome
+CREATE INDEX IF NOT EXISTS idx_employees_active_nome
+    ON employees(nome, id) WHERE status != 'DELETED';
+
+-- EMPLOYEES: filtros por area/equipe/gestor mantendo a ordenacao por nome
+CREATE INDEX IF NOT EXISTS idx_employees_area_nome
+    ON employees(area_id, nome) WHERE status != 'DELETED';
+CREATE INDEX IF NOT EXISTS idx_employees_team_nome
+    ON employees(team_id, nome) WHERE status != 'DELETED';
+CREATE INDEX IF NOT EXISTS idx_employees_manager
+    ON employees(manager_id);
+CREATE INDEX IF NOT EXISTS idx_employees_status
+    ON employees(status);
+
+-- TEAMS: equipes por area
+CREATE INDEX IF NOT EXISTS idx_teams_area
+    ON teams(area_id);
+
+-- EMPLOYEE_KNOWLEDGE: vinculos por funcionario e por item de aprendizado
+-- (employee_id, learning_item_id) ja e coberto pelo UNIQUE da tabela
+CREATE INDEX IF NOT EXISTS idx_employee_knowledge_employee
+    ON employee_knowledge(employee_id, id);
+CREATE INDEX IF NOT EXISTS idx_employee_knowledge_item
+    ON employee_knowledge(learning_item_id, status, prioridade);
+
+-- EMPLOYEE_KNOWLEDGE: varredura de certificacoes vencendo
+CREATE INDEX IF NOT EXISTS idx_employee_knowledge_expiry
+    ON employee_knowledge(status, data_expiracao);
@@ -0,0 +1,20 @@
+-- ============================================================================
+-- OL 360 - MIGRATION 002: TABELA DE USUARIOS DO SISTEMA ADMIN
+-- ============================================================================
+-- Antes criada sob demanda por admin_utils.create_default_admin().
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    hashed_password TEXT NOT NULL,
+    is_active BOOLEAN DEFAULT 1,
+    is_admin BOOLEAN DEFAULT 0,
+    is_superuser BOOLEAN DEFAULT 0,
+    permissions TEXT DEFAULT '{}',
+    preferences TEXT DEFAULT '{}',
+    last_login TEXT,
+    login_count INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
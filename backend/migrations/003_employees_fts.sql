@@ -0,0 +1,37 @@
+-- ============================================================================
+-- OL 360 - MIGRATION 003: BUSCA TEXTUAL (FTS5) DE FUNCIONARIOS
+-- ============================================================================
+-- Indice externo sobre employees: o conteudo continua na tabela original e
+-- os triggers mantem o indice sincronizado. remove_diacritics permite achar
+-- "Rogerio" ao buscar "rogério" (e vice-versa); prefix acelera o type-ahead.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts USING fts5(
+    nome,
+    email,
+    cargo,
+    equipe,
+    content='employees',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS employees_fts_ai AFTER INSERT ON employees BEGIN
+    INSERT INTO employees_fts(rowid, nome, email, cargo, equipe)
+    VALUES (new.id, new.nome, new.email, new.cargo, new.equipe);
+END;
+
+CREATE TRIGGER IF NOT EXISTS employees_fts_ad AFTER DELETE ON employees BEGIN
+    INSERT INTO employees_fts(employees_fts, rowid, nome, email, cargo, equipe)
+    VALUES ('delete', old.id, old.nome, old.email, old.cargo, old.equipe);
+END;
+
+CREATE TRIGGER IF NOT EXISTS employees_fts_au AFTER UPDATE OF nome, email, cargo, equipe ON employees BEGIN
+    INSERT INTO employees_fts(employees_fts, rowid, nome, email, cargo, equipe)
+    VALUES ('delete', old.id, old.nome, old.email, old.cargo, old.equipe);
+    INSERT INTO employees_fts(rowid, nome, email, cargo, equipe)
+    VALUES (new.id, new.nome, new.email, new.cargo, new.equipe);
+END;
+
+-- Indexar os funcionarios ja existentes
+INSERT INTO employees_fts(employees_fts) VALUES ('rebuild');
@@ -0,0 +1,48 @@
+-- ============================================================================
+-- OL 360 - MIGRATION 004: BUSCA TEXTUAL (FTS5) DO CATALOGO DE CONHECIMENTOS
+-- ============================================================================
+-- Colunas usadas pela busca/facetas que o schema inicial nao tinha
+-- (ADD COLUMN de coluna ja existente e ignorado pelo runner).
+
+ALTER TABLE knowledge ADD COLUMN tags VARCHAR(500);
+ALTER TABLE knowledge ADD COLUMN pre_requisitos TEXT;
+ALTER TABLE knowledge ADD COLUMN vendor VARCHAR(100);
+ALTER TABLE knowledge ADD COLUMN dificuldade VARCHAR(20) DEFAULT 'MEDIO';
+
+-- Facetas e filtros da busca
+CREATE INDEX IF NOT EXISTS idx_knowledge_tipo ON knowledge(tipo);
+CREATE INDEX IF NOT EXISTS idx_knowledge_categoria ON knowledge(categoria);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(
+    nome,
+    descricao,
+    tags,
+    pre_requisitos,
+    fornecedor,
+    vendor,
+    content='knowledge',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS knowledge_fts_ai AFTER INSERT ON knowledge BEGIN
+    INSERT INTO knowledge_fts(rowid, nome, descricao, tags, pre_requisitos, fornecedor, vendor)
+    VALUES (new.id, new.nome, new.descricao, new.tags, new.pre_requisitos, new.fornecedor, new.vendor);
+END;
+
+CREATE TRIGGER IF NOT EXISTS knowledge_fts_ad AFTER DELETE ON knowledge BEGIN
+    INSERT INTO knowledge_fts(knowledge_fts, rowid, nome, descricao, tags, pre_requisitos, fornecedor, vendor)
+    VALUES ('delete', old.id, old.nome, old.descricao, old.tags, old.pre_requisitos, old.fornecedor, old.vendor);
+END;
+
+CREATE TRIGGER IF NOT EXISTS knowledge_fts_au
+    AFTER UPDATE OF nome, descricao, tags, pre_requisitos, fornecedor, vendor ON knowledge BEGIN
+    INSERT INTO knowledge_fts(knowledge_fts, rowid, nome, descricao, tags, pre_requisitos, fornecedor, vendor)
+    VALUES ('delete', old.id, old.nome, old.descricao, old.tags, old.pre_requisitos, old.fornecedor, old.vendor);
+    INSERT INTO knowledge_fts(rowid, nome, descricao, tags, pre_requisitos, fornecedor, vendor)
+    VALUES (new.id, new.nome, new.descricao, new.tags, new.pre_requisitos, new.fornecedor, new.vendor);
+END;
+
+-- Indexar o catalogo existente
+INSERT INTO knowledge_fts(knowledge_fts) VALUES ('rebuild');
@@ -0,0 +1,192 @@
+-- ============================================================================
+-- OL 360 - MIGRATION 005: CONTADORES MATERIALIZADOS PARA OS DASHBOARDS
+-- ============================================================================
+-- metric_counters guarda COUNT(*) por (tabela, dimensao, valor) e e mantida por
+-- triggers; os endpoints de estatisticas passam a ler algumas linhas em vez de
+-- varrer as tabelas. dimension = 'total' / bucket = '*' e o total da tabela.
+-- NULL vira '' (a chave primaria nao aceita NULL). A coluna bucket nao tem tipo
+-- para preservar inteiros (area_id, ativo) e textos (status) como gravados.
+-- Drift pode ser corrigido com: python -m app.migrate reconcile
+
+CREATE TABLE IF NOT EXISTS metric_counters
+(
+    entity    TEXT    NOT NULL,
+    dimension TEXT    NOT NULL,
+    bucket            NOT NULL,
+    value     INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (entity, dimension, bucket)
+) WITHOUT ROWID;
+
+-- EMPLOYEES: total, status, area_id, team_id
+CREATE TRIGGER IF NOT EXISTS metric_employees_ai AFTER INSERT ON employees BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('employees', 'total', '*', 1),
+           ('employees', 'status', IFNULL(NEW.status, ''), 1),
+           ('employees', 'area_id', IFNULL(NEW.area_id, ''), 1),
+           ('employees', 'team_id', IFNULL(NEW.team_id, ''), 1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS metric_employees_ad AFTER DELETE ON employees BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('employees', 'total', '*', -1),
+           ('employees', 'status', IFNULL(OLD.status, ''), -1),
+           ('employees', 'area_id', IFNULL(OLD.area_id, ''), -1),
+           ('employees', 'team_id', IFNULL(OLD.team_id, ''), -1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS metric_employees_au AFTER UPDATE OF status, area_id, team_id ON employees
+WHEN OLD.status IS NOT NEW.status OR OLD.area_id IS NOT NEW.area_id OR OLD.team_id IS NOT NEW.team_id
+BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('employees', 'status', IFNULL(OLD.status, ''), -1),
+           ('employees', 'status', IFNULL(NEW.status, ''), 1),
+           ('employees', 'area_id', IFNULL(OLD.area_id, ''), -1),
+           ('employees', 'area_id', IFNULL(NEW.area_id, ''), 1),
+           ('employees', 'team_id', IFNULL(OLD.team_id, ''), -1),
+           ('employees', 'team_id', IFNULL(NEW.team_id, ''), 1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+-- TEAMS: total, ativo, area_id
+CREATE TRIGGER IF NOT EXISTS metric_teams_ai AFTER INSERT ON teams BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('teams', 'total', '*', 1),
+           ('teams', 'ativo', IFNULL(NEW.ativo, ''), 1),
+           ('teams', 'area_id', IFNULL(NEW.area_id, ''), 1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS metric_teams_ad AFTER DELETE ON teams BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('teams', 'total', '*', -1),
+           ('teams', 'ativo', IFNULL(OLD.ativo, ''), -1),
+           ('teams', 'area_id', IFNULL(OLD.area_id, ''), -1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS metric_teams_au AFTER UPDATE OF ativo, area_id ON teams
+WHEN OLD.ativo IS NOT NEW.ativo OR OLD.area_id IS NOT NEW.area_id
+BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('teams', 'ativo', IFNULL(OLD.ativo, ''), -1),
+           ('teams', 'ativo', IFNULL(NEW.ativo, ''), 1),
+           ('teams', 'area_id', IFNULL(OLD.area_id, ''), -1),
+           ('teams', 'area_id', IFNULL(NEW.area_id, ''), 1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+-- AREAS: total, ativa
+CREATE TRIGGER IF NOT EXISTS metric_areas_ai AFTER INSERT ON areas BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('areas', 'total', '*', 1),
+           ('areas', 'ativa', IFNULL(NEW.ativa, ''), 1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS metric_areas_ad AFTER DELETE ON areas BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('areas', 'total', '*', -1),
+           ('areas', 'ativa', IFNULL(OLD.ativa, ''), -1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS metric_areas_au AFTER UPDATE OF ativa ON areas
+WHEN OLD.ativa IS NOT NEW.ativa
+BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('areas', 'ativa', IFNULL(OLD.ativa, ''), -1),
+           ('areas', 'ativa', IFNULL(NEW.ativa, ''), 1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+-- MANAGERS: total, ativo, nivel_hierarquico
+CREATE TRIGGER IF NOT EXISTS metric_managers_ai AFTER INSERT ON managers BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('managers', 'total', '*', 1),
+           ('managers', 'ativo', IFNULL(NEW.ativo, ''), 1),
+           ('managers', 'nivel_hierarquico', IFNULL(NEW.nivel_hierarquico, ''), 1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS metric_managers_ad AFTER DELETE ON managers BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('managers', 'total', '*', -1),
+           ('managers', 'ativo', IFNULL(OLD.ativo, ''), -1),
+           ('managers', 'nivel_hierarquico', IFNULL(OLD.nivel_hierarquico, ''), -1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS metric_managers_au AFTER UPDATE OF ativo, nivel_hierarquico ON managers
+WHEN OLD.ativo IS NOT NEW.ativo OR OLD.nivel_hierarquico IS NOT NEW.nivel_hierarquico
+BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('managers', 'ativo', IFNULL(OLD.ativo, ''), -1),
+           ('managers', 'ativo', IFNULL(NEW.ativo, ''), 1),
+           ('managers', 'nivel_hierarquico', IFNULL(OLD.nivel_hierarquico, ''), -1),
+           ('managers', 'nivel_hierarquico', IFNULL(NEW.nivel_hierarquico, ''), 1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+-- KNOWLEDGE: total
+CREATE TRIGGER IF NOT EXISTS metric_knowledge_ai AFTER INSERT ON knowledge BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('knowledge', 'total', '*', 1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS metric_knowledge_ad AFTER DELETE ON knowledge BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('knowledge', 'total', '*', -1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+-- EMPLOYEE_KNOWLEDGE: total, status, prioridade
+CREATE TRIGGER IF NOT EXISTS metric_employee_knowledge_ai AFTER INSERT ON employee_knowledge BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('employee_knowledge', 'total', '*', 1),
+           ('employee_knowledge', 'status', IFNULL(NEW.status, ''), 1),
+           ('employee_knowledge', 'prioridade', IFNULL(NEW.prioridade, ''), 1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS metric_employee_knowledge_ad AFTER DELETE ON employee_knowledge BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('employee_knowledge', 'total', '*', -1),
+           ('employee_knowledge', 'status', IFNULL(OLD.status, ''), -1),
+           ('employee_knowledge', 'prioridade', IFNULL(OLD.prioridade, ''), -1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+CREATE TRIGGER IF NOT EXISTS metric_employee_knowledge_au AFTER UPDATE OF status, prioridade ON employee_knowledge
+WHEN OLD.status IS NOT NEW.status OR OLD.prioridade IS NOT NEW.prioridade
+BEGIN
+    INSERT INTO metric_counters (entity, dimension, bucket, value)
+    VALUES ('employee_knowledge', 'status', IFNULL(OLD.status, ''), -1),
+           ('employee_knowledge', 'status', IFNULL(NEW.status, ''), 1),
+           ('employee_knowledge', 'prioridade', IFNULL(OLD.prioridade, ''), -1),
+           ('employee_knowledge', 'prioridade', IFNULL(NEW.prioridade, ''), 1)
+    ON CONFLICT (entity, dimension, bucket) DO UPDATE SET value = value + excluded.value;
+END;
+
+-- Carga inicial a partir dos dados existentes (mesma transacao das triggers)
+DELETE FROM metric_counters;
+
+INSERT INTO metric_counters (entity, dimension, bucket, value)
+SELECT 'employees', 'total', '*', COUNT(*) FROM employees
+UNION ALL SELECT 'employees', 'status', IFNULL(status, ''), COUNT(*) FROM employees GROUP BY 3
+UNION ALL SELECT 'employees', 'area_id', IFNULL(area_id, ''), COUNT(*) FROM employees GROUP BY 3
+UNION ALL SELECT 'employees', 'team_id', IFNULL(team_id, ''), COUNT(*) FROM employees GROUP BY 3
+UNION ALL SELECT 'teams', 'total', '*', COUNT(*) FROM teams
+UNION ALL SELECT 'teams', 'ativo', IFNULL(ativo, ''), COUNT(*) FROM teams GROUP BY 3
+UNION ALL SELECT 'teams', 'area_id', IFNULL(area_id, ''), COUNT(*) FROM teams GROUP BY 3
+UNION ALL SELECT 'areas', 'total', '*', COUNT(*) FROM areas
+UNION ALL SELECT 'areas', 'ativa', IFNULL(ativa, ''), COUNT(*) FROM areas GROUP BY 3
+UNION ALL SELECT 'managers', 'total', '*', COUNT(*) FROM managers
+UNION ALL SELECT 'managers', 'ativo', IFNULL(ativo, ''), COUNT(*) FROM managers GROUP BY 3
+UNION ALL SELECT 'managers', 'nivel_hierarquico', IFNULL(nivel_hierarquico, ''), COUNT(*) FROM managers GROUP BY 3
+UNION ALL SELECT 'knowledge', 'total', '*', COUNT(*) FROM knowledge
+UNION ALL SELECT 'employee_knowledge', 'total', '*', COUNT(*) FROM employee_knowledge
+UNION ALL SELECT 'employee_knowledge', 'status', IFNULL(status, ''), COUNT(*) FROM employee_knowledge GROUP BY 3
+UNION ALL SELECT 'employee_knowledge', 'prioridade', IFNULL(prioridade, ''), COUNT(*) FROM employee_knowledge GROUP BY 3;
@@ -0,0 +1,59 @@
+-- ============================================================================
+-- OL 360 - MIGRATION 006: SEVERIDADE/CATEGORIA E RETENCAO DE SYSTEM_LOGS
+-- ============================================================================
+-- severity (info/warning/error) e category (audit/schema/error) substituem os
+-- filtros LIKE '%ERROR%' por colunas indexadas. A tabela e recriada porque o
+-- baseline declarou employee_id NOT NULL e os erros do sistema (sem
+-- funcionario) eram recusados e iam para system_errors.log.
+-- A classificacao abaixo deve acompanhar classify_action() em audit_utils.py.
+-- Linhas antigas sao movidas para o arquivo por app/utils/retention_utils.py.
+
+CREATE TABLE system_logs_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER DEFAULT NULL,
+    action_type VARCHAR(50) NOT NULL,
+    action_description TEXT NOT NULL,
+    old_data TEXT DEFAULT NULL,
+    new_data TEXT DEFAULT NULL,
+    user_who_made_change VARCHAR(100) NOT NULL,
+    ip_address VARCHAR(50) DEFAULT NULL,
+    user_agent TEXT DEFAULT NULL,
+    metadata TEXT DEFAULT '{}',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    severity VARCHAR(10) NOT NULL DEFAULT 'info',
+    category VARCHAR(20) NOT NULL DEFAULT 'audit',
+    FOREIGN KEY (employee_id) REFERENCES employees(id)
+);
+
+INSERT INTO system_logs_new (id, employee_id, action_type, action_description, old_data, new_data,
+                             user_who_made_change, ip_address, user_agent, metadata, created_at,
+                             severity, category)
+SELECT id, employee_id, action_type, action_description, old_data, new_data,
+       user_who_made_change, ip_address, user_agent, metadata, created_at,
+       CASE
+           WHEN action_type LIKE '%ERROR%' THEN 'error'
+           WHEN action_type LIKE '%MISSING%' OR action_type = 'IGNORED_FIELDS' THEN 'warning'
+           ELSE 'info'
+       END,
+       CASE
+           WHEN action_type LIKE '%ERROR%' THEN 'error'
+           WHEN action_type LIKE '%MISSING%' OR action_type = 'IGNORED_FIELDS' THEN 'schema'
+           ELSE 'audit'
+       END
+FROM system_logs;
+
+DROP TABLE system_logs;
+
+ALTER TABLE system_logs_new RENAME TO system_logs;
+
+CREATE INDEX IF NOT EXISTS idx_system_logs_employee ON system_logs(employee_id);
+CREATE INDEX IF NOT EXISTS idx_system_logs_action_type ON system_logs(action_type);
+CREATE INDEX IF NOT EXISTS idx_system_logs_created_at ON system_logs(created_at);
+
+-- Filtros do painel: por severidade/categoria, mais recentes primeiro
+CREATE INDEX IF NOT EXISTS idx_system_logs_severity ON system_logs(severity, created_at);
+CREATE INDEX IF NOT EXISTS idx_system_logs_category ON system_logs(category, created_at);
+
+-- /employees/admin/system-health: ultimos problemas sem ordenar a tabela inteira
+CREATE INDEX IF NOT EXISTS idx_system_logs_problems
+    ON system_logs(created_at) WHERE severity != 'info';
@@ -0,0 +1,16 @@
+-- ============================================================================
+-- OL 360 - MIGRATION 007: TOKENS REVOGADOS (LOGOUT)
+-- ============================================================================
+-- Guarda o SHA-256 dos JWTs revogados ate o fim da validade do token. Cada
+-- worker le as linhas novas periodicamente (id > ultimo visto) e descarta o
+-- token do cache de verificacao; linhas expiradas sao removidas no proximo logout.
+
+CREATE TABLE IF NOT EXISTS revoked_tokens
+(
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    digest     TEXT    NOT NULL UNIQUE,
+    expires_at INTEGER NOT NULL,
+    revoked_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires ON revoked_tokens(expires_at);
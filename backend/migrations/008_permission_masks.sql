@@ -0,0 +1,12 @@
+-- ============================================================================
+-- OL 360 - MIGRATION 008: MASCARA DE PERMISSOES DOS USUARIOS
+-- ============================================================================
+-- permission_mask guarda users.permissions compilado em um inteiro (recurso x
+-- acao, ver app/utils/permission_utils.py): o login grava a mascara no token e
+-- require_permission confere com um AND.
+--
+-- O preenchimento dos usuarios existentes e feito em Python pelo runner
+-- (app/migrate.py, POST_MIGRATION_STEPS), na mesma transacao, com a mesma
+-- compilacao usada no login: o layout dos bits fica so em permission_utils.
+
+ALTER TABLE users ADD COLUMN permission_mask INTEGER;
@@ -2,6 +2,9 @@ import { useState, useEffect } from 'react';
 
 const API_BASE_URL = 'http://localhost:8000';
 
+// Colunas que as abas admin realmente exibem
+const ADMIN_EMPLOYEE_FIELDS = 'id,nome,email,cargo,equipe,status,area_id,team_id,manager_id';
+
 export const useAdminData = () => {
   const [loading, setLoading] = useState(true);
 
@@ -27,29 +30,27 @@ export const useAdminData = () => {
     try {
       setLoading(true);
 
-      // Buscar dados em paralelo
-      const [
-        areasRes,
-        teamsRes,
-        employeesRes,
-        managersRes,
-        knowledgeRes,
-        statsRes,
-        healthRes
-      ] = await Promise.all([
-        fetch(`${API_BASE_URL}/areas`).then(r => r.json()),
-        fetch(`${API_BASE_URL}/teams`).then(r => r.json()),
-        fetch(`${API_BASE_URL}/employees`).then(r => r.json()),
-        fetch(`${API_BASE_URL}/managers`).then(r => r.json()),
-        fetch(`${API_BASE_URL}/knowledge`).then(r => r.json()),
-        fetch(`${API_BASE_URL}/admin/stats`).then(r => r.json()),
-        fetch(`${API_BASE_URL}/admin/health`).then(r => r.json())
-      ]);
+      // Uma chamada com todas as seções (mesmo snapshot do banco). O backend
+      // envia ETag + no-cache: o navegador revalida e recebe 304 sem corpo
+      // quando nada mudou.
+      const bootstrap = await fetch(
+        `${API_BASE_URL}/admin/bootstrap?employee_fields=${ADMIN_EMPLOYEE_FIELDS}`
+      ).then(r => r.json());
+
+      const {
+        areas: areasRes,
+        teams: teamsRes,
+        employees: employeesList,
+        managers: managersRes,
+        knowledge: knowledgeRes,
+        stats: statsRes,
+        health: healthRes
+      } = bootstrap || {};
 
       // Atualizar estados com dados reais
       setAreas(Array.isArray(areasRes) ? areasRes : []);
       setTeams(Array.isArray(teamsRes) ? teamsRes : []);
-      setEmployees(Array.isArray(employeesRes) ? employeesRes : []);
+      setEmployees(Array.isArray(employeesList) ? employeesList : []);
       setManagers(Array.isArray(managersRes) ? managersRes : []);
       setKnowledge(Array.isArray(knowledgeRes) ? knowledgeRes : []);
 
@@ -91,7 +92,7 @@ export const useAdminData = () => {
       console.log('✅ Dados carregados do backend:', {
         areas: areasRes?.length || 0,
         teams: teamsRes?.length || 0,
-        employees: employeesRes?.length || 0,
+        employees: employeesList?.length || 0,
         managers: managersRes?.length || 0
       });
 